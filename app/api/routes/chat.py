@@ -1,22 +1,43 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Literal
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from app.models.schemas import ChatRequest, ChatResponse
-from app.services.rag_service import rag_service
+from app.services.rag_service import RAGService, rag_service
+from app.services.admission import AdmissionRejected, admission_controller
+from app.services.candidate_pool import CandidateNotFoundError, candidate_pool
 from app.services.memory_service import chat_memory
 from app.services.response_service import response_service
 from app.core.config import settings
+from instrumentation import stage, start_trace
 
 router = APIRouter()
 
-@router.post(
-    "/chat", 
-    response_model=ChatResponse,
-    status_code=status.HTTP_200_OK,
-    summary="Process chat message",
-    description="Send a question about the resume and get an AI-powered response with source citations"
-)
-async def chat_endpoint(request: ChatRequest):
-    """Process a chat message and return a conversational response string"""
+async def _resolve_service(request: ChatRequest) -> RAGService:
+    """Pick the RAG service for the request's candidate (default resume if none given)"""
+    if request.candidate_id:
+        try:
+            return await candidate_pool.get(request.candidate_id)
+        except CandidateNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "error": "Candidate not found",
+                    "message": f"No resume found for candidate '{request.candidate_id}'"
+                }
+            )
+        except Exception as e:
+            print(f"❌ Failed to load candidate {request.candidate_id}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    "error": "Candidate index unavailable",
+                    "message": "Please wait and try again",
+                    "retry_after": 5
+                }
+            )
     
     if not rag_service.is_ready():
         raise HTTPException(
@@ -27,36 +48,140 @@ async def chat_endpoint(request: ChatRequest):
                 "retry_after": 5
             }
         )
-    
-    try:
-        # Get chat history in modern format
-        chat_history = chat_memory.get_langchain_format(request.session_id)
-        
-        # Query RAG chain with latest async pattern
-        result = await rag_service.query(request.question, chat_history)
-        
-    except Exception as e:
-        print(f"❌ RAG chain error: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "Processing failed",
-                "message": "Failed to process question. Please try again.",
-                "type": str(type(e).__name__)
-            }
-        )
-    
-    answer = result.get("answer", "Not Sure").strip()
-    
+    return rag_service
+
+def _overloaded(e: AdmissionRejected) -> HTTPException:
+    """429/503 in the same detail shape as the readiness check, with a computed retry_after"""
+    return HTTPException(
+        status_code=e.status_code,
+        detail={
+            "error": "Too many requests" if e.status_code == status.HTTP_429_TOO_MANY_REQUESTS else "Server busy",
+            "message": "Please wait and try again",
+            "retry_after": e.retry_after
+        },
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+async def _finalize_answer(request: ChatRequest, answer: str) -> str:
+    """Run unknown-answer handling on the complete answer and persist the exchange"""
     # Check for unknown answers
     if response_service.is_unknown_answer(answer):
         # notify internally when the model indicates uncertainty
         answer = await response_service.handle_unknown_answer(
             request.question, request.session_id
         )
-    
+
     # Update memory
     if request.session_id:
-        chat_memory.add_exchange(request.session_id, request.question, answer)
+        await chat_memory.aadd_exchange(request.session_id, request.question, answer)
+
+    return answer
+
+def _encode_event(event: Dict[str, Any], fmt: str) -> str:
+    if fmt == "sse":
+        return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+@router.post(
+    "/chat",
+    response_model=ChatResponse,
+    response_model_exclude_none=True,
+    status_code=status.HTTP_200_OK,
+    summary="Process chat message",
+    description="Send a question about the resume and get an AI-powered response with source citations"
+)
+async def chat_endpoint(request: ChatRequest):
+    """Process a chat message and return a conversational response string"""
+
+    service = await _resolve_service(request)
+
+    with start_trace("chat") as trace:
+        try:
+            # Get chat history in modern format
+            chat_history = await chat_memory.aget_langchain_format(request.session_id)
+
+            # Query RAG chain with latest async pattern
+            result = await service.query(request.question, chat_history, session_id=request.session_id)
+
+        except AdmissionRejected as e:
+            raise _overloaded(e)
+        except Exception as e:
+            print(f"❌ RAG chain error: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail={
+                    "error": "Processing failed",
+                    "message": "Failed to process question. Please try again.",
+                    "type": str(type(e).__name__)
+                }
+            )
+
+        answer = result.get("answer", "Not Sure").strip()
+        answer = await _finalize_answer(request, answer)
+
+    return ChatResponse(response=answer, timings=trace.as_dict() if settings.debug_timings else None)
+
+@router.post(
+    "/chat/stream",
+    status_code=status.HTTP_200_OK,
+    summary="Stream chat response",
+    description=(
+        "Stream answer tokens as they are generated. Emits `token` events, then a final "
+        "`done` event whose `response` is the complete (post-processed) answer"
+    )
+)
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    format: Literal["ndjson", "sse"] = Query(default="ndjson", description="Stream framing")
+):
+    """Stream a conversational response token by token (NDJSON or Server-Sent Events)"""
+
+    service = await _resolve_service(request)
+
+    chat_history = await chat_memory.aget_langchain_format(request.session_id)
+
+    # Take the slot before responding so overload is reported as 429/503, not inside a 200 stream
+    start = time.perf_counter()
+    try:
+        with stage("admission_wait"):
+            ticket = await admission_controller.acquire(request.session_id)
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    waited = time.perf_counter() - start
+
+    async def events() -> AsyncIterator[str]:
+        with start_trace("chat_stream") as trace:
+            # Spent before the stream (and this trace) started; already counted in the stage metrics
+            trace.add_stage("admission_wait", waited)
+            parts = []
+            try:
+                async for token in service.astream_query(request.question, chat_history):
+                    parts.append(token)
+                    yield _encode_event({"event": "token", "content": token}, format)
+            except Exception as e:
+                print(f"❌ RAG stream error: {e}")
+                yield _encode_event({
+                    "event": "error",
+                    "error": "Processing failed",
+                    "message": "Failed to process question. Please try again.",
+                    "type": str(type(e).__name__)
+                }, format)
+                return
+            finally:
+                ticket.release()
+
+            answer = "".join(parts).strip() or "Not Sure"
+            answer = await _finalize_answer(request, answer)
+        done = {"event": "done", "response": answer}
+        if settings.debug_timings:
+            done["timings"] = trace.as_dict()
+        yield _encode_event(done, format)
 
-    return ChatResponse(response=answer)
\ No newline at end of file
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache"},
+        # Also released here in case the stream never starts (release is idempotent)
+        background=BackgroundTask(ticket.release),
+    )
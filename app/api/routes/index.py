@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from app.models.schemas import IndexRebuildStatus
+from app.services.rag_service import RebuildInProgressError, rag_service
+
+router = APIRouter()
+
+@router.post(
+    "/index/rebuild",
+    response_model=IndexRebuildStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Rebuild the index",
+    description=(
+        "Rebuild the resume index in the background. The current index keeps answering "
+        "requests until the new one is swapped in; poll `GET /index/rebuild` for progress"
+    )
+)
+async def rebuild_index(
+    force: bool = Query(default=False, description="Re-embed every chunk instead of patching the current index")
+):
+    """Start a zero-downtime index rebuild"""
+    try:
+        return IndexRebuildStatus(**rag_service.start_rebuild(force_delete=force))
+    except RebuildInProgressError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "error": "Rebuild in progress",
+                "message": "An index rebuild is already running",
+                "status": rag_service.get_rebuild_status()
+            }
+        )
+
+@router.get(
+    "/index/rebuild",
+    response_model=IndexRebuildStatus,
+    summary="Rebuild status",
+    description="State of the last index rebuild and the generation currently serving requests"
+)
+async def rebuild_status():
+    """Get index rebuild status"""
+    return IndexRebuildStatus(**rag_service.get_rebuild_status())
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.services.admission import admission_controller
+from instrumentation import pipeline_metrics
+
+router = APIRouter()
+
+def _admission_metrics() -> str:
+    stats = admission_controller.stats()
+    lines = [
+        "# HELP rag_admission_active Chain executions holding an admission slot.",
+        "# TYPE rag_admission_active gauge",
+        f"rag_admission_active {stats['active']}",
+        "# HELP rag_admission_queue_depth Requests waiting for an admission slot.",
+        "# TYPE rag_admission_queue_depth gauge",
+        f"rag_admission_queue_depth {stats['queue_depth']}",
+        "# HELP rag_admission_events_total Admission outcomes.",
+        "# TYPE rag_admission_events_total counter",
+    ]
+    for outcome in ("admitted", "rejected_queue_full", "rejected_expected_wait",
+                    "rejected_session_limit", "timed_out", "cancelled_while_queued"):
+        lines.append(f'rag_admission_events_total{{outcome="{outcome}"}} {stats[outcome]}')
+    bounds, counts, total = admission_controller.wait_histogram()
+    lines += [
+        "# HELP rag_admission_wait_seconds Time admitted requests waited for a slot.",
+        "# TYPE rag_admission_wait_seconds histogram",
+    ]
+    lines += [f'rag_admission_wait_seconds_bucket{{le="{bound:g}"}} {count}' for bound, count in zip(bounds, counts)]
+    lines += [
+        f'rag_admission_wait_seconds_bucket{{le="+Inf"}} {counts[-1]}',
+        f"rag_admission_wait_seconds_sum {total:.6f}",
+        f"rag_admission_wait_seconds_count {counts[-1]}",
+    ]
+    return "\n".join(lines) + "\n"
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    description="RAG stage latency histograms, LLM token counters, cache outcomes and admission gauges"
+)
+async def get_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return PlainTextResponse(
+        pipeline_metrics.render() + _admission_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -12,7 +12,7 @@ router = APIRouter()
 )
 async def get_chat_history(session_id: str):
     """Get chat history for a specific session"""
-    history_tuples = chat_memory.get_history(session_id)
+    history_tuples = await chat_memory.aget_history(session_id)
     
     # Convert tuples to dict format for better API response
     history_dicts = [
@@ -34,7 +34,7 @@ async def get_chat_history(session_id: str):
 )
 async def clear_session(session_id: str):
     """Clear chat history for a specific session"""
-    existed = chat_memory.clear_session(session_id)
+    existed = await chat_memory.aclear_session(session_id)
     
     return SessionClearResponse(
         message=f"Session {session_id} {'cleared' if existed else 'not found'}",
@@ -48,7 +48,7 @@ async def clear_session(session_id: str):
 )
 async def list_sessions():
     """Get list of all active sessions"""
-    sessions = chat_memory.get_all_sessions()
+    sessions = await chat_memory.aget_all_sessions()
     return {
         "sessions": [
             {
@@ -67,8 +67,8 @@ async def list_sessions():
 )
 async def cleanup_sessions():
     """Manually trigger cleanup of inactive sessions"""
-    removed_count = chat_memory._cleanup_inactive_sessions()
-    active_count = chat_memory.session_count()
+    removed_count = await chat_memory.acleanup_inactive_sessions()
+    active_count = await chat_memory.asession_count()
     return {
         "removed_sessions": removed_count,
         "active_sessions": active_count,
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from app.services.rag_service import rag_service
+from app.services.candidate_pool import candidate_pool
+from app.services.notification_outbox import notification_outbox
+from app.services.memory_service import chat_memory
+from app.services.admission import admission_controller
+
+router = APIRouter()
+
+@router.get(
+    "/stats",
+    summary="Service statistics",
+    description="Hit/miss counters and other runtime statistics for the RAG pipeline"
+)
+async def get_stats():
+    """Get runtime statistics for the RAG pipeline"""
+    return {
+        **rag_service.stats(),
+        "candidate_pool": candidate_pool.stats(),
+        "outbox": notification_outbox.stats(),
+        "history": chat_memory.stats(),
+        "admission": admission_controller.stats(),
+    }
@@ -1,22 +1,31 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.services.rag_service import rag_service
-from app.api.routes import chat, health, sessions
+from app.services.notification_outbox import notification_outbox
+from app.services.memory_service import chat_memory
+from app.api.routes import chat, health, index, metrics, sessions, stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print(f"Starting {settings.app_name}...")
     await rag_service.initialize()
+    if notification_outbox.enabled:
+        notification_outbox.start()
     print("Application startup complete.")
     
     yield
     
     # Shutdown
     print("Application shutting down...")
+    # Flush pending notifications without blocking the loop
+    await asyncio.to_thread(notification_outbox.stop)
+    # Flush buffered session writes (sqlite backend)
+    chat_memory.close()
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -36,7 +45,10 @@ def create_app() -> FastAPI:
     
     # Include routers
     app.include_router(health.router, tags=["health"])
+    app.include_router(metrics.router, tags=["metrics"])
     app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
     app.include_router(sessions.router, prefix="/api/v1", tags=["sessions"])
+    app.include_router(stats.router, prefix="/api/v1", tags=["stats"])
+    app.include_router(index.router, prefix="/api/v1", tags=["index"])
     
     return app
\ No newline at end of file
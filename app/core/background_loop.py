@@ -0,0 +1,78 @@
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Raised:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class BackgroundLoop:
+    """
+    An event loop running forever in a daemon thread, for driving the async services from
+    synchronous code (Streamlit script threads).
+
+    Every caller shares the same loop, so loop-bound state (HTTP clients, in-flight query tasks,
+    admission waiters, embedding batches) lives as long as the process instead of one rerun.
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the loop and block until it finishes (cancelled on timeout)."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stream(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """Iterate an async generator from a synchronous thread.
+
+        The generator is drained on the loop into a thread-safe queue, so each item costs one
+        queue hand-off rather than a loop round trip. Closing the iterator early cancels it.
+        """
+        items: "queue.Queue[Any]" = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for item in agen:
+                    items.put(item)
+            except BaseException as e:
+                items.put(_Raised(e))
+                raise
+            finally:
+                items.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Raised):
+                    raise item.error
+                yield item
+        finally:
+            future.cancel()
+
+    def close(self) -> None:
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
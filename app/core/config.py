@@ -20,6 +20,8 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", description="Host address")
     port: int = Field(default=8000, description="Port number")
     debug: bool = Field(default=True, description="Debug mode")
+    debug_timings: bool = Field(default=False, description="Include per-request pipeline timings in chat responses")
+    metrics_enabled: bool = Field(default=True, description="Serve Prometheus metrics at /metrics")
     
     # CORS Settings
     allowed_origins: List[str] = Field(
@@ -31,26 +33,88 @@ class Settings(BaseSettings):
     resume_path: str = Field(..., description="Path to resume PDF file")
     vectorstore_path: str = Field(default=".faiss_index", description="Path to FAISS index directory")
     
+    # Multi-candidate Settings
+    candidates_resume_dir: str = Field(default="resumes", description="Directory of <candidate_id>.pdf resumes")
+    candidates_index_dir: str = Field(default=".faiss_indexes", description="Root directory for per-candidate FAISS indexes")
+    candidate_pool_max_entries: int = Field(default=32, ge=1, description="Max candidate indexes kept loaded")
+    candidate_pool_max_memory_mb: int = Field(default=512, ge=1, description="Approximate memory budget for loaded candidate indexes")
+    
     # LLM Settings
     llm_model: str = Field(default="gpt-4o-mini", description="OpenAI model to use")
     llm_temperature: float = Field(default=0.2, ge=0.0, le=2.0, description="LLM temperature")
     embeddings_model: str = Field(default="text-embedding-3-small", description="Embeddings model")
     use_local_embeddings: bool = Field(default=False, description="Use local HuggingFace embeddings")
+    llm_provider: str = Field(default="openai", description="Chat model provider: openai or fake (offline, for benchmarks)")
+    embeddings_provider: str = Field(default="", description="Embeddings provider: openai, huggingface or fake (empty = by use_local_embeddings)")
+    fake_llm_latency_ms: float = Field(default=300.0, ge=0.0, description="Fake LLM time to first token")
+    fake_llm_tokens_per_second: float = Field(default=50.0, ge=0.0, description="Fake LLM token rate (0 = whole reply at once)")
+    fake_llm_answer_tokens: int = Field(default=60, ge=1, description="Words in a fake LLM answer")
+    fake_embeddings_latency_ms: float = Field(default=40.0, ge=0.0, description="Fake embeddings latency per call")
+    fake_embeddings_size: int = Field(default=256, ge=8, description="Fake embedding dimensions")
     
     # Retrieval Settings
     retriever_k: int = Field(default=4, ge=1, le=20, description="Number of documents to retrieve")
     retriever_fetch_k: int = Field(default=12, ge=1, le=50, description="Number of docs for MMR")
     mmr_lambda: float = Field(default=0.7, ge=0.0, le=1.0, description="MMR lambda parameter")
+    query_embedding_cache_size: int = Field(default=1024, ge=0, description="Query embeddings kept in the in-memory LRU (0 disables the cache)")
+    query_embedding_cache_path: str = Field(default="", description="Optional SQLite file for a persistent query-embedding tier")
+    query_embedding_batch_window_ms: float = Field(default=2.0, ge=0.0, description="Window for batching concurrent query-embedding misses")
+    hybrid_retrieval: bool = Field(default=True, description="Fuse BM25 keyword matches with dense results")
+    hybrid_lexical_fast: bool = Field(default=True, description="Answer fully matched keyword queries from BM25 without embedding")
+    hybrid_lexical_max_terms: int = Field(default=3, ge=1, description="Max content terms for the lexical-only fast path")
+    retriever_backend: str = Field(default="faiss", description="Retriever engine: faiss or numpy (exact in-memory search)")
+    section_routing: bool = Field(default=True, description="Favour the resume sections a query asks about in retrieval")
+    index_load_mode: str = Field(default="memory", description="memory (FAISS store per process) or mmap (vectors and chunk text memory-mapped, shared across processes)")
+    index_vector_dtype: str = Field(default="float32", description="Vector precision on disk: float32 or float16 (half the size, slightly lossy)")
+    index_migrate_pickle: bool = Field(default=False, description="Convert indexes pickled by older versions (unpickles index.pkl; only for directories you trust)")
+    
+    # Answer Cache Settings
+    answer_cache_enabled: bool = Field(default=True, description="Cache final answers per standalone question")
+    answer_cache_max_entries: int = Field(default=256, ge=1, description="Max cached answers (LRU eviction)")
+    answer_cache_ttl_seconds: int = Field(default=3600, ge=1, description="Cached answer time-to-live in seconds")
+    answer_cache_semantic: bool = Field(default=True, description="Match near-duplicate questions by embedding similarity")
+    answer_cache_similarity_threshold: float = Field(default=0.95, ge=0.0, le=1.0, description="Min cosine similarity for a semantic cache hit")
+    
+    # Request coalescing
+    coalesce_requests: bool = Field(default=True, description="Share one chain execution between identical concurrent questions")
+    
+    # Admission control (LLM-bound work)
+    admission_max_concurrent: int = Field(default=16, ge=0, description="Max chain executions at once (0 disables admission control)")
+    admission_max_queue: int = Field(default=256, ge=0, description="Max requests waiting for a slot")
+    admission_queue_timeout_seconds: float = Field(default=10.0, ge=0.0, description="Max time a request may wait for a slot")
+    admission_max_queued_per_session: int = Field(default=4, ge=1, description="Max waiting requests per session (429 beyond)")
+    
+    # Condense-question Settings
+    condense_gate_enabled: bool = Field(default=True, description="Skip the condense LLM call for standalone follow-ups")
+    condense_history_window: int = Field(default=4, ge=1, description="Recent messages included in the condense memo key")
+    condense_memo_size: int = Field(default=1024, ge=1, description="Max memoised rephrasings")
     
     # Memory Settings
     max_history_per_session: int = Field(default=50, ge=1, description="Max chat history per session")
     session_timeout_minutes: int = Field(default=30, ge=5, le=1440, description="Session inactivity timeout in minutes")
     cleanup_interval_seconds: int = Field(default=60, ge=5, le=3600, description="Background cleanup interval in seconds")
+    history_token_budget: int = Field(default=2000, ge=0, description="Max tokens of chat history sent to the LLM (0 = no limit)")
+    history_summary_enabled: bool = Field(default=False, description="Summarise turns trimmed from the history window in the background")
+    history_summary_max_tokens: int = Field(default=256, ge=16, description="Max tokens in the rolling history summary")
+    session_backend: str = Field(default="memory", description="Session store: memory, sqlite or redis")
+    session_sqlite_path: str = Field(default="sessions.db", description="SQLite session database path")
+    session_sqlite_batch_size: int = Field(default=64, ge=1, description="Buffered session writes per SQLite commit")
+    session_sqlite_flush_interval_ms: int = Field(default=50, ge=1, description="Max delay before buffered session writes are committed")
+    session_redis_url: str = Field(default="redis://localhost:6379/0", description="Redis URL for the redis session backend")
+    session_redis_prefix: str = Field(default="resumetalk:", description="Key prefix for the redis session backend")
     
     # Email Settings (optional)
     email_address: str = Field(default="", description="Email for notifications")
     email_app_password: str = Field(default="", description="Email app password")
     smtp_server: str = Field(default="smtp.gmail.com", description="SMTP server")
     smtp_port: int = Field(default=465, description="SMTP port")
+    smtp_use_ssl: bool = Field(default=True, description="Use implicit TLS (SMTP_SSL) for the SMTP connection")
+    
+    # Notification Outbox Settings
+    outbox_max_queue: int = Field(default=1000, ge=1, description="Max queued notifications before new ones are dropped")
+    outbox_batch_window_seconds: float = Field(default=30.0, ge=0.0, description="Window for batching notifications into one digest")
+    outbox_max_retries: int = Field(default=3, ge=0, description="Send retries per digest")
+    outbox_retry_backoff_seconds: float = Field(default=2.0, ge=0.0, description="Initial retry backoff (doubles per attempt)")
+    outbox_dedupe_ttl_seconds: float = Field(default=3600.0, ge=0.0, description="Suppress repeat notifications for the same question within this window")
 
 settings = Settings()
\ No newline at end of file
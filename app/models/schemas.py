@@ -21,6 +21,14 @@ class ChatRequest(BaseModel):
         description="Session identifier",
         examples=["user123", "interviewer1"]
     )
+    candidate_id: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=100,
+        pattern=r"^[A-Za-z0-9_-]+$",
+        description="Candidate whose resume to query; omit for the default resume",
+        examples=["jane_doe"]
+    )
 
 class ChatResponse(BaseModel):
     model_config = ConfigDict(
@@ -28,6 +36,10 @@ class ChatResponse(BaseModel):
         extra="forbid"
     )
     response: str = Field(description="AI response to the question")
+    timings: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Per-stage milliseconds, LLM tokens and cache flags for this request (only with DEBUG_TIMINGS)"
+    )
 
 class HealthResponse(BaseModel):
     status: str = Field(description="Service health status")
@@ -41,4 +53,14 @@ class SessionHistoryResponse(BaseModel):
 
 class SessionClearResponse(BaseModel):
     message: str = Field(description="Operation result message")
-    success: bool = Field(description="Whether operation succeeded")
\ No newline at end of file
+    success: bool = Field(description="Whether operation succeeded")
+class IndexRebuildStatus(BaseModel):
+    state: str = Field(description="idle, running, succeeded or failed")
+    serving_generation: int = Field(description="Index generation answering requests (increments on every swap)")
+    ready: bool = Field(description="Whether a chain is serving requests")
+    force_delete: Optional[bool] = Field(default=None, description="Whether the last rebuild re-embedded every chunk")
+    started_at: Optional[str] = Field(default=None, description="Start of the last rebuild (UTC, ISO 8601)")
+    finished_at: Optional[str] = Field(default=None, description="End of the last rebuild (UTC, ISO 8601)")
+    duration_seconds: Optional[float] = Field(default=None, description="Duration of the last rebuild")
+    generation: Optional[int] = Field(default=None, description="Generation when the last rebuild started or finished")
+    error: Optional[str] = Field(default=None, description="Error of the last failed rebuild")
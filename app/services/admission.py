@@ -0,0 +1,239 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# Histogram upper bounds: queue wait in milliseconds, queue depth seen by arriving requests
+_WAIT_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+_DEPTH_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted in time; status_code is 429 (per-session limit) or 503."""
+
+    def __init__(self, reason: str, retry_after: int, status_code: int = 503):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class _Histogram:
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.n += 1
+
+    def cumulative(self) -> List[int]:
+        """Counts of observations <= each bound, +Inf (all observations) last, as Prometheus _bucket expects."""
+        counts, running = [], 0
+        for count in self.counts:
+            running += count
+            counts.append(running)
+        return counts
+
+    def snapshot(self) -> Dict:
+        labels = [f"le_{b:g}" for b in self.bounds] + ["inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.n,
+            "mean": round(self.total / self.n, 2) if self.n else 0.0,
+        }
+
+
+class Ticket:
+    """A granted slot. release() is idempotent, so it can be called from several cleanup paths."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._start = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.perf_counter() - self._start)
+
+
+class AdmissionController:
+    """
+    Concurrency limiter for LLM-bound work with a bounded, per-session fair wait queue.
+
+    At most `max_concurrent` slots are held at once. Further requests wait in per-session FIFO
+    queues that are served round-robin across sessions, so one chatty session can't starve the
+    others. A request is rejected up front when the queue is full, when its session already has
+    `max_queued_per_session` waiting (429), or when its expected wait exceeds `queue_timeout`
+    (503). One that is still queued at the deadline is rejected as well. retry_after is derived
+    from the queue length and a moving average of slot hold times.
+    max_concurrent=0 disables admission control.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queue: int = 256,
+        queue_timeout_seconds: float = 10.0,
+        max_queued_per_session: int = 4,
+        initial_service_seconds: float = 2.0,
+    ):
+        self.max_concurrent = max(0, max_concurrent)
+        self._max_queue = max(0, max_queue)
+        self._timeout = max(0.0, queue_timeout_seconds)
+        self._max_per_session = max(1, max_queued_per_session)
+        self._active = 0
+        self._queued = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        # Moving average of how long a slot is held (seconds)
+        self._service_time = initial_service_seconds
+        self._wait_ms = _Histogram(_WAIT_BUCKETS_MS)
+        self._depth = _Histogram(_DEPTH_BUCKETS)
+        self._max_depth = 0
+        self._counters = {
+            "admitted": 0,
+            "admitted_after_wait": 0,
+            "rejected_queue_full": 0,
+            "rejected_expected_wait": 0,
+            "rejected_session_limit": 0,
+            "timed_out": 0,
+            "cancelled_while_queued": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def _expected_wait(self, position: int) -> float:
+        return position / self.max_concurrent * self._service_time
+
+    def _retry_after(self, position: int) -> int:
+        return max(1, math.ceil(self._expected_wait(position)))
+
+    def _reject(self, counter: str, reason: str, position: int, status_code: int = 503) -> AdmissionRejected:
+        self._counters[counter] += 1
+        return AdmissionRejected(reason, self._retry_after(position), status_code)
+
+    async def acquire(self, session_id: Optional[str] = None) -> Ticket:
+        """Wait for a slot (raises AdmissionRejected). Release the returned ticket when done."""
+        if not self.enabled:
+            return Ticket(self)
+
+        self._depth.observe(self._queued)
+        if self._active < self.max_concurrent and self._queued == 0:
+            self._active += 1
+            self._counters["admitted"] += 1
+            self._wait_ms.observe(0.0)
+            return Ticket(self)
+
+        position = self._queued + 1
+        if self._queued >= self._max_queue:
+            raise self._reject("rejected_queue_full", "queue full", position)
+        if self._expected_wait(position) > self._timeout:
+            raise self._reject("rejected_expected_wait", "expected wait exceeds deadline", position)
+        waiter = asyncio.get_running_loop().create_future()
+        # Callers without a session (internal jobs, benchmarks) each get their own queue
+        key = session_id or f"anonymous-{id(waiter)}"
+        queue = self._queues.get(key)
+        if queue is not None and len(queue) >= self._max_per_session:
+            raise self._reject("rejected_session_limit", "too many queued requests for this session", len(queue) + 1, 429)
+
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append(waiter)
+        self._queued += 1
+        self._max_depth = max(self._max_depth, self._queued)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self._timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller went away: hand the slot back
+                self._release(None)
+            else:
+                self._counters["cancelled_while_queued"] += 1
+                self._dequeue(key, waiter)
+            raise
+        if not waiter.done():
+            self._dequeue(key, waiter)
+            raise self._reject("timed_out", "queue wait deadline exceeded", self._queued + 1)
+
+        self._counters["admitted"] += 1
+        self._counters["admitted_after_wait"] += 1
+        self._wait_ms.observe((time.perf_counter() - start) * 1000)
+        return Ticket(self)
+
+    @asynccontextmanager
+    async def slot(self, session_id: Optional[str] = None) -> AsyncIterator[None]:
+        ticket = await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    def _dequeue(self, key: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[key]
+        waiter.cancel()
+
+    def _release(self, held_seconds: Optional[float]) -> None:
+        if not self.enabled:
+            return
+        if held_seconds is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * held_seconds
+        self._active -= 1
+        # Hand freed slots to the next session in round-robin order
+        while self._active < self.max_concurrent and self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+
+    def wait_histogram(self) -> Tuple[List[float], List[int], float]:
+        """Queue wait of admitted requests for /metrics: bounds in seconds, cumulative counts (+Inf last), sum in seconds."""
+        return [b / 1000 for b in self._wait_ms.bounds], self._wait_ms.cumulative(), self._wait_ms.total / 1000
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "enabled": self.enabled,
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "max_queue_depth": self._max_depth,
+            "queued_sessions": len(self._queues),
+            "avg_service_seconds": round(self._service_time, 3),
+            "queue_wait_ms": self._wait_ms.snapshot(),
+            "queue_depth_on_arrival": self._depth.snapshot(),
+        }
+
+
+# Global instance - shared by every RAG service, since the provider rate limit is process-wide
+admission_controller = AdmissionController(
+    max_concurrent=settings.admission_max_concurrent,
+    max_queue=settings.admission_max_queue,
+    queue_timeout_seconds=settings.admission_queue_timeout_seconds,
+    max_queued_per_session=settings.admission_max_queued_per_session,
+)
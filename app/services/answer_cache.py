@@ -0,0 +1,262 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+
+
+@dataclass
+class _Entry:
+    id: int
+    answer: str
+    expires_at: float
+    has_vector: bool
+
+
+class AnswerCache:
+    """
+    Two-tier TTL/LRU cache of final answers keyed on the standalone question.
+
+    - Exact tier: normalised question text -> answer.
+    - Semantic tier: a FAISS inner-product index over the question embeddings, used to
+      match near-duplicate phrasings above `similarity_threshold` (cosine).
+
+    Entries are tagged with the resume hash they were produced from; binding a new
+    hash drops everything. A chain writes through for_resume(hash), so answers still being
+    produced from the previous resume when a rebuild binds the new one are dropped.
+
+    The semantic tier embeds the question exactly as given, the same text the retriever embeds
+    next on a miss, so with the query-embedding cache in front of `embeddings` (get_embeddings)
+    a question is sent to the provider once per request, not twice. Callers pass semantic=False
+    for questions the retriever answers without an embedding (lexical fast path), which then use
+    the exact tier only rather than paying for an embedding just for the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: int = 3600,
+        similarity_threshold: float = 0.95,
+        semantic: bool = True,
+    ):
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._threshold = similarity_threshold
+        self._semantic = semantic
+        self._lock = threading.Lock()
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._keys_by_id: Dict[int, str] = {}
+        self._next_id = 0
+        self._index: Optional["faiss.Index"] = None
+        # Question vectors computed by a lookup miss, reused when the answer is stored
+        self._pending_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self._embeddings = None
+        self.resume_hash: Optional[str] = None
+        self._counters = {
+            "exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "stale_writes": 0,
+        }
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        text = " ".join(question.lower().split())
+        return re.sub(r"[\s?.!]+$", "", text)
+
+    def bind(self, embeddings: Any, resume_hash: str) -> None:
+        """Attach the embeddings used for the semantic tier; invalidates the cache if the resume changed."""
+        with self._lock:
+            self._embeddings = embeddings
+            if resume_hash != self.resume_hash:
+                if self._entries:
+                    print(f"🧹 Answer cache invalidated ({len(self._entries)} entries): resume changed")
+                self._clear_locked()
+                self.resume_hash = resume_hash
+
+    def for_resume(self, resume_hash: str) -> "ResumeAnswerCache":
+        """The cache as used by a chain built from the resume with this hash."""
+        return ResumeAnswerCache(self, resume_hash)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self._keys_by_id.clear()
+        self._pending_vectors.clear()
+        self._index = None
+
+    # ------------------------------------------------------------------ lookup
+
+    def get(self, question: str, semantic: bool = True) -> Optional[str]:
+        key = self.normalize(question)
+        semantic = semantic and self._semantic_ready()
+        answer = self._get_exact(key, semantic)
+        if answer is not None or not semantic:
+            return answer
+        return self._get_semantic(key, self._embeddings.embed_query(question))
+
+    async def aget(self, question: str, semantic: bool = True) -> Optional[str]:
+        key = self.normalize(question)
+        semantic = semantic and self._semantic_ready()
+        answer = self._get_exact(key, semantic)
+        if answer is not None or not semantic:
+            return answer
+        return self._get_semantic(key, await self._embeddings.aembed_query(question))
+
+    def _semantic_ready(self) -> bool:
+        return self._semantic and self._embeddings is not None
+
+    def _get_exact(self, key: str, semantic: bool) -> Optional[str]:
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is not None:
+                self._counters["exact_hits"] += 1
+                return entry.answer
+            if not semantic:
+                self._counters["misses"] += 1
+            return None
+
+    def _get_semantic(self, key: str, vector) -> Optional[str]:
+        vec = self._as_unit_row(vector)
+        with self._lock:
+            self._pending_vectors[key] = vec
+            while len(self._pending_vectors) > self._max_entries:
+                self._pending_vectors.popitem(last=False)
+
+            if self._index is not None and self._index.ntotal:
+                scores, ids = self._index.search(vec, 1)
+                score, entry_id = float(scores[0][0]), int(ids[0][0])
+                match = self._keys_by_id.get(entry_id)
+                if entry_id >= 0 and score >= self._threshold and match is not None:
+                    entry = self._live_entry(match)
+                    if entry is not None:
+                        self._counters["semantic_hits"] += 1
+                        return entry.answer
+            self._counters["misses"] += 1
+            return None
+
+    def _live_entry(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove_locked(key)
+            self._counters["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    # ------------------------------------------------------------------- store
+
+    def put(self, question: str, answer: str, resume_hash: Optional[str] = None, semantic: bool = True) -> None:
+        """Store an answer; with resume_hash, only if the cache is still bound to that resume."""
+        key = self.normalize(question)
+        vec = None
+        if semantic and self._semantic_ready():
+            with self._lock:
+                vec = self._pending_vectors.pop(key, None)
+            if vec is None:
+                vec = self._as_unit_row(self._embeddings.embed_query(question))
+        self._store(key, answer, vec, resume_hash)
+
+    async def aput(self, question: str, answer: str, resume_hash: Optional[str] = None, semantic: bool = True) -> None:
+        key = self.normalize(question)
+        vec = None
+        if semantic and self._semantic_ready():
+            with self._lock:
+                vec = self._pending_vectors.pop(key, None)
+            if vec is None:
+                vec = self._as_unit_row(await self._embeddings.aembed_query(question))
+        self._store(key, answer, vec, resume_hash)
+
+    def _store(self, key: str, answer: str, vec: Optional[np.ndarray], resume_hash: Optional[str] = None) -> None:
+        if not answer:
+            return
+        with self._lock:
+            # Checked under the lock, so a bind() to another resume can't slip in before the write
+            if resume_hash is not None and resume_hash != self.resume_hash:
+                self._counters["stale_writes"] += 1
+                return
+            if key in self._entries:
+                self._remove_locked(key)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            if vec is not None:
+                if self._index is None or self._index.d != vec.shape[1]:
+                    import faiss
+
+                    self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vec.shape[1]))
+                self._index.add_with_ids(vec, np.array([entry_id], dtype="int64"))
+
+            self._entries[key] = _Entry(
+                id=entry_id,
+                answer=answer,
+                expires_at=time.monotonic() + self._ttl,
+                has_vector=vec is not None,
+            )
+            self._keys_by_id[entry_id] = key
+
+            while len(self._entries) > self._max_entries:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._counters["evictions"] += 1
+
+    def _remove_locked(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._keys_by_id.pop(entry.id, None)
+        if entry.has_vector and self._index is not None:
+            self._index.remove_ids(np.array([entry.id], dtype="int64"))
+
+    @staticmethod
+    def _as_unit_row(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype="float32").reshape(1, -1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    # ------------------------------------------------------------------- stats
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "resume_sha256": self.resume_hash,
+            }
+
+
+class ResumeAnswerCache:
+    """
+    AnswerCache as seen by the chain of one resume (same get/aget/put/aput). Once the cache is
+    bound to another resume, requests still running on this chain neither read nor write it.
+    """
+
+    def __init__(self, cache: AnswerCache, resume_hash: str):
+        self.cache = cache
+        self.resume_hash = resume_hash
+
+    def _current(self) -> bool:
+        return self.cache.resume_hash == self.resume_hash
+
+    def get(self, question: str, semantic: bool = True) -> Optional[str]:
+        return self.cache.get(question, semantic) if self._current() else None
+
+    async def aget(self, question: str, semantic: bool = True) -> Optional[str]:
+        return await self.cache.aget(question, semantic) if self._current() else None
+
+    def put(self, question: str, answer: str, semantic: bool = True) -> None:
+        self.cache.put(question, answer, resume_hash=self.resume_hash, semantic=semantic)
+
+    async def aput(self, question: str, answer: str, semantic: bool = True) -> None:
+        await self.cache.aput(question, answer, resume_hash=self.resume_hash, semantic=semantic)
@@ -0,0 +1,111 @@
+import asyncio
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict
+from app.core.config import settings
+from app.services.rag_service import RAGService
+
+_CANDIDATE_ID = re.compile(r"^[A-Za-z0-9_-]{1,100}$")
+
+
+class CandidateNotFoundError(LookupError):
+    """Raised when no resume exists for the requested candidate."""
+
+
+class CandidatePool:
+    """
+    In-process LRU pool of per-candidate RAG services.
+
+    Each candidate has its resume at `<resume_dir>/<candidate_id>.pdf` and its own FAISS
+    index directory at `<index_dir>/<candidate_id>`. Services are loaded lazily on first
+    use; concurrent first requests for the same candidate share a single load. Least
+    recently used candidates are evicted once the pool exceeds its entry count or its
+    approximate memory budget.
+    """
+
+    def __init__(self, resume_dir: str, index_dir: str, max_entries: int = 32, max_memory_mb: int = 512):
+        self.resume_dir = Path(resume_dir)
+        self.index_dir = Path(index_dir)
+        self._max_entries = max(1, max_entries)
+        self._max_memory_bytes = max_memory_mb * 1024 * 1024
+        self._services: "OrderedDict[str, RAGService]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._counters = {"hits": 0, "loads": 0, "load_waits": 0, "load_failures": 0, "evictions": 0}
+
+    def resume_path(self, candidate_id: str) -> Path:
+        if not _CANDIDATE_ID.match(candidate_id):
+            raise CandidateNotFoundError(candidate_id)
+        return self.resume_dir / f"{candidate_id}.pdf"
+
+    def index_path(self, candidate_id: str) -> Path:
+        return self.index_dir / candidate_id
+
+    async def get(self, candidate_id: str) -> RAGService:
+        """Return the ready service for a candidate, loading it on a miss."""
+        service = self._services.get(candidate_id)
+        if service is not None and service.is_ready():
+            self._services.move_to_end(candidate_id)
+            self._counters["hits"] += 1
+            return service
+
+        # Single-flight: concurrent misses share one load task. Callers await it through
+        # shield() so a disconnecting client can't cancel a load others are waiting on.
+        task = self._loading.get(candidate_id)
+        if task is None:
+            resume_path = self.resume_path(candidate_id)
+            if not resume_path.is_file():
+                raise CandidateNotFoundError(candidate_id)
+            task = asyncio.ensure_future(self._load(candidate_id, resume_path))
+            self._loading[candidate_id] = task
+        else:
+            self._counters["load_waits"] += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, candidate_id: str, resume_path: Path) -> RAGService:
+        try:
+            service = RAGService(
+                resume_path=str(resume_path),
+                vectorstore_path=str(self.index_path(candidate_id)),
+            )
+            await service.initialize()
+        except Exception:
+            self._counters["load_failures"] += 1
+            raise
+        finally:
+            self._loading.pop(candidate_id, None)
+
+        self._counters["loads"] += 1
+        self._services[candidate_id] = service
+        self._services.move_to_end(candidate_id)
+        self._evict()
+        return service
+
+    def _evict(self) -> None:
+        # Never evict the most recently used entry, even if it alone exceeds the budget
+        while len(self._services) > 1 and (
+            len(self._services) > self._max_entries or self.memory_bytes() > self._max_memory_bytes
+        ):
+            candidate_id, _ = self._services.popitem(last=False)
+            self._counters["evictions"] += 1
+            print(f"♻️ Evicted candidate index from pool: {candidate_id}")
+
+    def memory_bytes(self) -> int:
+        return sum(service.memory_bytes for service in self._services.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "loaded": len(self._services),
+            "loading": len(self._loading),
+            "memory_bytes": self.memory_bytes(),
+            "max_memory_bytes": self._max_memory_bytes,
+        }
+
+
+candidate_pool = CandidatePool(
+    resume_dir=settings.candidates_resume_dir,
+    index_dir=settings.candidates_index_dir,
+    max_entries=settings.candidate_pool_max_entries,
+    max_memory_mb=settings.candidate_pool_max_memory_mb,
+)
@@ -0,0 +1,85 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Words that point back into the conversation. Personal pronouns (he/she/they/...) are left out
+# on purpose: in this app they refer to the candidate, which the QA prompt already assumes.
+_REFERENCE_WORDS = {
+    "it", "its", "this", "that", "these", "those", "there", "then", "same", "such",
+    "former", "latter", "above", "previous", "earlier", "else", "more", "also", "too",
+    "another", "other", "others", "one", "ones",
+}
+# Elliptical openers that only make sense as a follow-up ("What about Kafka?")
+_FOLLOW_UP_OPENERS = re.compile(
+    r"^(what about|how about|and|but|also|why|how so|which one|elaborate|expand|"
+    r"tell me more|go on|continue|more on|same for)\b"
+)
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+class CondenseGate:
+    """
+    Decides whether a follow-up question needs the condense-question LLM call.
+
+    Questions with no back-references are used as-is; rephrasings that were needed
+    are memoised on (recent history window, question).
+    """
+
+    def __init__(self, history_window: int = 4, memo_size: int = 1024):
+        self._history_window = max(1, history_window)
+        self._memo_size = max(1, memo_size)
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"llm_calls": 0, "skipped_standalone": 0, "memo_hits": 0}
+
+    @staticmethod
+    def needs_rephrase(question: str) -> bool:
+        text = question.lower().strip()
+        if _FOLLOW_UP_OPENERS.match(text):
+            return True
+        return any(word in _REFERENCE_WORDS for word in _WORD.findall(text))
+
+    def _memo_key(self, question: str, chat_history: List) -> str:
+        h = hashlib.sha256()
+        for message in chat_history[-self._history_window:]:
+            h.update(f"{message.type}\0{message.content}\0".encode("utf-8"))
+        h.update(" ".join(question.lower().split()).encode("utf-8"))
+        return h.hexdigest()
+
+    def lookup(self, question: str, chat_history: List) -> Optional[str]:
+        """Return the standalone question without an LLM call, or None if one is needed."""
+        if not self.needs_rephrase(question):
+            with self._lock:
+                self._counters["skipped_standalone"] += 1
+            return question
+
+        key = self._memo_key(question, chat_history)
+        with self._lock:
+            standalone = self._memo.get(key)
+            if standalone is not None:
+                self._memo.move_to_end(key)
+                self._counters["memo_hits"] += 1
+                return standalone
+            self._counters["llm_calls"] += 1
+            return None
+
+    def remember(self, question: str, chat_history: List, standalone: str) -> None:
+        key = self._memo_key(question, chat_history)
+        with self._lock:
+            self._memo[key] = standalone
+            self._memo.move_to_end(key)
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            avoided = self._counters["skipped_standalone"] + self._counters["memo_hits"]
+            total = avoided + self._counters["llm_calls"]
+            return {
+                **self._counters,
+                "avoided": avoided,
+                "avoided_rate": round(avoided / total, 4) if total else 0.0,
+                "memo_size": len(self._memo),
+            }
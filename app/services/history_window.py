@@ -0,0 +1,299 @@
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+Exchange = Tuple[str, str]
+Summarize = Callable[[str, List[Exchange]], str]
+
+# Chat-format overhead per message (role + separators), as counted by OpenAI
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+_encoding_unavailable = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # No tiktoken or no cached BPE file (offline); fall back to a character estimate
+            _encoding_unavailable = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken's cl100k_base, or ~4 characters per token without it."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+class _Entry:
+    __slots__ = ("exchange", "messages", "tokens")
+
+    def __init__(self, question: str, answer: str):
+        self.exchange = (question, answer)
+        self.messages = (HumanMessage(content=question), AIMessage(content=answer))
+        self.tokens = count_tokens(question) + count_tokens(answer) + 2 * _MESSAGE_OVERHEAD_TOKENS
+
+
+class _Window:
+    __slots__ = (
+        "entries", "tokens", "appended", "summary", "summary_message", "pending", "summarizing", "messages", "last_used",
+    )
+
+    def __init__(self):
+        self.entries: Deque[_Entry] = deque()
+        # Exchanges appended to the session when the window was last synced (see SessionBackend.get_counted)
+        self.appended = 0
+        self.tokens = 0
+        self.summary = ""
+        self.summary_message: Optional[SystemMessage] = None
+        # Exchanges trimmed from the window and not yet folded into the summary
+        self.pending: List[Exchange] = []
+        self.summarizing = False
+        # Flattened message list, rebuilt only when the window changes
+        self.messages: Optional[List] = None
+        self.last_used = time.time()
+
+
+class HistoryWindows:
+    """
+    Per-session LangChain message windows, maintained incrementally and trimmed to a token budget.
+
+    Each window caches the HumanMessage/AIMessage pairs and their token counts, so a new exchange
+    costs one append instead of rebuilding the whole list. New exchanges are found by the session's
+    appended-exchange count, so identical repeated exchanges are still told apart. The oldest exchanges are dropped while
+    the window exceeds `token_budget`; the newest exchange is always kept. With a `summarize`
+    function, dropped exchanges are folded into a rolling summary by a background thread and
+    prepended as a SystemMessage (at most `summary_max_tokens`). Requests never wait on it.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        summarize: Optional[Summarize] = None,
+        summary_max_tokens: int = 256,
+    ):
+        self._budget = max(0, token_budget)
+        self._summarize = summarize
+        self._summary_max_tokens = max(1, summary_max_tokens)
+        # Least recently used first, so expiry pops stale windows off the front
+        self._windows: "OrderedDict[str, _Window]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._counters = {
+            "hits": 0,
+            "appends": 0,
+            "rebuilds": 0,
+            "trimmed_exchanges": 0,
+            "summaries": 0,
+            "summary_failures": 0,
+        }
+
+    def _trim(self, session_id: str, window: _Window) -> None:
+        trimmed = 0
+        while self._budget and window.tokens > self._budget and len(window.entries) > 1:
+            entry = window.entries.popleft()
+            window.tokens -= entry.tokens
+            trimmed += 1
+            if self._summarize is not None:
+                window.pending.append(entry.exchange)
+        if trimmed:
+            self._counters["trimmed_exchanges"] += trimmed
+            self._schedule_summary(session_id, window)
+
+    def _append(self, session_id: str, window: _Window, exchanges: List[Exchange]) -> None:
+        for question, answer in exchanges:
+            entry = _Entry(question, answer)
+            window.entries.append(entry)
+            window.tokens += entry.tokens
+        window.messages = None
+        self._trim(session_id, window)
+
+    def _rebuild(self, session_id: str, history: List[Exchange], appended: int) -> _Window:
+        old = self._windows.get(session_id)
+        window = _Window()
+        window.appended = appended
+        if old is not None:
+            # Older turns were already summarised (or are queued); keep that progress
+            window.summary, window.summary_message = old.summary, old.summary_message
+            window.pending, window.summarizing = old.pending, old.summarizing
+        # Walk back from the newest exchange until the budget is spent
+        kept = 0
+        for question, answer in reversed(history):
+            entry = _Entry(question, answer)
+            if kept and self._budget and window.tokens + entry.tokens > self._budget:
+                break
+            window.entries.appendleft(entry)
+            window.tokens += entry.tokens
+            kept += 1
+        if old is None and self._summarize is not None and kept < len(history):
+            window.pending = list(history[:len(history) - kept])
+            self._schedule_summary(session_id, window)
+        self._windows[session_id] = window
+        self._windows.move_to_end(session_id)
+        return window
+
+    def _sync(self, session_id: str, history: List[Exchange], appended: int) -> _Window:
+        """Bring the cached window in line with the stored history (append-only fast path)."""
+        window = self._windows.get(session_id)
+        if window is not None and window.entries:
+            new = appended - window.appended
+            # The tail check catches a session deleted and recreated elsewhere with the same count
+            if new == 0 and window.entries[-1].exchange == history[-1]:
+                self._counters["hits"] += 1
+                return window
+            if 0 < new < len(history) and window.entries[-1].exchange == history[-1 - new]:
+                self._counters["appends"] += 1
+                window.appended = appended
+                # Stored history is capped (max_history); what it no longer holds leaves the window too
+                while len(window.entries) + new > len(history):
+                    window.tokens -= window.entries.popleft().tokens
+                self._append(session_id, window, history[-new:])
+                return window
+        self._counters["rebuilds"] += 1
+        return self._rebuild(session_id, history, appended)
+
+    def messages(self, session_id: str, history: List[Exchange], appended: int) -> List:
+        """
+        LangChain messages for the session: optional summary, then the newest exchanges in budget.
+        `appended` is the number of exchanges ever appended to the session (SessionBackend.get_counted).
+        """
+        if not history:
+            self.discard(session_id)
+            return []
+        with self._lock:
+            window = self._sync(session_id, history, appended)
+            self._touch(session_id, window)
+            if window.messages is None:
+                messages = [window.summary_message] if window.summary_message is not None else []
+                for entry in window.entries:
+                    messages.extend(entry.messages)
+                window.messages = messages
+            return list(window.messages)
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._windows.pop(session_id, None)
+
+    def _touch(self, session_id: str, window: _Window) -> None:
+        window.last_used = time.time()
+        self._windows.move_to_end(session_id)
+
+    def prune(self, cutoff: float) -> int:
+        """Drop windows unused since before cutoff (epoch seconds). Returns the number dropped.
+
+        Only the expired windows at the front are visited, so a cleanup costs O(expired), not O(sessions).
+        """
+        dropped = 0
+        with self._lock:
+            while self._windows:
+                session_id, window = next(iter(self._windows.items()))
+                if window.last_used >= cutoff:
+                    break
+                del self._windows[session_id]
+                dropped += 1
+        return dropped
+
+    # --- background summarisation ---
+
+    def _schedule_summary(self, session_id: str, window: _Window) -> None:
+        if self._summarize is None or window.summarizing or not window.pending:
+            return
+        window.summarizing = True
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="history-summarizer", daemon=True)
+            self._thread.start()
+        self._queue.put(session_id)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                session_id = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._summarize_session(session_id)
+
+    def _summarize_session(self, session_id: str) -> None:
+        with self._lock:
+            window = self._windows.get(session_id)
+            if window is None:
+                return
+            previous, exchanges = window.summary, list(window.pending)
+        try:
+            summary = truncate_to_tokens(self._summarize(previous, exchanges).strip(), self._summary_max_tokens)
+        except Exception as e:
+            print(f"⚠️ History summarisation failed for session {session_id}: {e}")
+            with self._lock:
+                self._counters["summary_failures"] += 1
+                window.summarizing = False
+            return
+        with self._lock:
+            window.summary = summary
+            window.summary_message = SystemMessage(content=f"Summary of the earlier conversation: {summary}")
+            # More turns may have been trimmed while the LLM was running
+            del window.pending[:len(exchanges)]
+            window.summarizing = False
+            window.messages = None
+            self._counters["summaries"] += 1
+            # Follow-up round for turns trimmed meanwhile
+            self._schedule_summary(session_id, window)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            windows = list(self._windows.values())
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["appends"] + counters["rebuilds"]
+        return {
+            **counters,
+            "windows": len(windows),
+            "token_budget": self._budget,
+            "avg_window_tokens": round(sum(w.tokens for w in windows) / len(windows), 1) if windows else 0.0,
+            "reuse_rate": round((counters["hits"] + counters["appends"]) / lookups, 4) if lookups else 0.0,
+            "summarization": self._summarize is not None,
+            "pending_summaries": self._queue.qsize(),
+        }
+
+
+def llm_summarizer(max_tokens: int) -> Summarize:
+    """Summarise with the configured chat model (imported lazily; only used when enabled)."""
+    llm = None
+
+    def summarize(previous: str, exchanges: List[Exchange]) -> str:
+        nonlocal llm
+        if llm is None:
+            from rag_chain import _get_llm
+            llm = _get_llm()
+        transcript = "\n".join(f"Interviewer: {q}\nAssistant: {a}" for q, a in exchanges)
+        prompt = (
+            "You maintain a running summary of an interview about a candidate's resume. "
+            f"Update the summary with the new exchanges in at most {max_tokens} tokens. "
+            "Keep names, companies, technologies, dates and open questions; drop pleasantries.\n\n"
+            f"Current summary:\n{previous or '(none)'}\n\nNew exchanges:\n{transcript}\n\nUpdated summary:"
+        )
+        return llm.invoke(prompt).content
+
+    return summarize
@@ -1,19 +1,33 @@
-from typing import Dict, List, Tuple
-from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import asyncio
 import threading
 import time
 from app.core.config import settings
-from langchain_core.messages import HumanMessage, AIMessage
+from app.services.session_backends import InMemorySessionBackend, SessionBackend, create_session_backend
+from app.services.history_window import HistoryWindows, llm_summarizer
 
 class ChatMemoryService:
-    def __init__(self, session_timeout_minutes: int = 30, cleanup_interval_seconds: int = 60):
-        # Modern typing with better structure
-        self._memory: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
-        # Track last activity time for each session
-        self._last_activity: Dict[str, datetime] = {}
+    def __init__(
+        self,
+        session_timeout_minutes: int = 30,
+        cleanup_interval_seconds: int = 60,
+        max_history: Optional[int] = None,
+        backend: Optional[SessionBackend] = None,
+        windows: Optional[HistoryWindows] = None,
+    ):
+        # Storage is pluggable (memory / sqlite / redis); defaults to per-process memory
+        self._backend = backend or InMemorySessionBackend(
+            max_history=max_history or settings.max_history_per_session
+        )
+        # Cached, token-budgeted LangChain message lists per session
+        self._windows = windows or HistoryWindows(token_budget=0)
         self._session_timeout = timedelta(minutes=session_timeout_minutes)
         self._cleanup_interval_seconds = max(5, int(cleanup_interval_seconds))
+        # Inline expiry on writes is throttled, and only for the in-memory backend: shared
+        # (blocking) backends are swept by the cleanup thread alone
+        self._last_inline_expiry = 0.0
+        self._inline_expiry_lock = threading.Lock()
 
         # Background cleanup thread (daemon)
         self._stop_event = threading.Event()
@@ -25,21 +39,27 @@ class ChatMemoryService:
             except RuntimeError:
                 # In rare cases, thread may already be started in hot-reload contexts
                 pass
-    
+
+    @property
+    def backend(self) -> SessionBackend:
+        return self._backend
+
     def _cleanup_inactive_sessions(self) -> int:
         """Remove sessions that have been inactive for too long. Returns count of removed sessions."""
-        now = datetime.now()
-        inactive_sessions = [
-            session_id for session_id, last_time in self._last_activity.items()
-            if now - last_time > self._session_timeout
-        ]
-        
-        for session_id in inactive_sessions:
-            if session_id in self._memory:
-                del self._memory[session_id]
-            del self._last_activity[session_id]
-        
-        return len(inactive_sessions)
+        cutoff = time.time() - self._session_timeout.total_seconds()
+        self._windows.prune(cutoff)
+        return self._backend.expire(cutoff)
+
+    def _maybe_cleanup(self) -> None:
+        """Expire due in-memory sessions at most once per second from the request path."""
+        if self._backend.blocking:
+            return
+        now = time.monotonic()
+        with self._inline_expiry_lock:
+            if now - self._last_inline_expiry < 1.0:
+                return
+            self._last_inline_expiry = now
+        self._cleanup_inactive_sessions()
 
     def _run_cleanup_loop(self) -> None:
         """Periodically cleanup inactive sessions in the background."""
@@ -58,83 +78,123 @@ class ChatMemoryService:
     def stop(self) -> None:
         """Signal the background cleanup thread to stop (optional)."""
         self._stop_event.set()
-    
+
+    def close(self) -> None:
+        """Stop the cleanup thread and flush/close the session backend."""
+        self.stop()
+        self._windows.stop()
+        self._backend.close()
+
+    async def _offload(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn in a worker thread if the backend blocks (SQLite, Redis), inline otherwise."""
+        if self._backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
     def add_exchange(self, session_id: str, question: str, answer: str) -> None:
         """Add a question-answer pair to session memory with size limiting"""
-        # Update activity timestamp
-        self._last_activity[session_id] = datetime.now()
-        
-        # Cleanup inactive sessions periodically
-        self._cleanup_inactive_sessions()
-        
-        self._memory[session_id].append((question, answer))
-        
-        # Use settings-based limit
-        max_history = settings.max_history_per_session
-        if len(self._memory[session_id]) > max_history:
-            # Keep most recent messages
-            self._memory[session_id] = self._memory[session_id][-max_history:]
-    
+        # The backend updates the activity timestamp and trims to max history
+        # The session's cached window picks the exchange up on its next read
+        self._backend.append(session_id, question, answer, time.time())
+
+        # Expire inactive sessions (only inspects sessions that are actually due)
+        self._maybe_cleanup()
+
     def get_history(self, session_id: str) -> List[Tuple[str, str]]:
         """Get chat history for a session"""
+        history = self._backend.get(session_id)
+        if history is None:
+            return []
         # Update activity timestamp when accessing history
-        if session_id in self._memory:
-            self._last_activity[session_id] = datetime.now()
-        return self._memory.get(session_id, [])
-    
+        self._backend.touch(session_id, time.time())
+        return history
+
     def clear_session(self, session_id: str) -> bool:
         """Clear chat history for a session. Returns True if session existed."""
-        existed = (session_id in self._memory) or (session_id in self._last_activity)
-        if session_id in self._memory:
-            del self._memory[session_id]
-        if session_id in self._last_activity:
-            del self._last_activity[session_id]
-        return existed
-    
+        self._windows.discard(session_id)
+        return self._backend.delete(session_id)
+
     def get_langchain_format(self, session_id: str) -> List:
-        """Get history in LangChain message format for MessagesPlaceholder"""
-        # Update activity timestamp
-        if session_id in self._memory:
-            self._last_activity[session_id] = datetime.now()
-        
-        history = self.get_history(session_id)
-        messages = []
-        for question, answer in history:
-            messages.append(HumanMessage(content=question))
-            messages.append(AIMessage(content=answer))
-        return messages
-    
+        """Get history in LangChain message format for MessagesPlaceholder
+
+        Served from the session's cached window: only new exchanges are converted, and the
+        list is trimmed to the configured token budget (plus a rolling summary, if enabled).
+        """
+        counted = self._backend.get_counted(session_id)
+        if counted is None:
+            return self._windows.messages(session_id, [], 0)
+        # Update activity timestamp when accessing history
+        self._backend.touch(session_id, time.time())
+        return self._windows.messages(session_id, *counted)
+
+    # Async variants for request handlers, so shared backends don't block the event loop
+
+    async def aadd_exchange(self, session_id: str, question: str, answer: str) -> None:
+        await self._offload(self.add_exchange, session_id, question, answer)
+
+    async def aget_history(self, session_id: str) -> List[Tuple[str, str]]:
+        return await self._offload(self.get_history, session_id)
+
+    async def aclear_session(self, session_id: str) -> bool:
+        return await self._offload(self.clear_session, session_id)
+
+    async def aget_langchain_format(self, session_id: str) -> List:
+        return await self._offload(self.get_langchain_format, session_id)
+
+    async def aget_all_sessions(self) -> Dict[str, List[Tuple[str, str]]]:
+        return await self._offload(self.get_all_sessions)
+
+    async def asession_count(self) -> int:
+        return await self._offload(self.session_count)
+
+    async def acleanup_inactive_sessions(self) -> int:
+        return await self._offload(self._cleanup_inactive_sessions)
+
     def get_all_sessions(self) -> Dict[str, List[Tuple[str, str]]]:
         """Get all active sessions (new method)"""
         # Cleanup before returning
         self._cleanup_inactive_sessions()
-        return dict(self._memory)
-    
+        return self._backend.all_sessions()
+
     def session_count(self) -> int:
         """Get number of active sessions"""
         # Cleanup before counting
         self._cleanup_inactive_sessions()
-        return len(self._memory)
-    
+        return self._backend.count()
+
     def get_session_info(self, session_id: str) -> Dict:
         """Get detailed info about a session"""
-        if session_id not in self._memory:
+        history = self._backend.get(session_id)
+        if history is None:
             return {"exists": False}
-        
+
+        last_ts = self._backend.last_activity(session_id)
+        last_activity = datetime.fromtimestamp(last_ts) if last_ts is not None else None
         return {
             "exists": True,
-            "message_count": len(self._memory[session_id]),
-            "last_activity": self._last_activity.get(session_id),
-            "is_active": session_id in self._last_activity and 
-                        (datetime.now() - self._last_activity[session_id]) < self._session_timeout
+            "message_count": len(history),
+            "last_activity": last_activity,
+            "is_active": last_activity is not None and
+                        (datetime.now() - last_activity) < self._session_timeout
         }
 
+    def stats(self) -> Dict:
+        """History window reuse, trimming and summarisation counters"""
+        return self._windows.stats()
+
 # Global instance - timeout and cleanup interval pulled from settings when available
 try:
     chat_memory = ChatMemoryService(
         session_timeout_minutes=settings.session_timeout_minutes,
         cleanup_interval_seconds=getattr(settings, "cleanup_interval_seconds", 60),
+        backend=create_session_backend(settings),
+        windows=HistoryWindows(
+            token_budget=settings.history_token_budget,
+            summarize=llm_summarizer(settings.history_summary_max_tokens) if settings.history_summary_enabled else None,
+            summary_max_tokens=settings.history_summary_max_tokens,
+        ),
     )
-except:
-    # Fallback if settings not loaded yet
-    chat_memory = ChatMemoryService(session_timeout_minutes=30, cleanup_interval_seconds=60)
\ No newline at end of file
+except Exception as e:
+    # Fallback if settings not loaded yet or the configured backend is unavailable
+    print(f"⚠️ Session backend unavailable, using in-memory sessions: {e}")
+    chat_memory = ChatMemoryService(session_timeout_minutes=30, cleanup_interval_seconds=60)
@@ -0,0 +1,246 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from email_sender import SMTPConnection, build_message
+from app.core.config import settings
+
+
+# Put on the queue by stop() to wake a worker waiting out the batch window
+_WAKE = None
+
+
+@dataclass
+class Notification:
+    question: str
+    session_id: str
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class NotificationOutbox:
+    """
+    Bounded outbox for unanswered-question emails, drained by a background thread.
+
+    Notifications arriving within `batch_window_seconds` are deduplicated by question and
+    sent as one digest over a persistent SMTP connection, with exponential-backoff retries.
+    Questions already notified within `dedupe_ttl_seconds` are not sent again.
+    """
+
+    def __init__(
+        self,
+        connection: Optional[SMTPConnection],
+        address: str,
+        max_queue: int = 1000,
+        batch_window_seconds: float = 30.0,
+        max_batch: int = 100,
+        max_retries: int = 3,
+        retry_backoff_seconds: float = 2.0,
+        dedupe_ttl_seconds: float = 3600.0,
+    ):
+        self._connection = connection
+        self._address = address
+        self._queue: "queue.Queue[Optional[Notification]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._window = max(0.0, batch_window_seconds)
+        self._max_batch = max(1, max_batch)
+        self._max_retries = max(0, max_retries)
+        self._backoff = max(0.0, retry_backoff_seconds)
+        self._dedupe_ttl = dedupe_ttl_seconds
+        self._recently_sent: "OrderedDict[str, float]" = OrderedDict()
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "enqueued": 0,
+            "dropped_queue_full": 0,
+            "deduplicated": 0,
+            "emails_sent": 0,
+            "notifications_sent": 0,
+            "send_failures": 0,
+            "retries": 0,
+            "dropped_after_retries": 0,
+        }
+        self._latency = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._connection is not None and bool(self._address)
+
+    def start(self) -> None:
+        """Start the background worker (idempotent)."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush whatever is queued (skipping the batch window) and stop the worker."""
+        self._stop_event.set()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            # A full queue never blocks the worker's get(), so it sees the stop flag right away
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def enqueue(self, question: str, session_id: str) -> bool:
+        """Queue a notification without blocking. Returns False if it was dropped."""
+        if not self.enabled:
+            print("Email not sent: missing EMAIL_ADDRESS or SMTP configuration.")
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait(Notification(question=question, session_id=session_id))
+        except queue.Full:
+            self._count("dropped_queue_full")
+            print("⚠️ Notification outbox full; dropping notification")
+            return False
+        self._count("enqueued")
+        return True
+
+    # ------------------------------------------------------------------ worker
+
+    def _run(self) -> None:
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if first is _WAKE:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if self._stop_event.is_set() or remaining <= 0:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _WAKE:
+                    # Stopping: send the partial batch now; anything still queued follows
+                    break
+                batch.append(item)
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                # Never let the worker die
+                print(f"Failed to deliver notifications: {e}")
+        if self._connection is not None:
+            self._connection.close()
+
+    @staticmethod
+    def _question_key(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def _deliver(self, batch: List[Notification]) -> None:
+        grouped: "OrderedDict[str, List[Notification]]" = OrderedDict()
+        for item in batch:
+            grouped.setdefault(self._question_key(item.question), []).append(item)
+
+        now = time.monotonic()
+        while self._recently_sent and next(iter(self._recently_sent.values())) <= now - self._dedupe_ttl:
+            self._recently_sent.popitem(last=False)
+        fresh = {k: v for k, v in grouped.items() if k not in self._recently_sent}
+        self._count("deduplicated", len(batch) - len(fresh))
+        if not fresh:
+            return
+
+        msg = build_message(*self._compose(list(fresh.values())), address=self._address)
+        for attempt in range(self._max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self._connection.send(msg)
+            except Exception as e:
+                self._count("send_failures")
+                self._connection.close()
+                if attempt == self._max_retries:
+                    self._count("dropped_after_retries", sum(len(v) for v in fresh.values()))
+                    print(f"Failed to send email notification after {attempt + 1} attempt(s): {e}")
+                    return
+                self._count("retries")
+                # Interruptible sleep; a stop request flushes without waiting out the backoff
+                self._stop_event.wait(self._backoff * (2 ** attempt))
+                continue
+            self._record_latency(time.perf_counter() - start)
+            break
+
+        sent_at = time.monotonic()
+        for key in fresh:
+            self._recently_sent[key] = sent_at
+            self._recently_sent.move_to_end(key)
+        self._count("emails_sent")
+        self._count("notifications_sent", len(fresh))
+
+    @staticmethod
+    def _compose(groups: List[List[Notification]]):
+        if len(groups) == 1:
+            subject = "Interview Question - Needs Review"
+        else:
+            subject = f"Interview Questions - {len(groups)} Need Review"
+        sections = []
+        for items in groups:
+            sessions = sorted({item.session_id for item in items})
+            sections.append(
+                f"Question: {items[0].question}\n"
+                f"Asked: {len(items)} time(s)\n"
+                f"Sessions: {', '.join(sessions)}\n"
+                f"First seen: {items[0].created_at.isoformat()}\n"
+                f"Last seen: {items[-1].created_at.isoformat()}"
+            )
+        body = "Unanswered interview question(s) detected.\n\n" + "\n\n---\n\n".join(sections) + "\n"
+        return subject, body
+
+    # ------------------------------------------------------------------- stats
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._counters[name] += amount
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._stats_lock:
+            self._latency["count"] += 1
+            self._latency["total"] += seconds
+            self._latency["last"] = seconds
+            self._latency["max"] = max(self._latency["max"], seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            count = self._latency["count"]
+            return {
+                **self._counters,
+                "enabled": self.enabled,
+                "queue_depth": self._queue.qsize(),
+                "send_latency_ms": {
+                    "last": round(self._latency["last"] * 1000, 2),
+                    "avg": round(self._latency["total"] / count * 1000, 2) if count else 0.0,
+                    "max": round(self._latency["max"] * 1000, 2),
+                },
+            }
+
+
+# Global instance
+notification_outbox = NotificationOutbox(
+    connection=SMTPConnection(
+        host=settings.smtp_server,
+        port=settings.smtp_port,
+        use_ssl=settings.smtp_use_ssl,
+        username=settings.email_address,
+        password=settings.email_app_password,
+    ) if settings.email_address else None,
+    address=settings.email_address,
+    max_queue=settings.outbox_max_queue,
+    batch_window_seconds=settings.outbox_batch_window_seconds,
+    max_retries=settings.outbox_max_retries,
+    retry_backoff_seconds=settings.outbox_retry_backoff_seconds,
+    dedupe_ttl_seconds=settings.outbox_dedupe_ttl_seconds,
+)
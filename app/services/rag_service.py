@@ -1,24 +1,70 @@
 import os
 import json
+import time
+import asyncio
 import hashlib
 import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from app.core.config import settings
-from resume_loader import load_and_split_resume
-from rag_chain import bootstrap_rag
+from app.services.admission import admission_controller
+from app.services.answer_cache import AnswerCache
+from app.services.condense_gate import CondenseGate
+from resume_loader import CHUNKER_VERSION, load_and_split_resume
+from instrumentation import set_flag, stage
+from rag_chain import bootstrap_rag, get_embeddings, timed_phase
+from embedding_store import embeddings_model_name
+from mapped_index import INDEX_FORMAT_VERSION, InvalidIndexError, index_exists
+
+class RebuildInProgressError(RuntimeError):
+    """Raised when a rebuild is requested while another one is still running."""
+
 
 class RAGService:
-    def __init__(self):
+    def __init__(self, resume_path: Optional[str] = None, vectorstore_path: Optional[str] = None):
+        # Defaults serve the single resume configured in settings
+        self.resume_path = resume_path or settings.resume_path
+        self.vectorstore_path = vectorstore_path or settings.vectorstore_path
         self.chain = None
+        self.vectorstore = None
+        self.embeddings = None
+        self.retriever = None
+        # Approximate resident size of the loaded index (vectors + chunk text)
+        self.memory_bytes = 0
         self._initialized = False
         self._meta_filename = "meta.json"
+        # Seconds spent in each startup phase of the last initialize()
+        self.startup_timings: Dict[str, float] = {}
+        self.answer_cache = AnswerCache(
+            max_entries=settings.answer_cache_max_entries,
+            ttl_seconds=settings.answer_cache_ttl_seconds,
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+            semantic=settings.answer_cache_semantic,
+        ) if settings.answer_cache_enabled else None
+        # Rebuilds run in a new version directory while the current chain keeps serving
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self.generation = 0
+        self.rebuild_status: Dict[str, Any] = {"state": "idle"}
+        self.resume_sha256: Optional[str] = None
+        # Single-flight: identical concurrent queries share one chain execution
+        self._coalesce = settings.coalesce_requests
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self._inflight_waiters: Dict[Tuple[str, str, str], int] = {}
+        self._coalesce_counters = {"leaders": 0, "followers": 0, "abandoned": 0}
+        self.condense_gate = CondenseGate(
+            history_window=settings.condense_history_window,
+            memo_size=settings.condense_memo_size,
+        ) if settings.condense_gate_enabled else None
     
     def _vectorstore_dir(self) -> Path:
-        return Path(settings.vectorstore_path).resolve()
+        return Path(self.vectorstore_path).resolve()
     
-    def _meta_path(self) -> Path:
-        return self._vectorstore_dir() / self._meta_filename
+    def _meta_path(self, index_dir: Optional[Path] = None) -> Path:
+        return (index_dir or self._vectorstore_dir()) / self._meta_filename
     
     @staticmethod
     def _sha256_file(path: str) -> str:
@@ -28,29 +74,40 @@ class RAGService:
                 h.update(chunk)
         return h.hexdigest()
     
-    def _read_meta(self) -> Dict[str, Any]:
+    def _index_exists(self, index_dir: Optional[Path] = None) -> bool:
+        return index_exists(str(index_dir or self._vectorstore_dir()))
+    
+    @staticmethod
+    def _format_timings(timings: Dict[str, float]) -> str:
+        parts = [f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in timings.items()]
+        return ", ".join(parts) + f" (total {sum(timings.values()) * 1000:.1f} ms)"
+    
+    def _read_meta(self, index_dir: Optional[Path] = None) -> Dict[str, Any]:
         try:
-            p = self._meta_path()
+            p = self._meta_path(index_dir)
             if p.is_file():
                 return json.loads(p.read_text())
         except Exception:
             pass
         return {}
     
-    def _write_meta(self, data: Dict[str, Any]) -> None:
+    def _write_meta(self, data: Dict[str, Any], index_dir: Optional[Path] = None) -> None:
         try:
-            d = self._vectorstore_dir()
+            d = index_dir or self._vectorstore_dir()
             d.mkdir(parents=True, exist_ok=True)
             (d / self._meta_filename).write_text(json.dumps(data, indent=2))
         except Exception as e:
             print(f"⚠️ Failed to write meta: {e}")
     
     def delete_vectorstore(self) -> bool:
-        """Delete the FAISS vectorstore directory if it exists."""
+        """Delete the FAISS vectorstore directory if it exists (and the link to it, after a rebuild)."""
         vs_dir = self._vectorstore_dir()
+        link = Path(self.vectorstore_path).absolute()
         if vs_dir.exists():
             try:
                 shutil.rmtree(vs_dir)
+                if link.is_symlink():
+                    link.unlink()
                 print(f"🗑️ Deleted vectorstore at {vs_dir}")
                 return True
             except Exception as e:
@@ -63,88 +120,339 @@ class RAGService:
         if self._initialized:
             return
         
-        if not settings.resume_path or not os.path.isfile(settings.resume_path):
-            raise RuntimeError(f"RESUME_PATH not set or file not found: {settings.resume_path}")
+        if not self.resume_path or not os.path.isfile(self.resume_path):
+            raise RuntimeError(f"RESUME_PATH not set or file not found: {self.resume_path}")
+        
+        # Hashing, parsing, embedding and index IO are blocking; keep them off the event loop
+        await asyncio.to_thread(self._load)
+    
+    def _load(self) -> None:
+        """Blocking part of initialize(): build or load the live index and activate it."""
+        self._activate(self._build(self._vectorstore_dir()))
+    
+    def _build(self, index_dir: Path, force_parse: bool = False) -> Dict[str, Any]:
+        """Hash, parse if needed, build or load the index at index_dir and build the chain.
         
+        Doesn't touch the serving state; returns what _activate() needs to swap it in.
+        """
         try:
-            # If index exists but resume changed, wipe it to force rebuild
-            current_hash = self._sha256_file(settings.resume_path)
-            meta = self._read_meta()
+            timings: Dict[str, float] = {}
+            
+            # If index exists but resume changed, re-sync it (only changed chunks get embedded)
+            with timed_phase(timings, "hash"):
+                current_hash = self._sha256_file(self.resume_path)
+            meta = self._read_meta(index_dir)
             if meta.get("resume_sha256") and meta.get("resume_sha256") != current_hash:
-                print("♻️ Resume changed detected. Rebuilding vectorstore...")
-                self.delete_vectorstore()
+                print("♻️ Resume changed detected. Updating vectorstore...")
+            
+            # Vectors from another embedding model can't be searched with this model's query embeddings
+            embeddings_model = embeddings_model_name(get_embeddings())
+            if meta.get("embeddings_model") and meta.get("embeddings_model") != embeddings_model:
+                print(f"♻️ Embedding model changed ({meta['embeddings_model']} -> {embeddings_model}). Rebuilding vectorstore...")
             
-            docs = load_and_split_resume(settings.resume_path)
-            if not docs:
-                raise RuntimeError("No text could be extracted from the resume PDF.")
+            # Only parse the PDF when the index on disk can't be trusted
+            index_valid = (
+                meta.get("resume_sha256") == current_hash
+                and meta.get("chunker") == CHUNKER_VERSION
+                and meta.get("index_format") == INDEX_FORMAT_VERSION
+                and meta.get("embeddings_model") == embeddings_model
+                and self._index_exists(index_dir)
+            )
+            docs = None
+            if force_parse or not index_valid:
+                with timed_phase(timings, "parse"):
+                    docs = load_and_split_resume(self.resume_path)
+                if not docs:
+                    raise RuntimeError("No text could be extracted from the resume PDF.")
             
             # Use the latest bootstrap_rag function
-            self.chain = bootstrap_rag(docs)
-            self._initialized = True
-            print(f"✅ RAG chain initialized with {len(docs)} documents")
+            try:
+                components = bootstrap_rag(
+                    docs,
+                    timings,
+                    # Tagged with this resume, so the chain stops writing once a rebuild binds another
+                    answer_cache=self.answer_cache.for_resume(current_hash) if self.answer_cache is not None else None,
+                    condense_gate=self.condense_gate,
+                    index_path=str(index_dir),
+                )
+            except InvalidIndexError as e:
+                if docs is not None:
+                    raise
+                # meta.json matched but the index files don't validate: rebuild them from the resume
+                print(f"⚠️ {e}; re-parsing the resume to rebuild it")
+                return self._build(index_dir, force_parse=True)
+            docs_count = len(docs) if docs is not None else meta.get("docs_count", 0)
+            source = "parsed resume" if docs is not None else "existing index"
+            print(f"✅ RAG chain built with {docs_count} documents ({source})")
+            if components.rebuild_stats:
+                stats = components.rebuild_stats
+                print(f"🧩 Index sync: {stats['reused']} chunk(s) reused, {stats['embedded']} embedded, "
+                      f"{stats['added']} added, {stats['deleted']} deleted")
+            print(f"⏱️ Startup phases: {self._format_timings(timings)}")
             # Persist meta for change detection next time
             self._write_meta({
                 "resume_sha256": current_hash,
-                "docs_count": len(docs)
-            })
+                "chunker": CHUNKER_VERSION,
+                "index_format": INDEX_FORMAT_VERSION,
+                "embeddings_model": embeddings_model,
+                "docs_count": docs_count,
+                "rebuild": components.rebuild_stats or meta.get("rebuild", {})
+            }, index_dir)
+            return {"components": components, "resume_sha256": current_hash, "timings": timings}
             
         except Exception as e:
-            print(f"❌ Failed to initialize RAG chain: {e}")
+            print(f"❌ Failed to build RAG chain: {e}")
             raise
     
+    def _activate(self, built: Dict[str, Any]) -> None:
+        """Swap a freshly built chain in. Requests already running keep the chain they started with."""
+        components = built["components"]
+        if self.answer_cache is not None:
+            # Drops cached answers if they were produced from a different resume
+            self.answer_cache.bind(components.embeddings, built["resume_sha256"])
+        self.vectorstore = components.vectorstore
+        self.embeddings = components.embeddings
+        self.retriever = components.retriever
+        self.memory_bytes = self._estimate_memory_bytes(components.vectorstore)
+        self.startup_timings = built["timings"]
+        self.resume_sha256 = built["resume_sha256"]
+        self.chain = components.chain
+        self.generation += 1
+        self._initialized = True
+    
+    @staticmethod
+    def _estimate_memory_bytes(vectorstore) -> int:
+        if hasattr(vectorstore, "memory_bytes"):
+            # Memory-mapped index: vectors and text are shared pages, only ids and metadata are private
+            return vectorstore.memory_bytes()
+        index = vectorstore.index
+        size = index.ntotal * index.d * 4
+        docs = vectorstore.docstore._dict
+        if hasattr(docs, "text_bytes"):
+            # Chunks decoded on demand from the index files; sized without decoding them all
+            return size + docs.text_bytes()
+        for doc in docs.values():
+            size += len(doc.page_content.encode("utf-8"))
+        return size
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters from the caching layers in front of the chain"""
+        return {
+            "answer_cache": self.answer_cache.stats() if self.answer_cache is not None else None,
+            "condense": self.condense_gate.stats() if self.condense_gate is not None else None,
+            "query_embeddings": self.embeddings.stats() if hasattr(self.embeddings, "stats") else None,
+            "retriever": self.retriever.stats() if hasattr(self.retriever, "stats") else None,
+            "coalescing": {**self._coalesce_counters, "in_flight": len(self._inflight)},
+        }
+    
     def is_ready(self) -> bool:
         """Check if RAG service is ready"""
         return self._initialized and self.chain is not None
     
-    async def query(self, question: str, chat_history: List) -> Dict[str, Any]:
+    def _flight_key(self, question: str, chat_history: List) -> Tuple[str, str, str]:
+        """(resume hash, normalised question, history fingerprint) identifying an answer."""
+        h = hashlib.sha256()
+        for message in chat_history:
+            h.update(f"{message.type}\0{message.content}\0".encode("utf-8"))
+        return (self.resume_sha256 or "", AnswerCache.normalize(question), h.hexdigest())
+    
+    async def query(self, question: str, chat_history: List, session_id: Optional[str] = None) -> Dict[str, Any]:
         """Query using latest LangChain invoke pattern
         
+        Concurrent calls for the same question, history and resume share one chain execution.
+        Every caller awaits it through shield(), so a disconnecting client only stops waiting;
+        the execution is cancelled only once no caller is waiting for it anymore.
+        Only that shared execution takes an admission slot (and may raise AdmissionRejected).
+        
         Args:
             question: User's question text
             chat_history: List of LangChain message objects (HumanMessage, AIMessage)
+            session_id: Caller's session, used for fair queueing under load
         """
-        if not self.is_ready():
+        # Hold on to the current chain: a rebuild may swap self.chain while this request runs
+        chain = self.chain
+        if not self._initialized or chain is None:
             raise RuntimeError("RAG service not initialized")
+        if not self._coalesce:
+            return await self._admitted_invoke(chain, question, chat_history, session_id)
+        
+        key = self._flight_key(question, chat_history)
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self._coalesce_counters["followers"] += 1
+            set_flag("coalesced", True)
+        else:
+            set_flag("coalesced", False)
+            task = asyncio.ensure_future(self._admitted_invoke(chain, question, chat_history, session_id))
+            self._inflight[key] = task
+            self._inflight_waiters[key] = 0
+            task.add_done_callback(lambda t, key=key: self._finish_flight(key, t))
+            self._coalesce_counters["leaders"] += 1
         
+        self._inflight_waiters[key] += 1
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is task:
+                self._inflight_waiters[key] -= 1
+                if self._inflight_waiters[key] == 0 and not task.done():
+                    self._coalesce_counters["abandoned"] += 1
+                    task.cancel()
+            raise
+        if self._inflight.get(key) is task:
+            self._inflight_waiters[key] -= 1
+        # Callers get their own copy of the shared result
+        return dict(result)
+    
+    def _finish_flight(self, key: Tuple[str, str, str], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._inflight_waiters.pop(key, None)
+        if not task.cancelled():
+            # Retrieve the exception so an abandoned failure isn't logged as never retrieved
+            task.exception()
+    
+    async def _admitted_invoke(self, chain, question: str, chat_history: List, session_id: Optional[str]) -> Dict[str, Any]:
+        with stage("admission_wait"):
+            ticket = await admission_controller.acquire(session_id)
+        try:
+            return await self._invoke(chain, question, chat_history)
+        finally:
+            ticket.release()
+    
+    async def _invoke(self, chain, question: str, chat_history: List) -> Dict[str, Any]:
+        # Our chain currently reads the user text from "question", but
+        # many LangChain components and community prompts expect "input".
+        # Provide both keys for maximum compatibility.
+        # No sync retry on failure: it would block the event loop and repeat every provider call.
         try:
-            # Use invoke() method with latest LangChain.
-            # Our chain currently reads the user text from "question", but
-            # many LangChain components and community prompts expect "input".
-            # Provide both keys for maximum compatibility.
-            result = await self.chain.ainvoke({
+            return await chain.ainvoke({
                 "input": question,
                 "question": question,
                 "chat_history": chat_history,
             })
-            return result
         except Exception as e:
             print(f"RAG chain error: {e}")
-            # Fallback to sync invoke if async not available
-            try:
-                result = self.chain.invoke({
-                    "input": question,
-                    "question": question,
-                    "chat_history": chat_history,
-                })
-                return result
-            except Exception as sync_e:
-                print(f"Sync invoke also failed: {sync_e}")
-                raise e
+            raise
 
-    async def rebuild(self, force_delete: bool = True) -> None:
-        """Rebuild the RAG chain, optionally deleting the vectorstore first."""
+    async def astream_query(self, question: str, chat_history: List) -> AsyncIterator[str]:
+        """Stream answer tokens as the LLM produces them.
+
+        Condensing and retrieval run first; only the final answer stage is streamed.
+        """
+        chain = self.chain
+        if not self._initialized or chain is None:
+            raise RuntimeError("RAG service not initialized")
+        
+        async for chunk in chain.astream({
+            "input": question,
+            "question": question,
+            "chat_history": chat_history,
+        }):
+            token = chunk.get("answer")
+            if token:
+                yield token
+
+    def _new_version_dir(self) -> Path:
+        live = Path(self.vectorstore_path).absolute()
+        return live.with_name(f"{live.name}.{uuid.uuid4().hex[:12]}")
+    
+    def _swap_in(self, version: Path) -> None:
+        """Point the live index path at a new version directory (the previous version is removed after).
+        
+        The live path is a symlink to the current version and is replaced with os.replace, so any
+        process opening it sees the old index or the new one, never a missing directory. A live
+        path that is still a plain directory (before the first rebuild) is first moved to a version
+        of its own and linked; only that one-time conversion leaves a gap between two renames.
+        """
+        live = Path(self.vectorstore_path).absolute()
+        previous = live.resolve() if live.is_symlink() else None
+        if live.is_dir() and not live.is_symlink():
+            previous = self._new_version_dir()
+            os.replace(live, previous)
+            os.symlink(previous.name, live)
+        link = live.with_name(f"{live.name}.link")
+        if link.is_symlink():
+            link.unlink()
+        # Relative target, so the index root can be moved as a whole
+        os.symlink(version.name, link)
+        os.replace(link, live)
+        # Only versions made here; a link the user set up to point elsewhere leaves its target alone
+        if previous is not None and previous != version and previous.parent == live.parent \
+                and previous.name.startswith(f"{live.name}."):
+            shutil.rmtree(previous, ignore_errors=True)
+    
+    def _rebuild_staged(self, force_delete: bool) -> None:
+        """Blocking part of a rebuild: build into a new version dir, link it into place, swap the chain."""
+        if not self.resume_path or not os.path.isfile(self.resume_path):
+            raise RuntimeError(f"RESUME_PATH not set or file not found: {self.resume_path}")
+        version = self._new_version_dir()
+        if not force_delete and self._vectorstore_dir().is_dir():
+            # Start from a copy so unchanged chunks reuse their stored embeddings
+            shutil.copytree(self._vectorstore_dir(), version)
         try:
-            if force_delete:
-                self.delete_vectorstore()
-            # Reset state and re-init
-            self.chain = None
-            self._initialized = False
-            await self.initialize()
+            built = self._build(version, force_parse=True)
+            self._swap_in(version)
         except Exception:
-            # Keep state consistent on failure
-            self.chain = None
-            self._initialized = False
+            shutil.rmtree(version, ignore_errors=True)
+            raise
+        self._activate(built)
+    
+    def _begin_rebuild(self, force_delete: bool) -> None:
+        if not self._rebuild_lock.acquire(blocking=False):
+            raise RebuildInProgressError("An index rebuild is already running")
+        self.rebuild_status = {
+            "state": "running",
+            "force_delete": force_delete,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "generation": self.generation,
+        }
+    
+    async def _run_rebuild(self, force_delete: bool) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._rebuild_staged, force_delete)
+        except Exception as e:
+            print(f"❌ Index rebuild failed, still serving generation {self.generation}: {e}")
+            self.rebuild_status.update(state="failed", error=str(e))
             raise
+        else:
+            print(f"🔁 Index rebuilt, now serving generation {self.generation}")
+            self.rebuild_status.update(state="succeeded", error=None)
+        finally:
+            self.rebuild_status.update(
+                finished_at=datetime.now(timezone.utc).isoformat(),
+                duration_seconds=round(time.perf_counter() - start, 3),
+                generation=self.generation,
+            )
+            self._rebuild_lock.release()
+    
+    async def rebuild(self, force_delete: bool = True) -> None:
+        """Rebuild the index and chain without downtime.
+        
+        The new index is built in a new version directory while the current chain keeps serving,
+        then linked into place and swapped in. force_delete=True re-embeds every chunk instead
+        of patching a copy of the current index. On failure the current chain stays live.
+        """
+        self._begin_rebuild(force_delete)
+        await self._run_rebuild(force_delete)
+    
+    def start_rebuild(self, force_delete: bool = False) -> Dict[str, Any]:
+        """Start a rebuild in the background and return its status (raises RebuildInProgressError if one is running)."""
+        self._begin_rebuild(force_delete)
+        
+        async def run() -> None:
+            try:
+                await self._run_rebuild(force_delete)
+            except Exception:
+                # Reported through rebuild_status
+                pass
+        
+        self._rebuild_task = asyncio.create_task(run())
+        return self.get_rebuild_status()
+    
+    def get_rebuild_status(self) -> Dict[str, Any]:
+        return {**self.rebuild_status, "serving_generation": self.generation, "ready": self.is_ready()}
 
 # Global instance
 rag_service = RAGService()
\ No newline at end of file
@@ -1,6 +1,5 @@
-import os
 from typing import List, Dict, Any
-from email_sender import send_email_to_user
+from app.services.notification_outbox import notification_outbox
 
 class ResponseService:
     @staticmethod
@@ -18,18 +17,11 @@ class ResponseService:
         question: str,
         session_id: str
     ) -> str:
-        """Handle unknown answers by sending a simple email notification."""
+        """Handle unknown answers by queueing an email notification (sent in the background)."""
         try:
-            email_body = f"""Unanswered interview question detected.
-
-Question: {question}
-
-Session: {session_id}
-Timestamp: {os.environ.get('TZ', 'UTC')}
-"""
-            send_email_to_user("Interview Question - Needs Review", email_body)
+            notification_outbox.enqueue(question, session_id)
         except Exception as email_error:
-            print(f"Failed to send email notification: {email_error}")
+            print(f"Failed to queue email notification: {email_error}")
 
         return "I couldn't find that information in the resume. The question has been forwarded for review."
 
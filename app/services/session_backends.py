@@ -0,0 +1,513 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+Exchange = Tuple[str, str]
+
+
+class SessionBackend(ABC):
+    """
+    Storage for per-session chat history and last-activity timestamps (epoch seconds).
+    Implementations must be safe to call from multiple threads.
+    """
+
+    # Whether calls wait on disk or the network; async callers then run them in a worker thread
+    blocking = True
+
+    def __init__(self, max_history: int):
+        self.max_history = max(1, max_history)
+
+    @abstractmethod
+    def append(self, session_id: str, question: str, answer: str, now: float) -> None:
+        """Add an exchange, trim to max_history and mark the session active."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[List[Exchange]]:
+        """History for a session, or None if it doesn't exist."""
+
+    @abstractmethod
+    def get_counted(self, session_id: str) -> Optional[Tuple[List[Exchange], int]]:
+        """
+        History plus the number of exchanges ever appended to the session, read together, or None.
+        The count tells how many exchanges are new since an earlier read, even when they repeat.
+        """
+
+    @abstractmethod
+    def touch(self, session_id: str, now: float) -> None:
+        """Mark an existing session active."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Remove a session. Returns True if it existed."""
+
+    @abstractmethod
+    def expire(self, cutoff: float) -> int:
+        """Remove sessions inactive since before cutoff. Returns the number removed."""
+
+    @abstractmethod
+    def all_sessions(self) -> Dict[str, List[Exchange]]:
+        """Every stored session with its history."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored sessions."""
+
+    @abstractmethod
+    def last_activity(self, session_id: str) -> Optional[float]:
+        """Last activity timestamp, or None if the session doesn't exist."""
+
+    def close(self) -> None:
+        """Release resources (flush pending writes, close connections)."""
+
+
+class InMemorySessionBackend(SessionBackend):
+    """
+    Per-process store. Activity is kept in an OrderedDict in activity order (oldest first),
+    so touch and expire are amortised O(1).
+    """
+
+    blocking = False
+
+    def __init__(self, max_history: int):
+        super().__init__(max_history)
+        self._memory: Dict[str, Deque[Exchange]] = {}
+        self._appended: Dict[str, int] = {}
+        self._last_activity: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _touch(self, session_id: str, now: float) -> None:
+        self._last_activity[session_id] = now
+        self._last_activity.move_to_end(session_id)
+
+    def append(self, session_id: str, question: str, answer: str, now: float) -> None:
+        with self._lock:
+            self._touch(session_id, now)
+            history = self._memory.get(session_id)
+            if history is None:
+                history = self._memory[session_id] = deque(maxlen=self.max_history)
+            history.append((question, answer))
+            self._appended[session_id] = self._appended.get(session_id, 0) + 1
+
+    def get(self, session_id: str) -> Optional[List[Exchange]]:
+        with self._lock:
+            history = self._memory.get(session_id)
+            return list(history) if history is not None else None
+
+    def get_counted(self, session_id: str) -> Optional[Tuple[List[Exchange], int]]:
+        with self._lock:
+            history = self._memory.get(session_id)
+            return (list(history), self._appended[session_id]) if history is not None else None
+
+    def touch(self, session_id: str, now: float) -> None:
+        with self._lock:
+            if session_id in self._memory:
+                self._touch(session_id, now)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            existed = (session_id in self._memory) or (session_id in self._last_activity)
+            self._memory.pop(session_id, None)
+            self._appended.pop(session_id, None)
+            self._last_activity.pop(session_id, None)
+            return existed
+
+    def expire(self, cutoff: float) -> int:
+        removed = 0
+        with self._lock:
+            # Oldest activity is at the front; stop at the first session still active
+            while self._last_activity:
+                session_id, last_time = next(iter(self._last_activity.items()))
+                if last_time >= cutoff:
+                    break
+                del self._last_activity[session_id]
+                self._memory.pop(session_id, None)
+                self._appended.pop(session_id, None)
+                removed += 1
+        return removed
+
+    def all_sessions(self) -> Dict[str, List[Exchange]]:
+        with self._lock:
+            return {session_id: list(history) for session_id, history in self._memory.items()}
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._memory)
+
+    def last_activity(self, session_id: str) -> Optional[float]:
+        with self._lock:
+            return self._last_activity.get(session_id)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    SQLite store shared by every process on the host (uvicorn workers, Streamlit).
+
+    Runs in WAL mode so readers don't block the writer. Writes are buffered and committed
+    in batches (when `batch_size` ops are pending or every `flush_interval` seconds);
+    reads from this process see buffered writes. Expiry uses an index on last_activity.
+    """
+
+    def __init__(self, path: str, max_history: int, batch_size: int = 64, flush_interval: float = 0.05):
+        super().__init__(max_history)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(0.001, flush_interval)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                last_activity REAL NOT NULL,
+                appended INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions(last_activity);
+            CREATE TABLE IF NOT EXISTS exchanges (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_exchanges_session ON exchanges(session_id, id);
+        """)
+        if "appended" not in {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}:
+            # Databases created before exchanges were counted
+            try:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN appended INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError as e:
+                # Another process added it first
+                if "duplicate column" not in str(e):
+                    raise
+        # Pending appends per session, plus latest activity per session, not yet committed
+        self._pending: Dict[str, List[Exchange]] = {}
+        self._pending_activity: Dict[str, float] = {}
+        self._pending_ops = 0
+
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._run_flush_loop, name="session-sqlite-flush", daemon=True)
+        self._flusher.start()
+
+    def _run_flush_loop(self) -> None:
+        while not self._stop_event.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Session flush failed: {e}")
+
+    def flush(self) -> None:
+        """Commit buffered writes in one transaction."""
+        with self._lock:
+            if not self._pending_activity:
+                return
+            pending, activity = self._pending, self._pending_activity
+            self._pending, self._pending_activity, self._pending_ops = {}, {}, 0
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO sessions (session_id, last_activity, appended) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET last_activity = MAX(last_activity, excluded.last_activity), "
+                    "appended = appended + excluded.appended",
+                    [(sid, activity[sid], len(items)) for sid, items in pending.items()],
+                )
+                # A touch only refreshes a session that is still stored: one another process
+                # expired since is not brought back without its history
+                conn.executemany(
+                    "UPDATE sessions SET last_activity = MAX(last_activity, ?) WHERE session_id = ?",
+                    [(ts, sid) for sid, ts in activity.items() if sid not in pending],
+                )
+                conn.executemany(
+                    "INSERT INTO exchanges (session_id, question, answer) VALUES (?, ?, ?)",
+                    [(sid, q, a) for sid, items in pending.items() for q, a in items],
+                )
+                for sid in pending:
+                    conn.execute(
+                        "DELETE FROM exchanges WHERE session_id = ? AND id NOT IN "
+                        "(SELECT id FROM exchanges WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                        (sid, sid, self.max_history),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                # Put the batch back so it is retried on the next flush
+                for sid, items in pending.items():
+                    self._pending[sid] = items + self._pending.get(sid, [])
+                for sid, ts in activity.items():
+                    self._pending_activity[sid] = max(ts, self._pending_activity.get(sid, ts))
+                raise
+
+    def _buffer(self, session_id: str, now: float, exchange: Optional[Exchange] = None) -> None:
+        with self._lock:
+            if exchange is not None:
+                self._pending.setdefault(session_id, []).append(exchange)
+            self._pending_activity[session_id] = now
+            self._pending_ops += 1
+            if self._pending_ops >= self._batch_size:
+                self.flush()
+
+    def append(self, session_id: str, question: str, answer: str, now: float) -> None:
+        self._buffer(session_id, now, (question, answer))
+
+    def _stored(self, session_id: str) -> bool:
+        return self._stored_count(session_id) is not None
+
+    def _stored_count(self, session_id: str) -> Optional[int]:
+        row = self._conn.execute(
+            "SELECT appended FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _stored_counted(self, session_id: str) -> Tuple[Optional[int], List[Exchange]]:
+        # One statement, so the count and history come from the same snapshot even while
+        # another process flushes
+        rows = self._conn.execute(
+            "SELECT s.appended, e.question, e.answer FROM sessions s "
+            "LEFT JOIN exchanges e ON e.session_id = s.session_id AND e.id IN "
+            "(SELECT id FROM exchanges WHERE session_id = ? ORDER BY id DESC LIMIT ?) "
+            "WHERE s.session_id = ? ORDER BY e.id",
+            (session_id, self.max_history, session_id),
+        ).fetchall()
+        if not rows:
+            return None, []
+        return rows[0][0], [(q, a) for _, q, a in rows if q is not None]
+
+    def get_counted(self, session_id: str) -> Optional[Tuple[List[Exchange], int]]:
+        with self._lock:
+            stored, history = self._stored_counted(session_id)
+            pending = self._pending.get(session_id, [])
+            if stored is None and session_id not in self._pending_activity:
+                return None
+            return (history + pending)[-self.max_history:], (stored or 0) + len(pending)
+
+    def get(self, session_id: str) -> Optional[List[Exchange]]:
+        counted = self.get_counted(session_id)
+        return counted[0] if counted is not None else None
+
+    def touch(self, session_id: str, now: float) -> None:
+        with self._lock:
+            if session_id in self._pending_activity or self._stored(session_id):
+                self._buffer(session_id, now)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            existed = session_id in self._pending_activity
+            self._pending.pop(session_id, None)
+            self._pending_activity.pop(session_id, None)
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existed = conn.execute(
+                    "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+                ).rowcount > 0 or existed
+                conn.execute("DELETE FROM exchanges WHERE session_id = ?", (session_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                # Don't leave the shared connection inside an open transaction
+                conn.execute("ROLLBACK")
+                raise
+            return existed
+
+    def expire(self, cutoff: float) -> int:
+        with self._lock:
+            self.flush()
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Same activity check for both, in one write transaction: only the exchanges of
+                # sessions whose row is deleted go, never those of a session refreshed meanwhile
+                conn.execute(
+                    "DELETE FROM exchanges WHERE session_id IN "
+                    "(SELECT session_id FROM sessions WHERE last_activity < ?)",
+                    (cutoff,),
+                )
+                removed = conn.execute("DELETE FROM sessions WHERE last_activity < ?", (cutoff,)).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return removed
+
+    def all_sessions(self) -> Dict[str, List[Exchange]]:
+        with self._lock:
+            self.flush()
+            sessions: Dict[str, List[Exchange]] = {
+                row[0]: [] for row in self._conn.execute("SELECT session_id FROM sessions")
+            }
+            for sid, q, a in self._conn.execute(
+                "SELECT session_id, question, answer FROM exchanges ORDER BY session_id, id"
+            ):
+                if sid in sessions:
+                    sessions[sid].append((q, a))
+            return sessions
+
+    def count(self) -> int:
+        with self._lock:
+            self.flush()
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def last_activity(self, session_id: str) -> Optional[float]:
+        with self._lock:
+            if session_id in self._pending_activity:
+                return self._pending_activity[session_id]
+            row = self._conn.execute(
+                "SELECT last_activity FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def close(self) -> None:
+        self._stop_event.set()
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Redis store shared across hosts. History lives in one list per session and activity
+    in a single sorted set scored by timestamp, so expiry is a range query.
+
+    `client` is any redis-py compatible client (decode_responses=True); when omitted one is
+    created from `url` with the optional `redis` package.
+    """
+
+    # Deletes the listed sessions whose activity is still older than the cutoff. KEYS[1] is the
+    # activity set, KEYS[2] the appended-count hash and KEYS[i + 1] the history of session ARGV[i];
+    # ARGV[1] is the cutoff. Scripts run atomically, so a session touched after expire() selected
+    # it is kept.
+    EXPIRE_SCRIPT = """
+    local removed = 0
+    for i = 2, #ARGV do
+        local score = redis.call('ZSCORE', KEYS[1], ARGV[i])
+        if score and tonumber(score) < tonumber(ARGV[1]) then
+            redis.call('DEL', KEYS[i + 1])
+            redis.call('HDEL', KEYS[2], ARGV[i])
+            redis.call('ZREM', KEYS[1], ARGV[i])
+            removed = removed + 1
+        end
+    end
+    return removed
+    """
+    # Sessions per script call; keeps each call short, since a script blocks the server
+    EXPIRE_BATCH = 500
+
+    def __init__(self, max_history: int, url: str = "redis://localhost:6379/0",
+                 prefix: str = "resumetalk:", client: Any = None):
+        super().__init__(max_history)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package") from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self._client = client
+        self._prefix = prefix
+        self._activity_key = f"{prefix}activity"
+        # Exchanges ever appended per session (the history list itself is trimmed)
+        self._appended_key = f"{prefix}appended"
+        self._expire_script = client.register_script(self.EXPIRE_SCRIPT)
+
+    def _history_key(self, session_id: str) -> str:
+        return f"{self._prefix}history:{session_id}"
+
+    def append(self, session_id: str, question: str, answer: str, now: float) -> None:
+        key = self._history_key(session_id)
+        # MULTI/EXEC, so readers see the history and its count change together
+        pipe = self._client.pipeline(transaction=True)
+        pipe.rpush(key, json.dumps([question, answer]))
+        pipe.ltrim(key, -self.max_history, -1)
+        pipe.hincrby(self._appended_key, session_id, 1)
+        pipe.zadd(self._activity_key, {session_id: now})
+        pipe.execute()
+
+    def get_counted(self, session_id: str) -> Optional[Tuple[List[Exchange], int]]:
+        pipe = self._client.pipeline(transaction=True)
+        pipe.zscore(self._activity_key, session_id)
+        pipe.lrange(self._history_key(session_id), 0, -1)
+        pipe.hget(self._appended_key, session_id)
+        score, items, appended = pipe.execute()
+        if score is None:
+            return None
+        return [tuple(json.loads(item)) for item in items], int(appended or 0)
+
+    def get(self, session_id: str) -> Optional[List[Exchange]]:
+        pipe = self._client.pipeline(transaction=False)
+        pipe.zscore(self._activity_key, session_id)
+        pipe.lrange(self._history_key(session_id), 0, -1)
+        score, items = pipe.execute()
+        if score is None:
+            return None
+        return [tuple(json.loads(item)) for item in items]
+
+    def touch(self, session_id: str, now: float) -> None:
+        self._client.zadd(self._activity_key, {session_id: now}, xx=True)
+
+    def delete(self, session_id: str) -> bool:
+        pipe = self._client.pipeline(transaction=False)
+        pipe.zrem(self._activity_key, session_id)
+        pipe.delete(self._history_key(session_id))
+        pipe.hdel(self._appended_key, session_id)
+        removed, deleted, _ = pipe.execute()
+        return bool(removed or deleted)
+
+    def expire(self, cutoff: float) -> int:
+        removed = 0
+        while True:
+            expired = self._client.zrangebyscore(
+                self._activity_key, "-inf", f"({cutoff}", start=0, num=self.EXPIRE_BATCH
+            )
+            if not expired:
+                break
+            removed += self._expire_script(
+                keys=[self._activity_key, self._appended_key, *(self._history_key(sid) for sid in expired)],
+                args=[cutoff, *expired],
+            )
+            if len(expired) < self.EXPIRE_BATCH:
+                break
+        return removed
+
+    def all_sessions(self) -> Dict[str, List[Exchange]]:
+        session_ids = self._client.zrange(self._activity_key, 0, -1)
+        pipe = self._client.pipeline(transaction=False)
+        for sid in session_ids:
+            pipe.lrange(self._history_key(sid), 0, -1)
+        histories = pipe.execute() if session_ids else []
+        return {
+            sid: [tuple(json.loads(item)) for item in items]
+            for sid, items in zip(session_ids, histories)
+        }
+
+    def count(self) -> int:
+        return self._client.zcard(self._activity_key)
+
+    def last_activity(self, session_id: str) -> Optional[float]:
+        return self._client.zscore(self._activity_key, session_id)
+
+    def close(self) -> None:
+        close = getattr(self._client, "close", None)
+        if close is not None:
+            close()
+
+
+def create_session_backend(settings) -> SessionBackend:
+    """Build the backend selected by SESSION_BACKEND (memory | sqlite | redis)."""
+    kind = settings.session_backend.lower()
+    if kind == "sqlite":
+        return SQLiteSessionBackend(
+            settings.session_sqlite_path,
+            max_history=settings.max_history_per_session,
+            batch_size=settings.session_sqlite_batch_size,
+            flush_interval=settings.session_sqlite_flush_interval_ms / 1000,
+        )
+    if kind == "redis":
+        return RedisSessionBackend(
+            max_history=settings.max_history_per_session,
+            url=settings.session_redis_url,
+            prefix=settings.session_redis_prefix,
+        )
+    if kind != "memory":
+        raise ValueError(f"Unknown SESSION_BACKEND: {settings.session_backend}")
+    return InMemorySessionBackend(max_history=settings.max_history_per_session)
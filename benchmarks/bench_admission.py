@@ -0,0 +1,123 @@
+"""
+Admission control under a burst: /api/v1/chat against a rate-limited fake LLM.
+
+The fake provider fails any call made while more than --provider-limit calls are in flight,
+like an OpenAI rate limit. A burst of requests is sent with admission control off and on.
+A fairness round follows: one session floods the API while a few others each ask once.
+
+Usage:
+    python -m benchmarks.bench_admission --requests 300 --provider-limit 16 --max-concurrent 16
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+import rag_chain
+import app.api.routes.chat as chat_routes
+import app.services.rag_service as rag_module
+from app.core.app import create_app
+from app.services.admission import AdmissionController
+from app.services.rag_service import rag_service
+from benchmarks.fakes import FakeLatencyChatModel
+from providers import FakeEmbeddings
+
+
+class RateLimitedChatModel(FakeLatencyChatModel):
+    limit: int = 16
+    in_flight: int = 0
+
+    def _generate(self, *args, **kwargs):
+        # Sync callers hit the same provider limit
+        if self.in_flight >= self.limit:
+            raise RuntimeError("Error code: 429 - Rate limit reached")
+        return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args, **kwargs):
+        self.in_flight += 1
+        try:
+            if self.in_flight > self.limit:
+                raise RuntimeError("Error code: 429 - Rate limit reached")
+            return await super()._agenerate(*args, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+async def fire(client: httpx.AsyncClient, requests):
+    async def one(question: str, session_id: str):
+        start = time.perf_counter()
+        r = await client.post("/api/v1/chat", json={"question": question, "session_id": session_id})
+        return r.status_code, time.perf_counter() - start, r.json()
+
+    return await asyncio.gather(*(one(q, s) for q, s in requests))
+
+
+def summarize(label: str, results) -> None:
+    codes = Counter(code for code, _, _ in results)
+    ok = sorted(t * 1000 for code, t, _ in results if code == 200)
+    retry = [body["detail"]["retry_after"] for code, _, body in results if code in (429, 503)]
+    print(f"  {label:<16} {dict(sorted(codes.items()))}  "
+          f"ok p50 {statistics.median(ok) if ok else 0:.0f} ms, max {max(ok) if ok else 0:.0f} ms"
+          + (f"; retry_after {min(retry)}-{max(retry)} s" if retry else ""))
+
+
+async def run(args) -> None:
+    app = create_app()
+    rag_service.vectorstore_path = str(Path(tempfile.mkdtemp()) / ".faiss_index")
+    rag_service.answer_cache = None
+    await rag_service.initialize()
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for max_concurrent in (0, args.max_concurrent):
+            controller = AdmissionController(
+                max_concurrent=max_concurrent,
+                max_queue=args.max_queue,
+                queue_timeout_seconds=args.queue_timeout,
+                initial_service_seconds=args.llm_latency,
+            )
+            # Both modules imported the global by name; point them at this run's controller
+            chat_routes.admission_controller = controller
+            rag_module.admission_controller = controller
+
+            burst = [(f"Question {i} about the candidate's Kafka work?", f"visitor{i}") for i in range(args.requests)]
+            label = f"limit {max_concurrent}" if max_concurrent else "no admission"
+            summarize(label, await fire(client, burst))
+
+        # Fairness: one flooding session vs. a few single questions sent right after it
+        flood = [(f"Flood question {i}?", "flooder") for i in range(args.max_concurrent + 12)]
+        others = [(f"Single question from visitor {i}?", f"polite{i}") for i in range(5)]
+        results = await fire(client, flood + others)
+        summarize("fairness: flood", results[:len(flood)])
+        summarize("fairness: others", results[len(flood):])
+        stats = controller.stats()
+        print(f"  queue wait ms: {stats['queue_wait_ms']}")
+        print(f"  queue depth on arrival: {stats['queue_depth_on_arrival']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--provider-limit", type=int, default=16)
+    parser.add_argument("--max-concurrent", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--queue-timeout", type=float, default=2.0)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    rag_chain._get_embeddings = lambda: FakeEmbeddings(size=256)
+    llm = RateLimitedChatModel(latency=args.llm_latency, limit=args.provider_limit)
+    rag_chain._get_llm = lambda: llm
+    print(f"{args.requests} simultaneous requests, provider limit {args.provider_limit} concurrent calls, "
+          f"LLM latency {args.llm_latency * 1000:.0f} ms")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+End-to-end API load test: concurrent multi-turn interviews against /api/v1/chat and /sessions.
+
+Runs offline through the "fake" LLM and embedding providers (see providers.py) with the
+latency and token rate given below, in-process over ASGI. With --url it drives a running
+server instead (start it with LLM_PROVIDER=fake EMBEDDINGS_PROVIDER=fake to stay offline).
+
+Each interviewer works through one interview script in its own session: every turn asks a
+question (often a follow-up that needs the history) and then reads the session history; at the
+end it lists the sessions and deletes its own. The report gives p50/p95/p99 latency per
+endpoint, requests/s and memory.
+
+--save writes the report as JSON (commit it under benchmarks/baselines/ so regressions show
+up in diffs); --compare prints the change against a saved report and exits non-zero when a
+p95 latency or the throughput is worse by more than --tolerance.
+
+Usage:
+    python -m benchmarks.bench_api --interviewers 64 --concurrency 16 --llm-latency-ms 100
+    python -m benchmarks.bench_api --compare benchmarks/baselines/bench_api.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.core.app import create_app
+from app.services.rag_service import rag_service
+
+# Latency changes smaller than this are noise, however large relative to a sub-millisecond endpoint
+NOISE_FLOOR_MS = 1.0
+
+TOPICS = ["Python", "Kafka", "Kubernetes", "FastAPI", "PostgreSQL", "AWS", "React", "machine learning"]
+
+# {topic} is filled per interviewer; later turns lean on the history like real follow-ups
+SCRIPTS = [
+    [
+        "Tell me about the candidate's background.",
+        "What experience do they have with {topic}?",
+        "Which project used it the most?",
+        "What was their role there?",
+        "How long did they work on it?",
+    ],
+    [
+        "Where did the candidate study?",
+        "What did they focus on?",
+        "Does any of that relate to {topic}?",
+        "Any certifications?",
+    ],
+    [
+        "What is the candidate's most recent position?",
+        "What were their main achievements in that role?",
+        "Did they use {topic} there?",
+        "How did that compare to their previous job?",
+        "Would they be a good fit for a senior backend role?",
+        "Why?",
+    ],
+    [
+        "List the candidate's technical skills.",
+        "How strong are they in {topic}?",
+        "Have they led a team?",
+    ],
+]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    rss = _proc_status_mb("VmRSS")
+    return rss if rss is not None else peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds * 1000)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            report[endpoint] = {
+                "count": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "max_ms": round(values[-1], 1),
+            }
+        return report
+
+
+async def timed(recorder: Recorder, endpoint: str, request) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        recorder.add(endpoint, time.perf_counter() - start, ok=False)
+        return None
+    recorder.add(endpoint, time.perf_counter() - start, ok=response.is_success)
+    return response
+
+
+async def ask_streaming(client: httpx.AsyncClient, recorder: Recorder, payload: Dict[str, str], args) -> None:
+    start = time.perf_counter()
+    first_token = None
+    ok = False
+    try:
+        async with client.stream("POST", "/api/v1/chat/stream", json=payload) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["event"] == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+                ok = event["event"] == "done"
+    except httpx.HTTPError:
+        pass
+    recorder.add("chat_stream", time.perf_counter() - start, ok=ok)
+    # httpx's ASGI transport buffers the whole body, so only a real server shows the first token
+    if first_token is not None and args.url:
+        recorder.add("chat_stream_first_token", first_token, ok=True)
+
+
+async def interview(client: httpx.AsyncClient, recorder: Recorder, index: int, args) -> None:
+    rng = random.Random(args.seed * 100003 + index)
+    script = SCRIPTS[index % len(SCRIPTS)]
+    topic = rng.choice(TOPICS)
+    session_id = f"bench-{args.seed}-{index}"
+
+    for template in script:
+        payload = {"question": template.format(topic=topic), "session_id": session_id}
+        if args.stream:
+            await ask_streaming(client, recorder, payload, args)
+        else:
+            await timed(recorder, "chat", client.post("/api/v1/chat", json=payload))
+        await timed(recorder, "session_history", client.get(f"/api/v1/sessions/{session_id}/history"))
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+    await timed(recorder, "sessions_list", client.get("/api/v1/sessions"))
+    await timed(recorder, "session_delete", client.delete(f"/api/v1/sessions/{session_id}"))
+
+
+async def run(args) -> Dict:
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        app = create_app()
+        rag_service.vectorstore_path = str(Path(tempfile.mkdtemp()) / ".faiss_index")
+        if args.no_answer_cache:
+            rag_service.answer_cache = None
+        await rag_service.initialize()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    recorder = Recorder()
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int) -> None:
+        async with gate:
+            await interview(client, recorder, index, args)
+
+    rss_before = rss_mb()
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.interviewers)))
+        elapsed = time.perf_counter() - start
+
+    endpoints = recorder.summary()
+    requests = sum(e["count"] for name, e in endpoints.items() if name != "chat_stream_first_token")
+    chat = endpoints.get("chat_stream" if args.stream else "chat", {"count": 0})
+    report = {
+        "config": {
+            "interviewers": args.interviewers,
+            "concurrency": args.concurrency,
+            "stream": args.stream,
+            "think_ms": args.think_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "tokens_per_second": args.tokens_per_second,
+            "answer_tokens": args.answer_tokens,
+            "embed_latency_ms": args.embed_latency_ms,
+            "answer_cache": not args.no_answer_cache,
+            "seed": args.seed,
+            "target": args.url or "in-process",
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(terse=True)},
+        "duration_s": round(elapsed, 2),
+        "requests": requests,
+        "rps": round(requests / elapsed, 1),
+        "chat_turns_per_s": round(chat["count"] / elapsed, 1),
+        "endpoints": endpoints,
+    }
+    if not args.url:
+        report["memory_mb"] = {
+            "rss_before": round(rss_before, 1),
+            "rss_after": round(rss_mb(), 1),
+            "peak_rss": round(peak_rss_mb(), 1),
+        }
+    return report
+
+
+def print_report(report: Dict) -> None:
+    config = report["config"]
+    print(f"{config['interviewers']} interviewers, {config['concurrency']} at a time, "
+          f"{'streaming' if config['stream'] else 'non-streaming'} chat against {config['target']}")
+    print(f"  {'endpoint':<24} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, e in report["endpoints"].items():
+        print(f"  {name:<24} {e['count']:>6} {e['errors']:>6} {e['p50_ms']:>9.1f} {e['p95_ms']:>9.1f} "
+              f"{e['p99_ms']:>9.1f} {e['max_ms']:>9.1f}")
+    print(f"  {report['requests']} requests in {report['duration_s']:.2f} s: {report['rps']:.1f} req/s, "
+          f"{report['chat_turns_per_s']:.1f} chat turns/s")
+    if "memory_mb" in report:
+        memory = report["memory_mb"]
+        print(f"  RSS {memory['rss_before']:.1f} -> {memory['rss_after']:.1f} MB (peak {memory['peak_rss']:.1f} MB)")
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> bool:
+    """Print changes against the baseline; False when something regressed beyond tolerance."""
+    if baseline.get("config") != report["config"]:
+        print("  note: baseline was recorded with a different config")
+    ok = True
+
+    def line(label: str, old: float, new: float, higher_is_worse: bool, floor: float = 0.0) -> None:
+        nonlocal ok
+        change = (new - old) / old if old else 0.0
+        regressed = (change if higher_is_worse else -change) > tolerance and abs(new - old) > floor
+        ok = ok and not regressed
+        print(f"  {label:<32} {old:>9.1f} -> {new:>9.1f}  {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+
+    print("Against baseline:")
+    line("req/s", baseline["rps"], report["rps"], higher_is_worse=False)
+    for name, e in report["endpoints"].items():
+        old = baseline["endpoints"].get(name)
+        if old:
+            line(f"{name} p95 ms", old["p95_ms"], e["p95_ms"], higher_is_worse=True, floor=NOISE_FLOOR_MS)
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interviewers", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16, help="Interviews in progress at once")
+    parser.add_argument("--stream", action="store_true", help="Ask through /api/v1/chat/stream (with --url also reports time to first token)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between turns")
+    parser.add_argument("--llm-latency-ms", type=float, default=100.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--no-answer-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", default=None, help="Drive a running server instead of the app in-process")
+    parser.add_argument("--save", default=None, help="Write the report as JSON")
+    parser.add_argument("--compare", default=None, help="Compare with a saved JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression for --compare")
+    args = parser.parse_args()
+
+    # Read by the providers when the RAG service initializes
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["EMBEDDINGS_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["FAKE_LLM_ANSWER_TOKENS"] = str(args.answer_tokens)
+    os.environ["FAKE_EMBEDDINGS_LATENCY_MS"] = str(args.embed_latency_ms)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Load benchmark for the conversational RAG chain against a fake LLM with injected latency.
+
+Compares the legacy chain (sync `.invoke` inside plain lambdas, which LangChain
+offloads to the default thread pool) with the native async chain.
+
+Usage:
+    python -m benchmarks.bench_async_chain --requests 200 --concurrency 64 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnablePassthrough
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import FakeLatencyChatModel, sample_docs
+from providers import FakeEmbeddings
+from rag_chain import build_conv_rag_chain, format_docs, get_retriever
+
+
+def build_legacy_chain(retriever, llm):
+    """The pre-async chain shape: every stage is a sync lambda."""
+    condense = ChatPromptTemplate.from_messages([
+        ("system", "Rephrase the follow-up question as a standalone question."),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{question}"),
+    ])
+    qa = ChatPromptTemplate.from_messages([
+        ("system", "Answer from the context.\n{context}"),
+        ("human", "{question}"),
+    ])
+    return (
+        RunnablePassthrough.assign(
+            standalone_question=lambda x: (
+                (condense | llm | StrOutputParser()).invoke(x)
+                if x.get("chat_history") else x["question"]
+            )
+        )
+        | RunnablePassthrough.assign(
+            context=lambda x: format_docs(retriever.invoke(x["standalone_question"]))
+        )
+        | RunnablePassthrough.assign(
+            answer=lambda x: (qa | llm | StrOutputParser()).invoke({
+                "question": x["standalone_question"],
+                "context": x["context"],
+            })
+        )
+    )
+
+
+async def run_load(chain, total: int, concurrency: int) -> float:
+    history = [HumanMessage(content="Tell me about their backend work"), AIMessage(content="...")]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            await chain.ainvoke({
+                "question": f"What about Kafka? ({i})",
+                "chat_history": history,
+            })
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency per call (seconds)")
+    args = parser.parse_args()
+
+    embeddings = FakeEmbeddings(size=256)
+    vs = FAISS.from_documents(sample_docs(), embeddings)
+    retriever = get_retriever(vs)
+    llm = FakeLatencyChatModel(latency=args.latency)
+
+    chains = {
+        "legacy (sync lambdas)": build_legacy_chain(retriever, llm),
+        "native async": build_conv_rag_chain(retriever, llm=llm),
+    }
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"2 LLM calls/request at {args.latency * 1000:.0f} ms each")
+    for name, chain in chains.items():
+        elapsed = asyncio.run(run_load(chain, args.requests, args.concurrency))
+        print(f"  {name:<24} {elapsed:7.2f} s  {args.requests / elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Single-flight coalescing in RAGService.query: identical concurrent questions.
+
+Fires bursts of the same starter questions at once (as a recruiter page does for many
+visitors) with coalescing off and on, counting LLM calls. Then cancels the leader of a
+burst, as a disconnecting client would, and checks that its followers still get the answer.
+
+Usage:
+    python -m benchmarks.bench_coalescing --visitors 200 --questions 3 --llm-latency 0.2
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import rag_chain
+import app.services.rag_service as rag_module
+from app.core.config import settings
+from app.services.admission import AdmissionController
+from app.services.rag_service import RAGService
+from benchmarks.fakes import FakeLatencyChatModel
+from providers import FakeEmbeddings
+
+STARTERS = [
+    "What is the candidate's strongest programming language?",
+    "Summarize the candidate's most recent role.",
+    "Which cloud platforms has the candidate used?",
+    "What is the candidate's education?",
+]
+
+
+class CountingChatModel(FakeLatencyChatModel):
+    calls: int = 0
+
+    async def _agenerate(self, *args, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(*args, **kwargs)
+
+
+async def make_service(args, coalesce: bool) -> RAGService:
+    service = RAGService(resume_path=args.resume, vectorstore_path=str(Path(args.tmp) / ".faiss_index"))
+    # Measure coalescing on its own
+    service.answer_cache = None
+    service._coalesce = coalesce
+    await service.initialize()
+    return service
+
+
+async def burst(service: RAGService, visitors: int, questions: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        service.query(STARTERS[i % questions], []) for i in range(visitors)
+    ))
+    return time.perf_counter() - start
+
+
+async def run(args) -> int:
+    for coalesce in (False, True):
+        llm = CountingChatModel(latency=args.llm_latency)
+        rag_chain._get_llm = lambda: llm
+        service = await make_service(args, coalesce)
+        elapsed = await burst(service, args.visitors, args.questions)
+        label = "coalesced" if coalesce else "independent"
+        print(f"  {label:<12} {elapsed:6.2f} s   {llm.calls:>5} LLM calls   {service.stats()['coalescing']}")
+
+    # Leader disconnects mid-flight; followers must still be answered
+    llm = CountingChatModel(latency=args.llm_latency)
+    rag_chain._get_llm = lambda: llm
+    service = await make_service(args, True)
+    leader = asyncio.ensure_future(service.query(STARTERS[0], []))
+    await asyncio.sleep(0)
+    followers = [asyncio.ensure_future(service.query(STARTERS[0], [])) for _ in range(5)]
+    await asyncio.sleep(args.llm_latency / 2)
+    leader.cancel()
+    results = await asyncio.gather(*followers, return_exceptions=True)
+    answered = sum(isinstance(r, dict) and bool(r.get("answer")) for r in results)
+    print(f"  leader cancelled: {answered}/{len(followers)} followers answered, leader cancelled={leader.cancelled()}")
+    return 0 if answered == len(followers) else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resume", default=settings.resume_path)
+    parser.add_argument("--visitors", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=3, choices=range(1, len(STARTERS) + 1))
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    args.tmp = tempfile.mkdtemp()
+
+    rag_chain._get_embeddings = lambda: FakeEmbeddings(size=256)
+    # Unbounded concurrency, so the independent run isn't shed by admission control
+    rag_module.admission_controller = AdmissionController(max_concurrent=0)
+    print(f"{args.visitors} simultaneous visitors asking {args.questions} starter question(s), "
+          f"LLM latency {args.llm_latency * 1000:.0f} ms")
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
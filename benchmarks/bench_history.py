@@ -0,0 +1,62 @@
+"""
+Cost of building the chat history for a turn, and how many prompt tokens it adds.
+
+Compares the uncapped window (every stored exchange, as before) with a token-budgeted one
+as an interview grows. The per-turn time covers get_langchain_format only.
+
+Usage:
+    python -m benchmarks.bench_history --turns 10 25 50 --budget 2000
+"""
+
+import argparse
+import time
+
+from app.services.history_window import HistoryWindows, count_tokens
+from app.services.memory_service import ChatMemoryService
+
+QUESTION = "Can you tell me more about the data pipeline work at the second company and the tools used?"
+ANSWER = (
+    "The candidate built a streaming ingestion pipeline on Kafka and Spark, cut end-to-end latency "
+    "from hours to minutes, and owned the Airflow orchestration and on-call runbooks for it. "
+) * 2
+
+
+def bench(turns: int, budget: int) -> None:
+    memory = ChatMemoryService(
+        session_timeout_minutes=30,
+        cleanup_interval_seconds=3600,
+        max_history=turns,
+        windows=HistoryWindows(token_budget=budget),
+    )
+    try:
+        elapsed = 0.0
+        for i in range(turns):
+            start = time.perf_counter()
+            messages = memory.get_langchain_format("s")
+            elapsed += time.perf_counter() - start
+            memory.add_exchange("s", f"{i}: {QUESTION}", ANSWER)
+        start = time.perf_counter()
+        messages = memory.get_langchain_format("s")
+        elapsed += time.perf_counter() - start
+        tokens = sum(count_tokens(m.content) + 4 for m in messages)
+        label = budget if budget else "none"
+        print(f"  {turns:>4} turns, budget {label!s:>5}: {elapsed / (turns + 1) * 1e6:8.1f} µs/turn, "
+              f"{len(messages):>3} messages, ~{tokens:>6} history tokens in the last prompt")
+    finally:
+        memory.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--budget", type=int, default=2000)
+    args = parser.parse_args()
+
+    count_tokens("warm up")  # resolve the tokenizer (or its fallback) outside the timings
+    for turns in args.turns:
+        bench(turns, 0)
+        bench(turns, args.budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Index on disk: FAISS.save_local (pickled docstore) vs. the compact format of mapped_index.py.
+
+For each corpus size the same FAISS store is saved both ways (compact as float32 and float16)
+and loaded --repeat times; the median is reported. The files stay in the page cache between
+loads, so the times are parse/deserialise cost, not disk reads:
+
+    size        bytes on disk of the index files (embedding store and BM25 excluded)
+    memory      load into an in-memory FAISS store (INDEX_LOAD_MODE=memory)
+    mmap        map the compact files (INDEX_LOAD_MODE=mmap); not available for the pickle
+    parity      share of MMR queries whose results match the pickled store's exactly
+
+Usage:
+    python -m benchmarks.bench_index_format --chunks 40 4000 20000 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import DenseFakeEmbeddings, sample_docs
+from mapped_index import INDEX_FILES, MappedIndex, save_index
+from rag_chain import faiss_from_index
+
+
+def median_ms(load: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def size_mb(path: str, names) -> float:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in names) / 2**20
+
+
+def parity(reference: FAISS, other: FAISS, queries: List[str]) -> float:
+    def key(vs: FAISS, q: str):
+        return [d.page_content for d in vs.max_marginal_relevance_search(q, k=4, fetch_k=12)]
+    return sum(key(reference, q) == key(other, q) for q in queries) / len(queries)
+
+
+def bench(chunks: int, repeat: int, queries: List[str]) -> None:
+    embeddings = DenseFakeEmbeddings(size=1536)
+    vs = FAISS.from_documents(sample_docs(chunks), embeddings)
+    root = tempfile.mkdtemp()
+
+    pickle_path = os.path.join(root, "pickle")
+    vs.save_local(pickle_path)
+    pickled = FAISS.load_local(pickle_path, embeddings, allow_dangerous_deserialization=True)
+    load_ms = median_ms(lambda: FAISS.load_local(pickle_path, embeddings, allow_dangerous_deserialization=True), repeat)
+    print(f"  {chunks:>6} chunks  pickle            {size_mb(pickle_path, ['index.faiss', 'index.pkl']):8.2f} MB   "
+          f"memory {load_ms:8.2f} ms   mmap      n/a")
+
+    for dtype in ("float32", "float16"):
+        path = os.path.join(root, dtype)
+        save_index(vs, path, dtype=dtype)
+        memory_ms = median_ms(lambda: faiss_from_index(MappedIndex(path, embeddings), embeddings), repeat)
+        mmap_ms = median_ms(lambda: MappedIndex(path, embeddings), repeat)
+        match = parity(pickled, faiss_from_index(MappedIndex(path, embeddings), embeddings), queries)
+        print(f"  {chunks:>6} chunks  compact {dtype}   {size_mb(path, INDEX_FILES):8.2f} MB   "
+              f"memory {memory_ms:8.2f} ms   mmap {mmap_ms:8.2f} ms   parity {match:6.1%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[40, 4000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    queries = [f"Which projects used tool {i}?" for i in range(args.queries)]
+    print(f"1536-d, median of {args.repeat} loads, parity over {args.queries} MMR queries")
+    for chunks in args.chunks:
+        bench(chunks, args.repeat, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Per-write cost of ChatMemoryService as the number of live sessions grows.
+
+Every add_exchange also runs session expiry; with the activity-ordered store that only
+inspects sessions that are due, so the cost per write should stay flat. For reference the
+script also times one full scan over all sessions, which is what each write used to pay.
+
+Usage:
+    python -m benchmarks.bench_memory --sessions 1000 10000 100000 --writes 20000
+"""
+
+import argparse
+import random
+import time
+
+from app.services.memory_service import ChatMemoryService
+
+
+def bench(session_count: int, writes: int) -> None:
+    memory = ChatMemoryService(session_timeout_minutes=30, cleanup_interval_seconds=3600)
+    try:
+        for i in range(session_count):
+            memory.add_exchange(f"s{i}", "question", "answer")
+
+        ids = [f"s{random.randrange(session_count)}" for _ in range(writes)]
+        start = time.perf_counter()
+        for session_id in ids:
+            memory.add_exchange(session_id, "follow-up question", "answer")
+        per_write = (time.perf_counter() - start) / writes
+
+        # What the old implementation did on every write: scan every session's timestamp
+        cutoff = time.time() - memory._session_timeout.total_seconds()
+        start = time.perf_counter()
+        _ = [sid for sid, ts in memory.backend._last_activity.items() if ts < cutoff]
+        full_scan = time.perf_counter() - start
+
+        print(f"  {session_count:>8} sessions: {per_write * 1e6:7.2f} µs/write   "
+              f"(one full expiry scan: {full_scan * 1e6:10.1f} µs)")
+    finally:
+        memory.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--writes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"add_exchange cost, {args.writes} writes to random existing sessions")
+    for count in args.sessions:
+        bench(count, args.writes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Unanswered-question notifications: inline send vs. background outbox.
+
+Runs against a local stand-in SMTP server with injected connect/message latency and reports
+the time spent on the request path, SMTP connections opened and emails delivered.
+
+Usage:
+    python -m benchmarks.bench_outbox --notifications 50 --distinct 10 --connect-latency 0.3
+"""
+
+import argparse
+import time
+
+from app.services.notification_outbox import NotificationOutbox
+from benchmarks.smtp_standin import StandInSMTPServer
+from email_sender import SMTPConnection, build_message
+
+ADDRESS = "bench@example.com"
+
+
+def run_inline(server: StandInSMTPServer, questions) -> float:
+    """Previous behaviour: a fresh SMTP connection per unknown answer, on the request path."""
+    start = time.perf_counter()
+    for question in questions:
+        connection = SMTPConnection(host="127.0.0.1", port=server.port, use_ssl=False, username=None)
+        try:
+            connection.send(build_message("Interview Question - Needs Review", question, address=ADDRESS))
+        finally:
+            connection.close()
+    return time.perf_counter() - start
+
+
+def run_outbox(server: StandInSMTPServer, questions, window: float):
+    outbox = NotificationOutbox(
+        connection=SMTPConnection(host="127.0.0.1", port=server.port, use_ssl=False, username=None),
+        address=ADDRESS,
+        batch_window_seconds=window,
+    )
+    start = time.perf_counter()
+    for i, question in enumerate(questions):
+        outbox.enqueue(question, f"session-{i}")
+    request_path = time.perf_counter() - start
+    outbox.stop()
+    return request_path, time.perf_counter() - start, outbox.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=10, help="Distinct questions among the notifications")
+    parser.add_argument("--connect-latency", type=float, default=0.3, help="Seconds per SMTP connection setup")
+    parser.add_argument("--message-latency", type=float, default=0.05, help="Seconds per accepted message")
+    parser.add_argument("--window", type=float, default=0.5, help="Outbox batch window (seconds)")
+    args = parser.parse_args()
+
+    questions = [f"Does the candidate know technology #{i % args.distinct}?" for i in range(args.notifications)]
+
+    server = StandInSMTPServer(connect_latency=args.connect_latency, message_latency=args.message_latency).start()
+    inline = run_inline(server, questions)
+    inline_conns, inline_msgs = server.connections, len(server.messages)
+    server.stop()
+
+    server = StandInSMTPServer(connect_latency=args.connect_latency, message_latency=args.message_latency).start()
+    request_path, total, stats = run_outbox(server, questions, args.window)
+    outbox_conns, outbox_msgs = server.connections, len(server.messages)
+    server.stop()
+
+    print(f"{args.notifications} notifications ({args.distinct} distinct questions)")
+    print(f"  inline send : request path {inline * 1000:8.1f} ms, "
+          f"{inline_conns} connection(s), {inline_msgs} email(s)")
+    print(f"  outbox      : request path {request_path * 1000:8.1f} ms, "
+          f"{outbox_conns} connection(s), {outbox_msgs} email(s), drained in {total:.2f} s")
+    print(f"  outbox stats: {stats}")
+    assert outbox_msgs == stats["emails_sent"], "stand-in server and outbox disagree on delivered emails"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Query-embedding cost with and without CachedEmbeddings.
+
+Questions are drawn from a skewed (Zipf-like) distribution over a fixed pool, as real
+interview traffic repeats the same standalone questions. Embedding calls are faked with
+a fixed latency per call, so "calls" is what would be paid to the provider.
+
+Usage:
+    python -m benchmarks.bench_query_embeddings --requests 2000 --concurrency 64 --pool 200 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.fakes import FakeLatencyEmbeddings
+from embedding_cache import CachedEmbeddings
+
+
+async def run(embeddings, questions, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(question: str) -> None:
+        async with sem:
+            await embeddings.aembed_query(question)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--pool", type=int, default=200, help="Distinct questions")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake embedding latency per call (seconds)")
+    parser.add_argument("--cache-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(args.pool)]
+    questions = [f"What did the candidate do with technology {i}?"
+                 for i in rng.choices(range(args.pool), weights=weights, k=args.requests)]
+
+    print(f"{args.requests} queries over {args.pool} distinct questions, concurrency {args.concurrency}, "
+          f"{args.latency * 1000:.0f} ms per embedding call")
+
+    plain = FakeLatencyEmbeddings(size=1536, latency=args.latency)
+    elapsed = asyncio.run(run(plain, questions, args.concurrency))
+    print(f"  {'uncached':<10} {elapsed:7.2f} s  {args.requests / elapsed:8.1f} q/s  {plain.calls:>5} embed calls")
+
+    inner = FakeLatencyEmbeddings(size=1536, latency=args.latency)
+    cached = CachedEmbeddings(inner, max_entries=args.cache_size)
+    elapsed = asyncio.run(run(cached, questions, args.concurrency))
+    stats = cached.stats()
+    print(f"  {'cached':<10} {elapsed:7.2f} s  {args.requests / elapsed:8.1f} q/s  {inner.calls:>5} embed calls  "
+          f"(hit rate {stats['hit_rate']:.1%}, {stats['coalesced']} coalesced, "
+          f"~{stats['saved_latency_ms'] / 1000:.1f} s of embedding latency saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Concurrent queries during index rebuilds: checks that no request fails and measures latency.
+
+The RAG service is built on fake embeddings and a fake LLM in a temporary index directory.
+While worker tasks query it continuously, the script runs two full rebuilds and one rebuild
+that fails (missing resume). Every query must succeed and the failed rebuild must leave the
+previous generation serving. Exits non-zero if any query failed.
+
+Usage:
+    python -m benchmarks.bench_rebuild --workers 32 --embed-latency 0.2
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import rag_chain
+from app.core.config import settings
+from app.services.rag_service import RAGService
+from benchmarks.fakes import FakeLatencyChatModel, FakeLatencyEmbeddings
+
+
+async def run(args) -> int:
+    tmp = tempfile.mkdtemp()
+    service = RAGService(resume_path=args.resume, vectorstore_path=str(Path(tmp) / ".faiss_index"))
+    # Every question should reach the chain
+    service.answer_cache = None
+    await service.initialize()
+
+    latencies = []
+    errors = []
+    generations = Counter()
+    stop = asyncio.Event()
+
+    async def worker(w: int) -> None:
+        i = 0
+        while not stop.is_set():
+            generation = service.generation
+            start = time.perf_counter()
+            try:
+                await service.query(f"Worker {w} question {i} about Kafka?", [])
+                latencies.append(time.perf_counter() - start)
+                generations[generation] += 1
+            except Exception as e:
+                errors.append(repr(e))
+            i += 1
+
+    workers = [asyncio.create_task(worker(w)) for w in range(args.workers)]
+    await asyncio.sleep(0.5)
+
+    for force in (True, False):
+        await service.rebuild(force_delete=force)
+        status = service.get_rebuild_status()
+        print(f"  rebuild force_delete={force}: {status['state']} in {status['duration_seconds']:.2f} s, "
+              f"serving generation {status['serving_generation']}")
+        await asyncio.sleep(0.5)
+
+    resume_path, service.resume_path = service.resume_path, str(Path(tmp) / "missing.pdf")
+    try:
+        await service.rebuild(force_delete=True)
+    except Exception:
+        pass
+    service.resume_path = resume_path
+    status = service.get_rebuild_status()
+    print(f"  failing rebuild: {status['state']} ({status['error']}), still serving generation "
+          f"{status['serving_generation']}, ready={status['ready']}")
+
+    await asyncio.sleep(0.5)
+    stop.set()
+    await asyncio.gather(*workers)
+
+    ms = sorted(l * 1000 for l in latencies)
+    print(f"  {len(latencies)} queries ok, {len(errors)} failed; latency p50 {statistics.median(ms):.0f} ms, "
+          f"p99 {ms[int(len(ms) * 0.99) - 1]:.0f} ms; queries per generation {dict(sorted(generations.items()))}")
+    for error in errors[:5]:
+        print(f"    {error}")
+    return 1 if errors else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resume", default=settings.resume_path)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="Fake latency per embedding call (seconds)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM latency per call (seconds)")
+    args = parser.parse_args()
+
+    # Offline models for everything bootstrap_rag builds
+    rag_chain._get_embeddings = lambda: FakeLatencyEmbeddings(size=256, latency=args.embed_latency)
+    rag_chain._get_llm = lambda: FakeLatencyChatModel(latency=args.llm_latency)
+
+    print(f"{args.workers} concurrent query workers during rebuilds of {args.resume}")
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
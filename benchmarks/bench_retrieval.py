@@ -0,0 +1,69 @@
+"""
+Retrieval latency and result parity: FAISS wrapper MMR vs. the NumPy exact engine.
+
+Query embeddings are computed up front, so the timings cover search + MMR only.
+"numpy batched" searches all queries in one call. Parity is the share of queries whose
+MMR results match FAISS exactly (same documents, same order), plus mean overlap@k.
+
+Usage:
+    python -m benchmarks.bench_retrieval --chunks 40 400 4000 --queries 500
+"""
+
+import argparse
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import DenseFakeEmbeddings, sample_docs
+from retrievers import MMRRetriever, NumpyRetriever
+
+
+def bench(chunks: int, queries: int, k: int, fetch_k: int, lambda_mult: float) -> None:
+    embeddings = DenseFakeEmbeddings(size=1536)
+    vs = FAISS.from_documents(sample_docs(chunks), embeddings)
+    params = dict(k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+    faiss_retriever = MMRRetriever(vectorstore=vs, **params)
+    numpy_retriever = NumpyRetriever.from_faiss(vs, **params)
+    vectors = embeddings.embed_documents([f"Which projects used tool {i}?" for i in range(queries)])
+
+    start = time.perf_counter()
+    faiss_results = [faiss_retriever._search(v) for v in vectors]
+    faiss_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    numpy_results = [numpy_retriever._search([v])[0] for v in vectors]
+    numpy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched_results = numpy_retriever._search(vectors)
+    batched_time = time.perf_counter() - start
+
+    def key(docs):
+        return [d.page_content for d in docs]
+
+    exact = sum(key(a) == key(b) for a, b in zip(faiss_results, numpy_results)) / queries
+    overlap = sum(len(set(key(a)) & set(key(b))) / k for a, b in zip(faiss_results, numpy_results)) / queries
+    assert [key(d) for d in batched_results] == [key(d) for d in numpy_results]
+
+    print(f"  {chunks:>6} chunks:  faiss {faiss_time / queries * 1e6:8.1f} µs/query   "
+          f"numpy {numpy_time / queries * 1e6:8.1f} µs/query   "
+          f"numpy batched {batched_time / queries * 1e6:8.1f} µs/query   "
+          f"parity {exact:6.1%} exact, {overlap:6.1%} overlap@{k}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[40, 400, 4000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=12)
+    parser.add_argument("--lambda-mult", type=float, default=0.6)
+    args = parser.parse_args()
+
+    print(f"{args.queries} queries, k={args.k}, fetch_k={args.fetch_k}, lambda={args.lambda_mult}, 1536-d")
+    for chunks in args.chunks:
+        bench(chunks, args.queries, args.k, args.fetch_k, args.lambda_mult)
+
+
+if __name__ == "__main__":
+    main()
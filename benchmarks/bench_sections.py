@@ -0,0 +1,98 @@
+"""
+Section-aware chunking and routed retrieval vs. flat character chunks.
+
+Indexes the resume three ways and runs a set of labelled questions through the retriever:
+
+  flat      the previous chunker (page text split every 450 chars), no routing
+  sections  layout-aware chunks (one per entry / section), no routing
+  routed    layout-aware chunks, results from the section(s) the router picks plus the best
+            BM25 match outside them (unrestricted search only when the sections come up short)
+
+Per configuration it reports retrieval latency, context tokens sent to the QA prompt, and how
+often the retrieved context contains the labelled answer (hit) and what share of chunks do
+(precision). Embeddings are the offline fake provider's hashed bags of words, so dense ranking
+is only roughly lexical; the BM25 side and routing behave as in production.
+
+Usage:
+    python -m benchmarks.bench_sections --repeat 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from app.core.config import settings
+from app.services.history_window import count_tokens
+from bm25_index import BM25Index
+from providers import FakeEmbeddings
+from rag_chain import build_or_load_vectorstore, format_docs, get_retriever
+from resume_loader import _split_flat, split_resume_sections
+
+# (question, text the retrieved context must contain to answer it)
+QUESTIONS = [
+    ("Where did the candidate study for their master's degree?", "Northeastern"),
+    ("What was the candidate's GPA at university?", "GPA: 3.9"),
+    ("Which databases does the candidate know?", "PostgreSQL"),
+    ("What did the candidate work on at Accenture?", "Accenture"),
+    ("What did the candidate do at Ribbon Communications?", "Helm"),
+    ("Tell me about the Share Bite project", "surplus food"),
+    ("Which projects used Terraform?", "Terraform"),
+    ("What is the candidate's most recent role?", "DevOps Engineer Intern"),
+    ("Give me an overview of the candidate's background", "AWS-certified"),
+    ("Has the candidate worked with Kafka?", "Kafka"),
+    ("What programming languages does the candidate use?", "Python"),
+    ("When did the candidate graduate from college?", "May 2020"),
+]
+
+
+def build(docs, routing: bool):
+    os.environ["SECTION_ROUTING"] = "true" if routing else "false"
+    vs = build_or_load_vectorstore(docs, FakeEmbeddings(size=256), None)
+    return get_retriever(vs, bm25=BM25Index.from_vectorstore(vs))
+
+
+async def measure(label: str, retriever, chunks: int, repeat: int) -> None:
+    latencies, tokens, hits, precision = [], [], 0, []
+    for question, expected in QUESTIONS:
+        docs = await retriever.ainvoke(question)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await retriever.ainvoke(question)
+        latencies.append((time.perf_counter() - start) / repeat)
+        tokens.append(count_tokens(format_docs(docs)))
+        relevant = [expected in d.page_content for d in docs]
+        hits += any(relevant)
+        precision.append(sum(relevant) / len(docs) if docs else 0.0)
+    print(f"  {label:<9} {chunks:>3} chunks   retrieval {statistics.mean(latencies) * 1e6:7.1f} us   "
+          f"context {statistics.mean(tokens):6.1f} tokens   hit {hits}/{len(QUESTIONS)}   "
+          f"precision {statistics.mean(precision):.2f}")
+
+
+async def run(args) -> None:
+    flat = _split_flat(args.resume)
+    sections = split_resume_sections(args.resume)
+    await measure("flat", build(flat, routing=False), len(flat), args.repeat)
+    await measure("sections", build(sections, routing=False), len(sections), args.repeat)
+    routed = build(sections, routing=True)
+    await measure("routed", routed, len(sections), args.repeat)
+    stats = routed.stats()
+    print(f"  routing: {stats['routing']}")
+    print(f"  whole sections {stats['whole_sections']}   unrouted added {stats['unrouted_added']}   "
+          f"fallback {stats['fallback']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resume", default=settings.resume_path)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--backend", choices=["faiss", "numpy"], default=os.getenv("RETRIEVER_BACKEND", "faiss"))
+    args = parser.parse_args()
+    os.environ["RETRIEVER_BACKEND"] = args.backend
+    print(f"{len(QUESTIONS)} labelled questions, {args.backend} backend, {args.repeat} repeats each")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
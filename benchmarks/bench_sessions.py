@@ -0,0 +1,81 @@
+"""
+Session backend throughput: in-memory vs. SQLite (WAL, batched writes) vs. Redis.
+
+The Redis backend runs against benchmarks.fake_redis unless --redis-url points at a real server.
+Each backend gets the same multi-threaded workload: per turn, read a session's history
+(get_langchain_format) and then append an exchange (add_exchange).
+
+Usage:
+    python -m benchmarks.bench_sessions --sessions 2000 --turns 20000 --threads 8
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from app.services.memory_service import ChatMemoryService
+from app.services.session_backends import (
+    InMemorySessionBackend,
+    RedisSessionBackend,
+    SQLiteSessionBackend,
+)
+from benchmarks.fake_redis import FakeRedis
+
+MAX_HISTORY = 50
+
+
+def run(name: str, backend, sessions: int, turns: int, threads: int) -> None:
+    memory = ChatMemoryService(session_timeout_minutes=30, cleanup_interval_seconds=3600, backend=backend)
+    per_thread = turns // threads
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            session_id = f"s{rng.randrange(sessions)}"
+            memory.get_langchain_format(session_id)
+            memory.add_exchange(session_id, "What about Kafka?", "The candidate used Kafka for event streaming.")
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    active = memory.session_count()
+    memory.close()
+    print(f"  {name:<10} {per_thread * threads / elapsed:10.0f} turns/s   ({elapsed:.2f} s, {active} sessions)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sqlite-batch-size", type=int, default=64)
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis server instead of the in-process fake")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns (read + write) over {args.sessions} sessions, {args.threads} threads")
+    run("memory", InMemorySessionBackend(MAX_HISTORY), args.sessions, args.turns, args.threads)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteSessionBackend(
+            os.path.join(tmp, "sessions.db"), MAX_HISTORY, batch_size=args.sqlite_batch_size
+        )
+        run("sqlite", backend, args.sessions, args.turns, args.threads)
+
+    if args.redis_url:
+        redis_backend = RedisSessionBackend(MAX_HISTORY, url=args.redis_url, prefix="bench:")
+        label = "redis"
+    else:
+        redis_backend = RedisSessionBackend(MAX_HISTORY, client=FakeRedis())
+        label = "redis-fake"
+    run(label, redis_backend, args.sessions, args.turns, args.threads)
+
+
+if __name__ == "__main__":
+    main()
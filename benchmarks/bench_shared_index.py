@@ -0,0 +1,127 @@
+"""
+Memory per worker process with a private FAISS index vs. one memory-mapped index shared by all.
+
+Builds a synthetic index (--chunks rows of --dim float32 vectors plus chunk text), then starts
+--workers processes per mode. Each loads the index, runs --queries MMR searches (so every page
+of the matrix is touched) and, while all workers of the mode are still alive, reports:
+
+    RSS                  resident set size before loading and after the queries
+    private              pages only this process maps, before and after (what each extra worker costs)
+    PSS                  proportional set size: shared pages split between the processes mapping them
+
+Modes: memory/faiss (in-memory FAISS store + FAISS MMR, the default), memory/numpy (the same
+store + NumPy engine, which copies the vectors again) and mmap (INDEX_LOAD_MODE=mmap).
+
+Usage:
+    python -m benchmarks.bench_shared_index --chunks 20000 --dim 1536 --workers 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+
+
+def memory_mb() -> Dict[str, float]:
+    """RSS, PSS and private memory of this process in MB (Linux /proc/self/smaps_rollup)."""
+    fields: Dict[str, float] = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def build_index(path: str, chunks: int, dim: int) -> None:
+    from langchain_community.vectorstores import FAISS
+
+    from mapped_index import save_index
+    from providers import FakeEmbeddings
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    sections = ["experience", "education", "skills", "projects"]
+    texts = [f"Chunk {i}: " + "built and operated production services " * 10 for i in range(chunks)]
+    vs = FAISS.from_embeddings(
+        list(zip(texts, vectors.tolist())),
+        FakeEmbeddings(size=dim),
+        metadatas=[{"section": sections[i % len(sections)]} for i in range(chunks)],
+    )
+    save_index(vs, path)
+
+
+def worker(mode: str, path: str, dim: int, queries: int, loaded, done, results) -> None:
+    os.environ["SECTION_ROUTING"] = "false"
+    os.environ["HYBRID_RETRIEVAL"] = "false"
+    import rag_chain
+    from providers import FakeEmbeddings
+
+    load_mode, backend = mode.split("/") if "/" in mode else (mode, "numpy")
+    before = memory_mb()
+    start = time.perf_counter()
+    vs = rag_chain.build_or_load_vectorstore(None, FakeEmbeddings(size=dim), path, load_mode=load_mode)
+    retriever = rag_chain.get_retriever(vs, backend=backend)
+    load_ms = (time.perf_counter() - start) * 1000
+    for i in range(queries):
+        retriever.invoke(f"question {i} about production services")
+    loaded.wait()
+    results.put({"before": before, "after": memory_mb(), "load_ms": load_ms})
+    done.wait()
+
+
+def run_mode(mode: str, path: str, args) -> None:
+    ctx = mp.get_context("spawn")
+    loaded, done = ctx.Barrier(args.workers + 1), ctx.Barrier(args.workers + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(mode, path, args.dim, args.queries, loaded, done, results))
+        for _ in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    loaded.wait()
+    rows = [results.get() for _ in procs]
+    done.wait()
+    for p in procs:
+        p.join()
+
+    print(f"  {mode}")
+    for i, r in enumerate(rows):
+        before, after = r["before"], r["after"]
+        print(f"    worker {i}: RSS {before['rss']:6.1f} -> {after['rss']:6.1f} MB   "
+              f"private {before['private']:6.1f} -> {after['private']:6.1f} MB   "
+              f"PSS {after['pss']:6.1f} MB   load {r['load_ms']:6.1f} ms")
+    added = sum(r["after"]["private"] - r["before"]["private"] for r in rows)
+    print(f"    total PSS {sum(r['after']['pss'] for r in rows):7.1f} MB, "
+          f"private memory added by loading {added:7.1f} MB ({added / len(rows):.1f} MB per worker)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", default=["memory/faiss", "memory/numpy", "mmap"])
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), ".faiss_index")
+    build_index(path, args.chunks, args.dim)
+    size_mb = os.path.getsize(os.path.join(path, "vectors.npy")) / 2**20
+    print(f"{args.chunks} chunks x {args.dim} dims ({size_mb:.0f} MB of vectors), {args.workers} workers per mode")
+    for mode in args.modes:
+        run_mode(mode, path, args)
+
+
+if __name__ == "__main__":
+    main()
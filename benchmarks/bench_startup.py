@@ -0,0 +1,232 @@
+"""
+Cold start: import time budget for the API, and time to ready for the API and Streamlit UI.
+
+Each measurement runs in a fresh interpreter (median of --repeat runs), against the fake
+providers and an index built beforehand, so it counts what a restarting worker pays:
+
+    import      `python -X importtime -c "import app.core.app"`, cumulative time of the import
+    create_app  import + create_app(), timed inside the process
+    ready       create_app() + lifespan startup (RAG service loaded from the existing index)
+    streamlit   one bare-mode run of streamlit_app.py up to a ready runtime (skipped without streamlit)
+
+The import is also checked against a budget (--budget-ms) and for modules that must stay lazy
+(provider SDKs, the PDF stack, langchain_community, faiss); any violation exits non-zero.
+--save / --compare work like bench_api's.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5 --budget-ms 1800
+    python -m benchmarks.bench_startup --compare benchmarks/baselines/bench_startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Only loaded once they are needed: by the selected provider, a resume parse or an index load
+LAZY_MODULES = [
+    "langchain_openai",
+    "openai",
+    "langchain_huggingface",
+    "sentence_transformers",
+    "transformers",
+    "torch",
+    "langchain_community",
+    "pymupdf",
+    "faiss",
+    "tiktoken",
+]
+
+CREATE_APP = """
+import time
+start = time.perf_counter()
+from app.core.app import create_app
+create_app()
+print("elapsed", time.perf_counter() - start)
+"""
+
+READY = """
+import asyncio, time
+start = time.perf_counter()
+from app.core.app import create_app
+app = create_app()
+async def main():
+    async with app.router.lifespan_context(app):
+        print("elapsed", time.perf_counter() - start)
+asyncio.run(main())
+"""
+
+LOADED = """
+import json, sys
+import app.core.app
+print(json.dumps(sorted(m for m in {modules!r} if m in sys.modules)))
+"""
+
+STREAMLIT = """
+import runpy, time
+start = time.perf_counter()
+runpy.run_path("streamlit_app.py", run_name="__main__")
+from app.services.rag_service import rag_service
+assert rag_service.is_ready()
+print("elapsed", time.perf_counter() - start)
+"""
+
+
+def python(code: str, env: Dict[str, str], *flags: str) -> Tuple[str, str]:
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return result.stdout, result.stderr
+
+
+def import_profile(env: Dict[str, str]) -> Tuple[float, List[Tuple[float, str]]]:
+    """Cumulative import time of app.core.app (ms) and the slowest top-level imports under it."""
+    _, stderr = python("import app.core.app", env, "-X", "importtime")
+    total = 0.0
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        ms = int(cumulative) / 1000
+        if name.strip() == "app.core.app" and depth == 0:
+            total = ms
+        elif depth == 1:
+            children.append((ms, name.strip()))
+    return total, sorted(children, reverse=True)
+
+
+def timed_run(code: str, env: Dict[str, str]) -> float:
+    stdout, _ = python(code, env)
+    # The app prints its own startup messages; the snippet's line is tagged
+    elapsed = [line.split()[1] for line in stdout.splitlines() if line.startswith("elapsed ")]
+    return float(elapsed[-1]) * 1000
+
+
+def median(values: List[float]) -> float:
+    return round(statistics.median(values), 1)
+
+
+def measure(args, env: Dict[str, str]) -> Dict:
+    imports, profile = [], []
+    for _ in range(args.repeat):
+        total, profile = import_profile(env)
+        imports.append(total)
+    report = {
+        "config": {"repeat": args.repeat, "llm_provider": env["LLM_PROVIDER"], "embeddings_provider": env["EMBEDDINGS_PROVIDER"]},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(terse=True)},
+        "cold_start_ms": {
+            "import": median(imports),
+            "create_app": median([timed_run(CREATE_APP, env) for _ in range(args.repeat)]),
+            "ready": median([timed_run(READY, env) for _ in range(args.repeat)]),
+        },
+        "slowest_imports_ms": {name: round(ms, 1) for ms, name in profile[:args.top]},
+    }
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        report["cold_start_ms"]["streamlit"] = None
+    else:
+        report["cold_start_ms"]["streamlit"] = median([timed_run(STREAMLIT, env) for _ in range(args.repeat)])
+    stdout, _ = python(LOADED.format(modules=LAZY_MODULES), env)
+    report["eagerly_imported"] = json.loads(stdout)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    config = report["config"]
+    print(f"Cold start (median of {config['repeat']}, LLM {config['llm_provider']}, "
+          f"embeddings {config['embeddings_provider']}):")
+    for name, ms in report["cold_start_ms"].items():
+        print(f"  {name:<12} {'skipped (streamlit not installed)' if ms is None else f'{ms:8.1f} ms'}")
+    print("Slowest imports under app.core.app:")
+    for name, ms in report["slowest_imports_ms"].items():
+        print(f"  {name:<40} {ms:8.1f} ms")
+
+
+def check_budget(report: Dict, budget_ms: float) -> bool:
+    ok = True
+    if report["cold_start_ms"]["import"] > budget_ms:
+        print(f"  OVER BUDGET: import app.core.app took {report['cold_start_ms']['import']:.1f} ms "
+              f"(budget {budget_ms:.0f} ms)")
+        ok = False
+    if report["eagerly_imported"]:
+        print(f"  NOT LAZY: import app.core.app loads {', '.join(report['eagerly_imported'])}")
+        ok = False
+    if ok:
+        print(f"  within budget ({budget_ms:.0f} ms), nothing lazy imported eagerly")
+    return ok
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> bool:
+    """Print changes against the baseline; False when a cold start regressed beyond tolerance."""
+    if baseline.get("config") != report["config"]:
+        print("  note: baseline was recorded with a different config")
+    ok = True
+    print("Against baseline:")
+    for name, new in report["cold_start_ms"].items():
+        old = baseline["cold_start_ms"].get(name)
+        if new is None or not old:
+            continue
+        change = (new - old) / old
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"  {name:<12} {old:>9.1f} -> {new:>9.1f} ms  {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1800.0, help="Max cumulative import time of app.core.app")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list")
+    parser.add_argument("--llm-provider", default="fake")
+    parser.add_argument("--embeddings-provider", default="fake")
+    parser.add_argument("--save", default=None, help="Write the report as JSON")
+    parser.add_argument("--compare", default=None, help="Compare with a saved JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression for --compare")
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        LLM_PROVIDER=args.llm_provider,
+        EMBEDDINGS_PROVIDER=args.embeddings_provider,
+        FAKE_EMBEDDINGS_LATENCY_MS="0",
+        VECTORSTORE_PATH=str(Path(tempfile.mkdtemp()) / ".faiss_index"),
+        PYTHONPATH=str(ROOT),
+    )
+    # Build the index once, so every timed start loads it instead of embedding the resume
+    timed_run(READY, env)
+
+    report = measure(args, env)
+    print_report(report)
+    ok = check_budget(report, args.budget_ms)
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            ok = compare(report, json.load(f), args.tolerance) and ok
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
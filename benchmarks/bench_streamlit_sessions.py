@@ -0,0 +1,175 @@
+"""
+Per-rerun overhead of driving RAGService from Streamlit script threads.
+
+Streamlit runs every rerun of every browser session in its own script thread. This simulates
+--sessions concurrent sessions doing --reruns reruns each, where every --ask-every-th rerun
+streams an answer. It compares two ways of driving the service:
+
+  per-rerun  the old streamlit_app: asyncio.run(initialize) on every rerun and a fresh event
+             loop for each streamed answer
+  shared     one process-wide BackgroundLoop (what st.cache_resource holds), reused by every
+             session and rerun
+
+The fake LLM streams its answer word by word. Reported: overhead of a rerun that asks nothing,
+time to first token, and total time of answered reruns.
+
+Usage:
+    python -m benchmarks.bench_streamlit_sessions --sessions 32 --reruns 20 --ask-every 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+import rag_chain
+from app.core.background_loop import BackgroundLoop
+from app.core.config import settings
+from app.services.rag_service import RAGService
+from benchmarks.fakes import FakeLatencyChatModel
+from providers import FakeEmbeddings
+
+
+class StreamingChatModel(FakeLatencyChatModel):
+    """Streams the canned answer one word at a time over `latency` seconds."""
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        words = self.response.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+
+def stream_per_rerun(service: RAGService, question: str):
+    """Old streamlit_app.get_response: a new event loop per answer, one loop round trip per token."""
+    loop = asyncio.new_event_loop()
+    stream = service.astream_query(question, [])
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(stream.aclose())
+        loop.close()
+
+
+class PerRerun:
+    def __init__(self, service: RAGService):
+        self.service = service
+
+    def rerun(self, question: Optional[str]):
+        asyncio.run(self.service.initialize())
+        if question:
+            return stream_per_rerun(self.service, question)
+
+
+class Shared:
+    def __init__(self, service: RAGService):
+        self.service = service
+        self._lock = threading.Lock()
+        self._runtime: Optional[BackgroundLoop] = None
+
+    def get_runtime(self) -> BackgroundLoop:
+        # Stand-in for @st.cache_resource: created once, then a dict lookup
+        with self._lock:
+            if self._runtime is None:
+                self._runtime = BackgroundLoop()
+                self._runtime.run(self.service.initialize())
+            return self._runtime
+
+    def rerun(self, question: Optional[str]):
+        runtime = self.get_runtime()
+        if question:
+            return runtime.stream(self.service.astream_query(question, []))
+
+    def close(self) -> None:
+        if self._runtime is not None:
+            self._runtime.close()
+
+
+def session(driver, reruns: int, ask_every: int, idle: List[float], first: List[float], total: List[float]) -> None:
+    for i in range(reruns):
+        ask = ask_every and i % ask_every == ask_every - 1
+        start = time.perf_counter()
+        tokens = driver.rerun("What is the candidate's strongest programming language?" if ask else None)
+        if tokens is None:
+            idle.append(time.perf_counter() - start)
+            continue
+        for n, _ in enumerate(tokens):
+            if n == 0:
+                first.append(time.perf_counter() - start)
+        total.append(time.perf_counter() - start)
+
+
+def pct(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def simulate(label: str, driver, args) -> None:
+    idle: List[float] = []
+    first: List[float] = []
+    total: List[float] = []
+    threads_before = threading.active_count()
+    workers = [
+        threading.Thread(target=session, args=(driver, args.reruns, args.ask_every, idle, first, total))
+        for _ in range(args.sessions)
+    ]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<10} {elapsed:6.2f} s   "
+          f"idle rerun p50 {statistics.median(idle) * 1000:7.3f} ms  p95 {pct(idle, 0.95) * 1000:7.3f} ms   "
+          f"first token p50 {statistics.median(first) * 1000:6.1f} ms  p95 {pct(first, 0.95) * 1000:6.1f} ms   "
+          f"answer p50 {statistics.median(total) * 1000:6.1f} ms   "
+          f"extra threads {threading.active_count() - threads_before}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resume", default=settings.resume_path)
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--ask-every", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp()
+
+    rag_chain._get_embeddings = lambda: FakeEmbeddings(size=256)
+    llm = StreamingChatModel(latency=args.llm_latency)
+    rag_chain._get_llm = lambda: llm
+
+    print(f"{args.sessions} sessions x {args.reruns} reruns, an answer every {args.ask_every} reruns, "
+          f"LLM latency {args.llm_latency * 1000:.0f} ms")
+    service = RAGService(resume_path=args.resume, vectorstore_path=str(Path(tmp) / ".faiss_index"))
+    # Every answer goes through the LLM
+    service.answer_cache = None
+    # Build the index up front so both runs measure reruns only
+    asyncio.run(service.initialize())
+
+    simulate("per-rerun", PerRerun(service), args)
+    shared = Shared(service)
+    simulate("shared", shared, args)
+    shared.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+In-process stand-in for the subset of the redis-py client used by RedisSessionBackend.
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+def _score_bound(value: Any, default: float) -> Any:
+    text = str(value)
+    if text in ("-inf", "+inf", "inf"):
+        return float(text), False
+    if text.startswith("("):
+        return float(text[1:]), True
+    return float(text), False
+
+
+class FakeRedis:
+    """Thread-safe dict-backed client: lists, sorted sets, hashes, pipelines and the backend's scripts."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lists: Dict[str, List[str]] = {}
+        self._zsets: Dict[str, Dict[str, float]] = {}
+        self._hashes: Dict[str, Dict[str, str]] = {}
+
+    # lists
+    def rpush(self, key: str, *values: str) -> int:
+        with self._lock:
+            items = self._lists.setdefault(key, [])
+            items.extend(values)
+            return len(items)
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        with self._lock:
+            items = self._lists.get(key, [])
+            stop = None if end == -1 else end + 1
+            trimmed = items[start:stop]
+            if trimmed:
+                self._lists[key] = trimmed
+            else:
+                self._lists.pop(key, None)
+            return True
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            items = self._lists.get(key, [])
+            stop = None if end == -1 else end + 1
+            return list(items[start:stop])
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                for store in (self._lists, self._zsets, self._hashes):
+                    removed += store.pop(key, None) is not None
+            return removed
+
+    # hashes
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            value = int(fields.get(field, 0)) + amount
+            fields[field] = str(value)
+            return value
+
+    def hget(self, key: str, field: str) -> Optional[str]:
+        with self._lock:
+            return self._hashes.get(key, {}).get(field)
+
+    def hdel(self, key: str, *fields: str) -> int:
+        with self._lock:
+            values = self._hashes.get(key, {})
+            return sum(values.pop(f, None) is not None for f in fields)
+
+    # sorted sets
+    def zadd(self, key: str, mapping: Dict[str, float], xx: bool = False) -> int:
+        with self._lock:
+            zset = self._zsets.setdefault(key, {})
+            added = 0
+            for member, score in mapping.items():
+                if xx and member not in zset:
+                    continue
+                added += member not in zset
+                zset[member] = float(score)
+            return added
+
+    def zrem(self, key: str, *members: str) -> int:
+        with self._lock:
+            zset = self._zsets.get(key, {})
+            return sum(zset.pop(m, None) is not None for m in members)
+
+    def zscore(self, key: str, member: str) -> Optional[float]:
+        with self._lock:
+            return self._zsets.get(key, {}).get(member)
+
+    def zcard(self, key: str) -> int:
+        with self._lock:
+            return len(self._zsets.get(key, {}))
+
+    def zrange(self, key: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            ordered = sorted(self._zsets.get(key, {}).items(), key=lambda kv: (kv[1], kv[0]))
+            stop = None if end == -1 else end + 1
+            return [member for member, _ in ordered[start:stop]]
+
+    def zrangebyscore(self, key: str, low: Any, high: Any,
+                      start: Optional[int] = None, num: Optional[int] = None) -> List[str]:
+        lo, lo_open = _score_bound(low, float("-inf"))
+        hi, hi_open = _score_bound(high, float("inf"))
+        with self._lock:
+            ordered = sorted(self._zsets.get(key, {}).items(), key=lambda kv: (kv[1], kv[0]))
+            members = [
+                member for member, score in ordered
+                if (score > lo if lo_open else score >= lo) and (score < hi if hi_open else score <= hi)
+            ]
+            if start is not None and num is not None:
+                members = members[start:start + num]
+            return members
+
+    # scripts
+    def register_script(self, script: str) -> Callable[..., Any]:
+        """Lua can't run here: the backend's scripts are emulated in Python, under the client lock."""
+        from app.services.session_backends import RedisSessionBackend
+
+        scripts = {RedisSessionBackend.EXPIRE_SCRIPT: self._expire_script}
+        if script not in scripts:
+            raise NotImplementedError("FakeRedis only runs the scripts of RedisSessionBackend")
+        run = scripts[script]
+
+        def call(keys: Sequence[str] = (), args: Sequence[Any] = ()) -> Any:
+            with self._lock:
+                return run(list(keys), list(args))
+
+        return call
+
+    def _expire_script(self, keys: List[str], args: List[Any]) -> int:
+        removed = 0
+        for i in range(1, len(args)):
+            score = self.zscore(keys[0], args[i])
+            if score is not None and score < float(args[0]):
+                self.delete(keys[i + 1])
+                self.hdel(keys[1], args[i])
+                self.zrem(keys[0], args[i])
+                removed += 1
+        return removed
+
+    def pipeline(self, transaction: bool = False) -> "_FakePipeline":
+        return _FakePipeline(self)
+
+    def close(self) -> None:
+        pass
+
+
+class _FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> List[Any]:
+        with self._client._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._calls]
+        self._calls = []
+        return results
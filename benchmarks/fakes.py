@@ -0,0 +1,77 @@
+"""
+Offline stand-ins for the OpenAI models used by the benchmarks, built on the fake providers of
+providers.py so benchmarks measure the same models LLM_PROVIDER=fake / EMBEDDINGS_PROVIDER=fake serve.
+"""
+
+import hashlib
+from typing import List
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage
+
+from providers import FakeChatModel, FakeEmbeddings
+
+
+class FakeLatencyChatModel(FakeChatModel):
+    """FakeChatModel that answers every prompt with `response`, all at once after `latency` seconds."""
+
+    latency: float = 0.1
+    tokens_per_second: float = 0.0
+    response: str = "The candidate has hands-on experience with Python and FastAPI."
+
+    def _reply(self, messages: List[BaseMessage]) -> List[str]:
+        return self.response.split()
+
+
+class DenseFakeEmbeddings(FakeEmbeddings):
+    """
+    FakeEmbeddings plus a small random component seeded by the text. Templated chunks share most
+    words, so plain hashed bags of words tie constantly; benchmarks comparing search engines on
+    result parity need scores that don't.
+    """
+
+    noise: float = 0.3
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        noise = np.random.default_rng(seed).normal(0.0, self.noise / np.sqrt(self.size), self.size)
+        vector = np.asarray(super()._embed(text)) + noise
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeLatencyEmbeddings(FakeEmbeddings):
+    """FakeEmbeddings that count their calls (single or batched), i.e. what a remote API would bill."""
+
+    latency: float = 0.05
+    calls: int = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return super().embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return await super().aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return await super().aembed_query(text)
+
+
+def sample_docs(n: int = 40) -> List[Document]:
+    """Resume-sized corpus of short chunks."""
+    topics = ["Python", "Kubernetes", "Kafka", "FastAPI", "React", "PostgreSQL", "AWS", "Machine Learning"]
+    return [
+        Document(
+            page_content=f"Chunk {i}: built production services using {topics[i % len(topics)]} "
+                         f"at Company {i // 4} with measurable impact on latency and cost.",
+            metadata={"page": i // 10},
+        )
+        for i in range(n)
+    ]
@@ -0,0 +1,83 @@
+"""
+Minimal local SMTP server for exercising the notification path offline.
+
+Speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, NOOP, RSET, QUIT),
+with optional per-connection and per-message latency to mimic a remote provider, and an
+optional number of initial messages rejected with a temporary failure (451).
+"""
+
+import socketserver
+import threading
+import time
+from typing import List
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self) -> None:
+        server: "StandInSMTPServer" = self.server  # type: ignore[assignment]
+        with server.lock:
+            server.connections += 1
+        time.sleep(server.connect_latency)
+        self._reply("220 stand-in ESMTP ready")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self._reply("250 stand-in")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line.decode("utf-8", "replace"))
+                time.sleep(server.message_latency)
+                with server.lock:
+                    rejected = server.rejections_left > 0
+                    if rejected:
+                        server.rejections_left -= 1
+                        server.rejected += 1
+                    else:
+                        server.messages.append("".join(lines))
+                self._reply("451 Temporary failure, try again" if rejected else "250 OK queued")
+            elif command.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 connect_latency: float = 0.0, message_latency: float = 0.0, reject_first: int = 0):
+        super().__init__((host, port), _Handler)
+        self.connect_latency = connect_latency
+        self.message_latency = message_latency
+        self.lock = threading.Lock()
+        self.messages: List[str] = []
+        self.connections = 0
+        self.rejections_left = reject_first
+        self.rejected = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "StandInSMTPServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,125 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+BM25_FILENAME = "bm25.json"
+FORMAT_VERSION = 1
+
+# Keeps tech tokens intact: "c++", "c#", "node.js", "3.8", "scikit-learn"
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+
+_STOPWORDS = frozenset("""
+a about an and any are as at be been but by can could did do does for from had has have he her
+him his how i if in into is it its me more my of on or our she so tell than that the their them
+then there these they this those to us was we were what when where which who whom why will with
+would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct content terms of a query (stopwords dropped, order kept)."""
+    return list(dict.fromkeys(t for t in tokenize(text) if t not in _STOPWORDS))
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over a fixed set of chunks, addressed by docstore id.
+    Postings are stored flat per term as [doc, tf, doc, tf, ...] to keep the JSON file small.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        lengths: List[int],
+        postings: Dict[str, List[int]],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.ids = ids
+        self.lengths = lengths
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self._avgdl = (sum(lengths) / len(lengths)) if lengths else 0.0
+        n = len(ids)
+        self._idf = {
+            term: math.log(1 + (n - len(p) // 2 + 0.5) / (len(p) // 2 + 0.5))
+            for term, p in postings.items()
+        }
+
+    @classmethod
+    def build(cls, ids: Sequence[str], texts: Sequence[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        postings: Dict[str, List[int]] = {}
+        lengths = []
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).extend((doc, tf))
+        return cls(list(ids), lengths, postings, k1, b)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "BM25Index":
+        """Index every chunk in a FAISS store, in index order."""
+        ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+        texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in ids]
+        return cls.build(ids, texts)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def has_term(self, term: str) -> bool:
+        return term in self.postings
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (docstore id, score) for the query's content terms; only documents matching a term."""
+        scores: Dict[int, float] = {}
+        for term in query_terms(query):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self._idf[term]
+            for i in range(0, len(posting), 2):
+                doc, tf = posting[i], posting[i + 1]
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / self._avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.ids[doc], score) for doc, score in best]
+
+    def save(self, directory: str) -> None:
+        path = os.path.join(directory, BM25_FILENAME)
+        data = {
+            "version": FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "lengths": self.lengths,
+            "postings": self.postings,
+        }
+        # Write-then-rename so readers never see a partial file
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["BM25Index"]:
+        """Load the index saved in directory, or None if it's missing or from another format version."""
+        path = os.path.join(directory, BM25_FILENAME)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        if data.get("version") != FORMAT_VERSION:
+            return None
+        return cls(data["ids"], data["lengths"], data["postings"], data["k1"], data["b"])
@@ -1,31 +1,105 @@
 import os
 import smtplib
+import time
 from email.message import EmailMessage
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
 EMAIL_APP_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() == "true"
+
+
+def build_message(subject: str, body: str, address: Optional[str] = None) -> EmailMessage:
+    """Build a notification email sent from and to the configured address."""
+    address = address or EMAIL_ADDRESS
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = address
+    msg["To"] = address
+    msg.set_content(body)
+    return msg
+
+
+class SMTPConnection:
+    """
+    Long-lived SMTP session that is opened lazily and re-established when the server drops it.
+    Avoids a TCP/TLS handshake and login per message.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        use_ssl: bool = SMTP_USE_SSL,
+        username: Optional[str] = EMAIL_ADDRESS,
+        password: Optional[str] = EMAIL_APP_PASSWORD,
+        timeout: float = 10.0,
+        idle_check_seconds: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        smtp = cls(self.host, self.port, timeout=self.timeout)
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        return smtp
+
+    def _ensure_connected(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_check_seconds:
+            # Servers close idle sessions; probe before reusing a quiet connection
+            try:
+                self._smtp.noop()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._smtp is None:
+            self._smtp = self._connect()
+        return self._smtp
+
+    def send(self, msg: EmailMessage) -> None:
+        try:
+            self._ensure_connected().send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Dropped between probe and send: reconnect once
+            self.close()
+            self._ensure_connected().send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
 
 
 def send_email_to_user(subject: str, body: str) -> None:
     """
     Sends an email to yourself when the bot cannot answer.
     Uses Gmail + App Password (2FA) for reliability.
+    Opens a one-off connection; the API sends through NotificationOutbox instead.
     """
     if not EMAIL_ADDRESS or not EMAIL_APP_PASSWORD:
         # Fail silently in dev; log in prod
         print("Email not sent: missing EMAIL_ADDRESS or EMAIL_APP_PASSWORD.")
         return
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = EMAIL_ADDRESS
-    msg["To"] = EMAIL_ADDRESS
-    msg.set_content(body)
-
-    # Gmail SMTP over SSL
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(EMAIL_ADDRESS, EMAIL_APP_PASSWORD)
-        smtp.send_message(msg)
+    connection = SMTPConnection()
+    try:
+        connection.send(build_message(subject, body))
+    finally:
+        connection.close()
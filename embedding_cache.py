@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import time
+import unicodedata
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_store import EmbeddingStore, embedding_key, embeddings_model_name
+from instrumentation import set_flag, stage
+
+
+def normalize_query(text: str) -> str:
+    """Key normalisation for query embeddings: NFC, trimmed, inner whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Query-embedding cache in front of an Embeddings model.
+
+    embed_query / aembed_query are served from a bounded in-memory LRU, then from an optional
+    SQLite tier (EmbeddingStore keyed by (model, normalised text)), and only then from the model.
+    Concurrent async misses arriving within `batch_window_ms` are embedded in one
+    aembed_documents call, and identical in-flight misses share one result.
+    Document embedding passes straight through; chunk vectors are cached by EmbeddingStore.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_entries: int = 1024,
+        disk_path: Optional[str] = None,
+        batch_window_ms: float = 2.0,
+        max_batch: int = 64,
+    ):
+        self.embeddings = embeddings
+        # Same identifier the wrapped model reports, so chunk ids and store keys are unchanged
+        self.model = embeddings_model_name(embeddings)
+        self._max_entries = max(1, max_entries)
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = EmbeddingStore(disk_path, self.model) if disk_path else None
+        self._batch_window = max(0.0, batch_window_ms) / 1000
+        self._max_batch = max(1, max_batch)
+        # Pending misses per event loop: key -> (text, future)
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._counters = {
+            "requests": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "embed_calls": 0,
+            "evictions": 0,
+        }
+        self._miss_latency = {"count": 0, "total": 0.0}
+
+    # --- cache tiers ---
+
+    def _key(self, text: str) -> str:
+        return embedding_key(self.model, text)
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            self._counters["requests"] += 1
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self._counters["memory_hits"] += 1
+            return vector
+
+    def _memory_put(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self._max_entries:
+                self._lru.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        if self._disk is None:
+            return None
+        vector = self._disk.get_many([key]).get(key)
+        if vector is not None:
+            self._memory_put(key, vector)
+            with self._lock:
+                self._counters["disk_hits"] += 1
+        return vector
+
+    def _store(self, items: Dict[str, List[float]], elapsed: float) -> None:
+        self._remember(items, elapsed)
+        self._persist(items)
+
+    def _remember(self, items: Dict[str, List[float]], elapsed: float) -> None:
+        for key, vector in items.items():
+            self._memory_put(key, vector)
+        with self._lock:
+            self._counters["misses"] += len(items)
+            self._counters["embed_calls"] += 1
+            self._miss_latency["count"] += 1
+            self._miss_latency["total"] += elapsed
+
+    def _persist(self, items: Dict[str, List[float]]) -> None:
+        """Write to the disk tier; a failed write only costs a re-embed later, so it is logged, not raised."""
+        if self._disk is None:
+            return
+        try:
+            self._disk.put_many(items)
+        except Exception as e:
+            print(f"⚠️ Query embedding cache write failed: {e}")
+
+    # --- Embeddings interface ---
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with stage("embed"):
+            text = normalize_query(text)
+            key = self._key(text)
+            vector = self._memory_get(key) or self._disk_get(key)
+            set_flag("query_embedding_cache_hit", vector is not None)
+            if vector is None:
+                start = time.perf_counter()
+                vector = self.embeddings.embed_query(text)
+                self._store({key: vector}, time.perf_counter() - start)
+            return list(vector)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with stage("embed"):
+            text = normalize_query(text)
+            key = self._key(text)
+            vector = self._memory_get(key)
+            if vector is None and self._disk is not None:
+                vector = await asyncio.to_thread(self._disk_get, key)
+            set_flag("query_embedding_cache_hit", vector is not None)
+            if vector is None:
+                # shield: a cancelled caller must not cancel a result other callers share
+                vector = await asyncio.shield(self._enqueue_miss(key, text))
+            return list(vector)
+
+    # --- miss batching ---
+
+    def _enqueue_miss(self, key: str, text: str) -> "asyncio.Future":
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pending = self._pending.setdefault(loop, {})
+            if key in pending:
+                self._counters["coalesced"] += 1
+                return pending[key][1]
+            future = loop.create_future()
+            pending[key] = (text, future)
+            size = len(pending)
+        if size >= self._max_batch:
+            self._flush(loop)
+        elif size == 1:
+            loop.call_later(self._batch_window, self._flush, loop)
+        return future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            batch = self._pending.pop(loop, None)
+        if batch:
+            loop.create_task(self._embed_batch(batch))
+
+    async def _embed_batch(self, batch: Dict[str, Any]) -> None:
+        keys = list(batch)
+        texts = [batch[k][0] for k in keys]
+        start = time.perf_counter()
+        try:
+            if len(texts) == 1:
+                vectors = [await self.embeddings.aembed_query(texts[0])]
+            else:
+                # Same vectors as embed_query for OpenAI and default HuggingFace embeddings
+                vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            for key in keys:
+                future = batch[key][1]
+                if not future.done():
+                    future.set_exception(e)
+            return
+        items = dict(zip(keys, vectors))
+        self._remember(items, time.perf_counter() - start)
+        # Waiters get their vectors before the disk write, which can't fail them
+        for key, vector in items.items():
+            future = batch[key][1]
+            if not future.done():
+                future.set_result(vector)
+        if self._disk is not None:
+            await asyncio.to_thread(self._persist, items)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._lru)
+            latency = dict(self._miss_latency)
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        avg_miss = latency["total"] / latency["count"] if latency["count"] else 0.0
+        return {
+            **counters,
+            "size": size,
+            "hit_rate": round(hits / counters["requests"], 4) if counters["requests"] else 0.0,
+            "avg_miss_latency_ms": round(avg_miss * 1000, 2),
+            # Estimated from the average cost of an embed call; coalesced waiters saved one too
+            "saved_latency_ms": round((hits + counters["coalesced"]) * avg_miss * 1000, 1),
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
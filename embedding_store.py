@@ -0,0 +1,90 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Content address of an embedding: the same text under the same model always maps to one key."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def embeddings_model_name(embeddings) -> str:
+    """Best-effort model identifier for OpenAI / HuggingFace / fake embeddings."""
+    for attr in ("model", "model_name"):
+        name = getattr(embeddings, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    return type(embeddings).__name__
+
+
+class EmbeddingStore:
+    """
+    Content-addressed embedding cache persisted in SQLite.
+    Vectors are stored as raw float32 blobs keyed by embedding_key(model, text).
+    """
+
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def key(self, text: str) -> str:
+        return embedding_key(self.model, text)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str], embeddings) -> Tuple[List[List[float]], Dict[str, int]]:
+        """
+        Return one vector per text, embedding only texts whose key is not stored yet.
+        Stats report how many texts were served from the store vs. sent to the model.
+        """
+        keys = [self.key(t) for t in texts]
+        cached = self.get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.put_many(fresh)
+            cached.update(fresh)
+
+        stats = {"reused": len(texts) - sum(1 for k in keys if k in missing), "embedded": len(missing)}
+        return [cached[k] for k in keys], stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,276 @@
+"""
+Bulk resume ingestion: build one FAISS index per PDF in a directory.
+
+    python ingest.py resumes/ --index-dir .faiss_indexes --workers 4 --batch-size 256 --concurrency 4
+
+Each `<name>.pdf` becomes candidate `<name>` with its index at `<index-dir>/<name>`, in the same
+layout RAGService/CandidatePool load (meta.json, embeddings.sqlite, index files). The pool serves
+`<CANDIDATES_RESUME_DIR>/<name>.pdf`, so names must already be valid candidate ids (letters,
+digits, `_`, `-`, at most 100 characters); other files are skipped rather than renamed. Progress is
+recorded in `<index-dir>/manifest.json`, so re-running after an interruption skips resumes that
+are already indexed and reuses any chunk embeddings computed before the interruption.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from embedding_store import EmbeddingStore, embeddings_model_name
+from mapped_index import INDEX_FORMAT_VERSION, index_exists
+from providers import create_embeddings
+from rag_chain import EMBEDDING_STORE_FILENAME, _get_embeddings, build_or_load_vectorstore
+from resume_loader import CHUNKER_VERSION, load_and_split_resume
+
+MANIFEST_FILENAME = "manifest.json"
+# Same rule as CandidatePool.resume_path
+_CANDIDATE_ID = re.compile(r"^[A-Za-z0-9_-]{1,100}$")
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8192), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def candidate_id_for(path: Path) -> Optional[str]:
+    """Candidate id of a resume: its file name, or None when that isn't a valid id."""
+    return path.stem if _CANDIDATE_ID.match(path.stem) else None
+
+
+def _write_json(path: Path, data: Dict) -> None:
+    # Write-then-rename so an interrupted run never leaves a truncated file behind
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def _load_manifest(index_dir: Path) -> Dict:
+    path = index_dir / MANIFEST_FILENAME
+    if path.is_file():
+        try:
+            return json.loads(path.read_text())
+        except Exception:
+            print(f"⚠️ Ignoring unreadable manifest at {path}")
+    return {"version": 1, "resumes": {}}
+
+
+def _get_ingest_embeddings(kind: str):
+    # The registry's fake provider, so indexes built offline match what the API loads with
+    # EMBEDDINGS_PROVIDER=fake (same vectors, same fake-hashing-<size> model name)
+    if kind == "fake":
+        return create_embeddings("fake")
+    return _get_embeddings()
+
+
+async def _embed_batches(
+    pending: List[Tuple[str, str, str]],
+    embeddings,
+    stores: Dict[str, EmbeddingStore],
+    batch_size: int,
+    concurrency: int,
+) -> int:
+    """
+    Embed (candidate_id, key, text) items in cross-resume batches with bounded concurrency.
+    Each finished batch is written to the owning candidates' stores immediately.
+    Returns the number of embedding calls made.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    async def run(batch: List[Tuple[str, str, str]]) -> None:
+        async with semaphore:
+            vectors = await embeddings.aembed_documents([text for _, _, text in batch])
+        by_candidate: Dict[str, Dict[str, List[float]]] = {}
+        for (candidate_id, key, _), vector in zip(batch, vectors):
+            by_candidate.setdefault(candidate_id, {})[key] = vector
+        for candidate_id, items in by_candidate.items():
+            stores[candidate_id].put_many(items)
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+    return len(batches)
+
+
+def ingest_group(
+    group: List[Tuple[str, Path, str]],
+    index_dir: Path,
+    embeddings,
+    executor: ProcessPoolExecutor,
+    batch_size: int,
+    concurrency: int,
+    timings: Dict[str, float],
+) -> Dict[str, Dict]:
+    """Parse, embed and index one group of (candidate_id, pdf_path, sha256). Returns manifest entries."""
+    start = time.perf_counter()
+    parsed = {}
+    futures = {cid: executor.submit(load_and_split_resume, str(path)) for cid, path, _ in group}
+    entries: Dict[str, Dict] = {}
+    for cid, path, digest in group:
+        try:
+            parsed[cid] = futures[cid].result()
+        except Exception as e:
+            print(f"❌ {path.name}: parse failed: {e}")
+            entries[cid] = {"source": str(path), "resume_sha256": digest, "status": "failed", "error": str(e)}
+    timings["parse"] += time.perf_counter() - start
+
+    # Collect chunks missing from each candidate's embedding store, then embed them together
+    start = time.perf_counter()
+    model = embeddings_model_name(embeddings)
+    stores: Dict[str, EmbeddingStore] = {}
+    pending: List[Tuple[str, str, str]] = []
+    for cid, docs in parsed.items():
+        candidate_dir = index_dir / cid
+        candidate_dir.mkdir(parents=True, exist_ok=True)
+        store = EmbeddingStore(str(candidate_dir / EMBEDDING_STORE_FILENAME), model)
+        stores[cid] = store
+        texts = {store.key(d.page_content): d.page_content for d in docs}
+        cached = store.get_many(texts.keys())
+        pending.extend((cid, key, text) for key, text in texts.items() if key not in cached)
+    try:
+        calls = asyncio.run(_embed_batches(pending, embeddings, stores, batch_size, concurrency))
+    finally:
+        for store in stores.values():
+            store.close()
+    timings["embed"] += time.perf_counter() - start
+    timings["embed_calls"] += calls
+
+    # Build each index; every chunk is now an embedding-store hit
+    start = time.perf_counter()
+    for cid, path, digest in group:
+        docs = parsed.get(cid)
+        if docs is None:
+            continue
+        candidate_dir = index_dir / cid
+        if not docs:
+            print(f"⚠️ {path.name}: no text extracted, skipped")
+            entries[cid] = {"source": str(path), "resume_sha256": digest, "status": "failed", "error": "no text"}
+            continue
+        stats: Dict[str, int] = {}
+        try:
+            build_or_load_vectorstore(docs, embeddings, str(candidate_dir), stats=stats)
+            # Same meta.json RAGService writes, so the pool loads this index without re-parsing
+            _write_json(candidate_dir / "meta.json", {
+                "resume_sha256": digest,
+                "chunker": CHUNKER_VERSION,
+                "index_format": INDEX_FORMAT_VERSION,
+                "embeddings_model": embeddings_model_name(embeddings),
+                "docs_count": len(docs),
+                "rebuild": stats,
+            })
+        except Exception as e:
+            print(f"❌ {path.name}: indexing failed: {e}")
+            entries[cid] = {"source": str(path), "resume_sha256": digest, "status": "failed", "error": str(e)}
+            continue
+        entries[cid] = {
+            "source": str(path),
+            "resume_sha256": digest,
+            "chunker": CHUNKER_VERSION,
+            "embeddings_model": embeddings_model_name(embeddings),
+            "status": "done",
+            "chunks": len(docs),
+            "indexed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        print(f"✅ {path.name} -> {cid}: {len(docs)} chunks")
+    timings["index"] += time.perf_counter() - start
+    return entries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="Directory containing resume PDFs")
+    parser.add_argument("--index-dir", default=os.getenv("CANDIDATES_INDEX_DIR", ".faiss_indexes"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="PDF parsing processes")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding call")
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding calls in flight")
+    parser.add_argument("--group-size", type=int, default=64, help="Resumes processed per checkpoint")
+    parser.add_argument("--embeddings", choices=["default", "fake"], default="default",
+                        help="'fake' uses the offline fake provider (FAKE_EMBEDDINGS_SIZE, FAKE_EMBEDDINGS_LATENCY_MS)")
+    parser.add_argument("--force", action="store_true", help="Re-index resumes already marked done")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir)
+    index_dir = Path(args.index_dir)
+    resume_dir = Path(os.getenv("CANDIDATES_RESUME_DIR", "resumes"))
+    if input_dir.resolve() != resume_dir.resolve():
+        print(
+            f"⚠️ {input_dir} is not CANDIDATES_RESUME_DIR ({resume_dir}); the API serves a candidate only "
+            f"if its PDF is also at {resume_dir}/<candidate_id>.pdf"
+        )
+    index_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(index_dir)
+
+    embeddings = _get_ingest_embeddings(args.embeddings)
+    # Indexes built with another embedding model must be rebuilt, not skipped
+    embeddings_model = embeddings_model_name(embeddings)
+    todo: List[Tuple[str, Path, str]] = []
+    skipped = 0
+    seen: Dict[str, Path] = {}
+    for path in sorted(input_dir.glob("*.pdf")):
+        cid = candidate_id_for(path)
+        if cid is None:
+            print(f"⚠️ {path.name}: skipped, file name is not a valid candidate id (letters, digits, _ and -, max 100)")
+            continue
+        # Guard against case-folding file systems mapping two names onto one index directory
+        if cid.lower() in seen:
+            print(f"⚠️ {path.name}: skipped, candidate id collides with {seen[cid.lower()].name}")
+            continue
+        seen[cid.lower()] = path
+        digest = _sha256_file(path)
+        entry = manifest["resumes"].get(cid, {})
+        done = (
+            entry.get("status") == "done"
+            and entry.get("resume_sha256") == digest
+            and entry.get("chunker") == CHUNKER_VERSION
+            and entry.get("embeddings_model") == embeddings_model
+            and index_exists(str(index_dir / cid))
+        )
+        if done and not args.force:
+            skipped += 1
+            continue
+        todo.append((cid, path, digest))
+
+    print(f"📥 {len(todo)} resume(s) to ingest, {skipped} already indexed")
+    timings = {"parse": 0.0, "embed": 0.0, "index": 0.0, "embed_calls": 0}
+    chunks = 0
+    ingested = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        for i in range(0, len(todo), args.group_size):
+            group = todo[i:i + args.group_size]
+            entries = ingest_group(
+                group, index_dir, embeddings, executor,
+                max(1, args.batch_size), max(1, args.concurrency), timings,
+            )
+            manifest["resumes"].update(entries)
+            _write_json(index_dir / MANIFEST_FILENAME, manifest)
+            for entry in entries.values():
+                if entry["status"] == "done":
+                    ingested += 1
+                    chunks += entry["chunks"]
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"📊 Ingested {ingested} resume(s), {chunks} chunks in {elapsed:.2f} s "
+        f"({ingested / elapsed if elapsed else 0:.1f} docs/s, {chunks / elapsed if elapsed else 0:.1f} chunks/s)"
+    )
+    print(
+        f"   parse {timings['parse']:.2f} s, embed {timings['embed']:.2f} s "
+        f"({timings['embed_calls']} call(s)), index {timings['index']:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Per-request traces of the RAG pipeline (stage timings, LLM token usage, cache flags) and
+process-wide aggregates of the same, rendered in the Prometheus text exposition format.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# Histogram upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PipelineTrace:
+    """What one request spent where: milliseconds per stage, tokens per LLM stage, cache flags."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.total_seconds: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        self.flags: Dict[str, bool] = {}
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_tokens(self, stage: str, prompt: int, completion: int) -> None:
+        counts = self.tokens.setdefault(stage, {"prompt": 0, "completion": 0})
+        counts["prompt"] += prompt
+        counts["completion"] += completion
+
+    def finish(self) -> None:
+        if self.total_seconds is None:
+            self.total_seconds = time.perf_counter() - self._start
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.total_seconds if self.total_seconds is not None else time.perf_counter() - self._start
+        return {
+            "total_ms": round(total * 1000, 2),
+            "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+            "tokens": {stage: dict(counts) for stage, counts in self.tokens.items()},
+            "flags": dict(self.flags),
+        }
+
+
+class _Histogram:
+    """Cumulative-bucket histogram per label value, as Prometheus expects."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self._series: Dict[str, List[float]] = {}
+
+    def observe(self, label: str, value: float) -> None:
+        # Per label: one count per bound, then +Inf count and sum
+        series = self._series.setdefault(label, [0.0] * (len(self.bounds) + 2))
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self, name: str, label_name: str) -> List[str]:
+        lines = []
+        for label, series in sorted(self._series.items()):
+            for bound, count in zip(self.bounds, series):
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound:g}"}} {count:g}')
+            lines.append(f'{name}_bucket{{{label_name}="{label}",le="+Inf"}} {series[-2]:g}')
+            lines.append(f'{name}_sum{{{label_name}="{label}"}} {series[-1]:.6f}')
+            lines.append(f'{name}_count{{{label_name}="{label}"}} {series[-2]:g}')
+        return lines
+
+
+class PipelineMetrics:
+    """Process-wide stage latency histograms, request latency, token and cache-flag counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = _Histogram(LATENCY_BUCKETS)
+        self._requests = _Histogram(LATENCY_BUCKETS)
+        self._tokens: Dict[Tuple[str, str], int] = {}
+        self._flags: Dict[Tuple[str, bool], int] = {}
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._stages.observe(name, seconds)
+
+    def observe_request(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self._requests.observe(endpoint, seconds)
+
+    def count_tokens(self, stage: str, prompt: int, completion: int) -> None:
+        with self._lock:
+            for kind, n in (("prompt", prompt), ("completion", completion)):
+                self._tokens[(stage, kind)] = self._tokens.get((stage, kind), 0) + n
+
+    def count_flag(self, name: str, value: bool) -> None:
+        with self._lock:
+            self._flags[(name, value)] = self._flags.get((name, value), 0) + 1
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP rag_stage_duration_seconds Time spent in each RAG pipeline stage.",
+                "# TYPE rag_stage_duration_seconds histogram",
+                *self._stages.render("rag_stage_duration_seconds", "stage"),
+                "# HELP rag_request_duration_seconds End-to-end RAG request time.",
+                "# TYPE rag_request_duration_seconds histogram",
+                *self._requests.render("rag_request_duration_seconds", "endpoint"),
+                "# HELP rag_llm_tokens_total LLM tokens per pipeline stage.",
+                "# TYPE rag_llm_tokens_total counter",
+            ]
+            lines += [
+                f'rag_llm_tokens_total{{stage="{stage}",kind="{kind}"}} {n}'
+                for (stage, kind), n in sorted(self._tokens.items())
+            ]
+            lines += [
+                "# HELP rag_cache_events_total Cache and shortcut outcomes (answer cache, condense gate, query embeddings, coalescing).",
+                "# TYPE rag_cache_events_total counter",
+            ]
+            lines += [
+                f'rag_cache_events_total{{flag="{name}",value="{str(value).lower()}"}} {n}'
+                for (name, value), n in sorted(self._flags.items())
+            ]
+        return "\n".join(lines) + "\n"
+
+
+# Global instance - aggregates every RAG service in the process
+pipeline_metrics = PipelineMetrics()
+
+_current: ContextVar[Optional[PipelineTrace]] = ContextVar("pipeline_trace", default=None)
+
+
+def current_trace() -> Optional[PipelineTrace]:
+    return _current.get()
+
+
+@contextmanager
+def start_trace(endpoint: str) -> Iterator[PipelineTrace]:
+    """Trace the pipeline work done in this context; the request time is recorded on exit."""
+    trace = PipelineTrace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        pipeline_metrics.observe_request(endpoint, trace.total_seconds)
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Exited from another context (a stream closed by a different task)
+            pass
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        pipeline_metrics.observe_stage(name, elapsed)
+        trace = _current.get()
+        if trace is not None:
+            trace.add_stage(name, elapsed)
+
+
+def set_flag(name: str, value: bool) -> None:
+    pipeline_metrics.count_flag(name, value)
+    trace = _current.get()
+    if trace is not None:
+        trace.flags[name] = value
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+class LLMStageHandler(BaseCallbackHandler):
+    """
+    Times the LLM calls of one pipeline stage (start to last token, so streamed answers count
+    in full) and records their token usage. Uses the provider's usage metadata when present,
+    otherwise a characters / 4 estimate.
+    """
+
+    # Called directly in the chain's task, so the request's trace is in context
+    run_inline = True
+
+    def __init__(self, stage_name: str):
+        self.stage_name = stage_name
+        self._starts: Dict[UUID, Tuple[float, int]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt = sum(_estimate_tokens(str(m.content)) for batch in messages for m in batch)
+        self._starts[run_id] = (time.perf_counter(), prompt)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = (time.perf_counter(), sum(_estimate_tokens(p) for p in prompts))
+
+    def _finish(self, run_id: UUID) -> Tuple[Optional[float], int]:
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return None, 0
+        start, prompt_estimate = started
+        elapsed = time.perf_counter() - start
+        pipeline_metrics.observe_stage(self.stage_name, elapsed)
+        trace = _current.get()
+        if trace is not None:
+            trace.add_stage(self.stage_name, elapsed)
+        return elapsed, prompt_estimate
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        _, prompt = self._finish(run_id)
+        completion = 0
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+                completion += _estimate_tokens(generation.text)
+        if usage:
+            prompt, completion = usage.get("input_tokens", prompt), usage.get("output_tokens", completion)
+        pipeline_metrics.count_tokens(self.stage_name, prompt, completion)
+        trace = _current.get()
+        if trace is not None:
+            trace.add_tokens(self.stage_name, prompt, completion)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
@@ -0,0 +1,214 @@
+"""
+Compact on-disk index format. Loading it parses one JSON manifest and maps the rest; nothing
+is unpickled, so an index directory can't run code when it is loaded.
+
+    index.json      manifest: format + version, count, dim, vector dtype, whether rows are unit
+                    length, text size, then the docstore ids and chunk metadata in index order
+    vectors.npy     the embeddings as FAISS holds them, one row per chunk, float32 or float16
+    texts.bin       UTF-8 chunk texts back to back
+    offsets.npy     int64 byte offsets into texts.bin (n + 1 entries; chunk i is offsets[i]:offsets[i+1])
+
+Only vectors and text are mapped without parsing. The manifest's ids and metadata are parsed on
+every load, O(chunks) (about 17 ms for 20000 chunks), and are private to each process;
+memory_bytes() counts them. bm25.json and the id -> position lookups are O(chunks) per process
+as well, so mapping ids and metadata too wouldn't make a load O(1); for one resume's few dozen
+chunks the cost is negligible.
+
+Every file is checked against the manifest on load. Files are replaced atomically (write +
+rename), never rewritten in place: another process may have the previous version mapped, and
+truncating a mapped file would crash it.
+"""
+
+import itertools
+import json
+import mmap
+import os
+from typing import Any, Dict, Iterator, List, MutableMapping, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+INDEX_FORMAT = "resumetalk-index"
+# Bump on any incompatible layout change; meta.json records it, so older indexes get rebuilt
+INDEX_FORMAT_VERSION = 1
+INDEX_MANIFEST = "index.json"
+INDEX_FILES = ("vectors.npy", "texts.bin", "offsets.npy", INDEX_MANIFEST)
+VECTOR_DTYPES = ("float32", "float16")
+
+
+class InvalidIndexError(ValueError):
+    """The files at an index path are incomplete, inconsistent or of an unsupported format version."""
+
+
+def _replace(path: str, write) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def index_exists(index_path: str) -> bool:
+    return os.path.isfile(os.path.join(index_path, INDEX_MANIFEST))
+
+
+def save_index(vectorstore, index_path: str, dtype: str = "float32") -> None:
+    """Write a FAISS store (vectors, docstore ids, texts, metadata) in the compact format."""
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unknown index vector dtype: {dtype} (available: {', '.join(VECTOR_DTYPES)})")
+    index = vectorstore.index
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(index.ntotal)]
+    docs = [vectorstore.docstore.search(doc_id) for doc_id in ids]
+    vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, index.d), np.float32)
+    # OpenAI (and fake) embeddings are unit length, so the mapped matrix can be searched as is
+    normalized = bool(np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-4))
+    vectors = vectors.astype(dtype)
+    texts = [doc.page_content.encode("utf-8") for doc in docs]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=offsets[1:])
+    manifest = {
+        "format": INDEX_FORMAT,
+        "version": INDEX_FORMAT_VERSION,
+        "count": len(ids),
+        "dim": int(index.d),
+        "dtype": dtype,
+        "normalized": normalized,
+        "text_bytes": int(offsets[-1]),
+        "ids": ids,
+        "metadatas": [doc.metadata for doc in docs],
+    }
+
+    os.makedirs(index_path, exist_ok=True)
+    _replace(os.path.join(index_path, "vectors.npy"), lambda f: np.save(f, vectors))
+    _replace(os.path.join(index_path, "texts.bin"), lambda f: f.write(b"".join(texts)))
+    _replace(os.path.join(index_path, "offsets.npy"), lambda f: np.save(f, offsets))
+    # Written last: a crash mid-save leaves a manifest that doesn't match the files, not a silent mix
+    _replace(os.path.join(index_path, INDEX_MANIFEST), lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+
+
+class MappedDocuments(Sequence[Document]):
+    """Chunks of a MappedIndex by position, decoded from the mapped text blob on access."""
+
+    def __init__(self, texts, offsets: np.ndarray, metadatas: List[Dict[str, Any]]):
+        self._texts = texts
+        self._offsets = offsets
+        self._metadatas = metadatas
+
+    def __len__(self) -> int:
+        return len(self._metadatas)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return Document(page_content=self._texts[start:end].decode("utf-8"), metadata=dict(self._metadatas[i]))
+
+    def __iter__(self) -> Iterator[Document]:
+        return (self[i] for i in range(len(self)))
+
+
+class DocumentsById(MutableMapping[str, Document]):
+    """
+    Docstore id -> chunk over MappedDocuments, decoding a chunk only when it is looked up, so a
+    FAISS store rebuilt from the index doesn't build every Document at load. Usable as the dict of
+    an InMemoryDocstore: deleted ids are dropped, added documents are kept in memory.
+    """
+
+    def __init__(self, ids: List[str], documents: MappedDocuments):
+        self._positions = {doc_id: i for i, doc_id in enumerate(ids)}
+        self._documents = documents
+        self._added: Dict[str, Document] = {}
+
+    def __getitem__(self, doc_id: str) -> Document:
+        if doc_id in self._added:
+            return self._added[doc_id]
+        return self._documents[self._positions[doc_id]]
+
+    def __setitem__(self, doc_id: str, doc: Document) -> None:
+        self._positions.pop(doc_id, None)
+        self._added[doc_id] = doc
+
+    def __delitem__(self, doc_id: str) -> None:
+        if self._added.pop(doc_id, None) is None:
+            del self._positions[doc_id]
+
+    def __contains__(self, doc_id) -> bool:
+        # Without this, `in` would decode the chunk through __getitem__
+        return doc_id in self._positions or doc_id in self._added
+
+    def __iter__(self) -> Iterator[str]:
+        return itertools.chain(self._positions, self._added)
+
+    def __len__(self) -> int:
+        return len(self._positions) + len(self._added)
+
+    def text_bytes(self) -> int:
+        """Approximate UTF-8 size of the chunk texts, without decoding them."""
+        mapped = int(self._documents._offsets[-1]) if len(self._documents) else 0
+        return mapped + sum(len(doc.page_content.encode("utf-8")) for doc in self._added.values())
+
+
+class MappedDocstore:
+    """Docstore lookups (search by id) over DocumentsById, like LangChain's InMemoryDocstore."""
+
+    def __init__(self, documents: DocumentsById):
+        self._dict = documents
+
+    def search(self, search: str):
+        if search not in self._dict:
+            return f"ID {search} not found."
+        return self._dict[search]
+
+
+class MappedIndex:
+    """
+    An index loaded from the compact files, with vectors and text memory-mapped. Offers what the
+    retrieval code reads from a FAISS store (index_to_docstore_id, docstore.search, embeddings);
+    rag_chain searches it with a NumpyIndex over the mapped matrix, or rebuilds a FAISS store from it.
+    Raises InvalidIndexError when the files are not a complete index of a supported version.
+    """
+
+    def __init__(self, index_path: str, embeddings):
+        missing = [name for name in INDEX_FILES if not os.path.isfile(os.path.join(index_path, name))]
+        if missing:
+            raise InvalidIndexError(f"Index at {index_path} is incomplete, missing {', '.join(missing)}")
+        with open(os.path.join(index_path, INDEX_MANIFEST), "rb") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != INDEX_FORMAT or manifest.get("version") != INDEX_FORMAT_VERSION:
+            raise InvalidIndexError(
+                f"Index at {index_path} is {manifest.get('format')} v{manifest.get('version')}, "
+                f"expected {INDEX_FORMAT} v{INDEX_FORMAT_VERSION}"
+            )
+        count, dim, dtype = manifest["count"], manifest["dim"], manifest["dtype"]
+        self.vectors = np.load(os.path.join(index_path, "vectors.npy"), mmap_mode="r")
+        offsets = np.load(os.path.join(index_path, "offsets.npy"), mmap_mode="r")
+        with open(os.path.join(index_path, "texts.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap can't map an empty file; the mapping outlives the descriptor
+            texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        ids, metadatas = manifest["ids"], manifest["metadatas"]
+        if not (
+            self.vectors.shape == (count, dim) and self.vectors.dtype == np.dtype(dtype)
+            and offsets.shape == (count + 1,)
+            and int(offsets[-1]) == size == manifest["text_bytes"]
+            and len(ids) == len(metadatas) == count
+        ):
+            raise InvalidIndexError(f"Index files at {index_path} don't match {INDEX_MANIFEST}")
+        self.index_path = index_path
+        self.embeddings = embeddings
+        self.dim = dim
+        self.normalized = manifest["normalized"]
+        self.index_to_docstore_id = ids
+        self.metadatas = metadatas
+        self.documents = MappedDocuments(texts, offsets, metadatas)
+        self.docstore = MappedDocstore(DocumentsById(ids, self.documents))
+        self._private_bytes = os.path.getsize(os.path.join(index_path, INDEX_MANIFEST))
+
+    def memory_bytes(self) -> int:
+        """Approximate memory private to this process: ids and metadata. Vectors and text are shared pages."""
+        if self.vectors.dtype != np.float32 or not self.normalized:
+            # Searched as a normalised float32 copy
+            return self._private_bytes + self.vectors.size * 4
+        return self._private_bytes
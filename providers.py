@@ -0,0 +1,257 @@
+"""
+LLM and embedding providers, selected by name (LLM_PROVIDER / EMBEDDINGS_PROVIDER).
+
+Besides OpenAI and local HuggingFace embeddings, a deterministic "fake" provider of each kind
+answers offline with configurable latency and token rate, for load tests and benchmarks.
+Other providers can be added with @register_llm / @register_embeddings. Factories import their
+SDK themselves, so only the selected provider's packages are loaded (langchain_openai alone
+takes about a second to import; langchain_huggingface can pull in torch).
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from bm25_index import tokenize
+
+_llm_providers: Dict[str, Callable[[], BaseChatModel]] = {}
+_embeddings_providers: Dict[str, Callable[[], Embeddings]] = {}
+
+
+def register_llm(name: str):
+    def decorator(factory: Callable[[], BaseChatModel]) -> Callable[[], BaseChatModel]:
+        _llm_providers[name] = factory
+        return factory
+    return decorator
+
+
+def register_embeddings(name: str):
+    def decorator(factory: Callable[[], Embeddings]) -> Callable[[], Embeddings]:
+        _embeddings_providers[name] = factory
+        return factory
+    return decorator
+
+
+def llm_provider_name() -> str:
+    return os.getenv("LLM_PROVIDER", "openai").lower()
+
+
+def embeddings_provider_name() -> str:
+    name = os.getenv("EMBEDDINGS_PROVIDER", "").lower()
+    if name:
+        return name
+    # Before EMBEDDINGS_PROVIDER existed, USE_LOCAL_EMBEDDINGS picked HuggingFace
+    return "huggingface" if os.getenv("USE_LOCAL_EMBEDDINGS", "false").lower() == "true" else "openai"
+
+
+def create_llm(name: Optional[str] = None) -> BaseChatModel:
+    """The LLM of provider `name`, or of LLM_PROVIDER when omitted."""
+    name = name or llm_provider_name()
+    if name not in _llm_providers:
+        raise ValueError(f"Unknown LLM_PROVIDER: {name} (available: {', '.join(sorted(_llm_providers))})")
+    return _llm_providers[name]()
+
+
+def create_embeddings(name: Optional[str] = None) -> Embeddings:
+    """The embeddings of provider `name`, or of EMBEDDINGS_PROVIDER when omitted."""
+    name = name or embeddings_provider_name()
+    if name not in _embeddings_providers:
+        raise ValueError(
+            f"Unknown EMBEDDINGS_PROVIDER: {name} (available: {', '.join(sorted(_embeddings_providers))})"
+        )
+    return _embeddings_providers[name]()
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic offline chat model. The rephrase prompt gets the question back unchanged;
+    the answer prompt gets the first `answer_tokens` words of its resume context.
+    Replies start after `latency` seconds and then produce `tokens_per_second` words per second
+    (0 = all at once), streamed or not. Usage metadata is estimated like instrumentation does.
+    """
+
+    latency: float = 0.3
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 60
+
+    # Marks the answer prompt (see build_conv_rag_chain); anything else is treated as a rephrase
+    context_marker: str = "Context from resume:"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _reply(self, messages: List[BaseMessage]) -> List[str]:
+        question = next((str(m.content) for m in reversed(messages) if m.type == "human"), "")
+        system = "\n".join(str(m.content) for m in messages if m.type == "system")
+        if self.context_marker not in system:
+            return question.split()
+        words = system.split(self.context_marker, 1)[1].split()
+        return ["Based", "on", "the", "resume:", *words][:self.answer_tokens]
+
+    def _usage(self, messages: List[BaseMessage], words: List[str]) -> Dict[str, int]:
+        prompt = sum(_estimate_tokens(str(m.content)) for m in messages)
+        return {"input_tokens": prompt, "output_tokens": len(words), "total_tokens": prompt + len(words)}
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _result(self, messages: List[BaseMessage], words: List[str]) -> ChatResult:
+        message = AIMessage(content=" ".join(words), usage_metadata=self._usage(messages, words))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        words = self._reply(messages)
+        time.sleep(self.latency + len(words) * self._token_delay())
+        return self._result(messages, words)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        words = self._reply(messages)
+        await asyncio.sleep(self.latency + len(words) * self._token_delay())
+        return self._result(messages, words)
+
+    def _chunks(self, messages: List[BaseMessage], words: List[str]) -> Iterator[ChatGenerationChunk]:
+        for i, word in enumerate(words):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else f" {word}"))
+        # Usage arrives in a final empty chunk, as with OpenAI's stream_usage
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, words)))
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        delay = self._token_delay()
+        for chunk in self._chunks(messages, self._reply(messages)):
+            if chunk.text:
+                time.sleep(delay)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        delay = self._token_delay()
+        for chunk in self._chunks(messages, self._reply(messages)):
+            if chunk.text:
+                await asyncio.sleep(delay)
+            yield chunk
+
+
+class FakeEmbeddings(BaseModel, Embeddings):
+    """
+    Deterministic offline embeddings: hashed bag of words, unit length, so texts sharing
+    words are similar and retrieval behaves plausibly. Each call (single or batched) waits
+    `latency` seconds, like a remote API.
+    """
+
+    size: int = 256
+    latency: float = 0.0
+    # Read by embeddings_model_name, so fake vectors never mix with real ones in the embedding store;
+    # defaults to fake-hashing-<size>
+    model: str = ""
+
+    def model_post_init(self, __context: Any) -> None:
+        if not self.model:
+            self.model = f"fake-hashing-{self.size}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for term in tokenize(text) or [text]:
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+@register_llm("openai")
+def _openai_llm() -> BaseChatModel:
+    from langchain_openai import ChatOpenAI
+
+    model = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    temperature = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+    # stream_usage: streamed answers report token usage too (recorded by instrumentation)
+    return ChatOpenAI(model=model, temperature=temperature, stream_usage=True)
+
+
+@register_llm("fake")
+def _fake_llm() -> BaseChatModel:
+    return FakeChatModel(
+        latency=float(os.getenv("FAKE_LLM_LATENCY_MS", "300")) / 1000,
+        tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50")),
+        answer_tokens=int(os.getenv("FAKE_LLM_ANSWER_TOKENS", "60")),
+    )
+
+
+@register_embeddings("openai")
+def _openai_embeddings() -> Embeddings:
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model=os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small"))
+
+
+@register_embeddings("huggingface")
+def _huggingface_embeddings() -> Embeddings:
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+
+@register_embeddings("fake")
+def _fake_embeddings() -> Embeddings:
+    return FakeEmbeddings(
+        size=int(os.getenv("FAKE_EMBEDDINGS_SIZE", "256")),
+        latency=float(os.getenv("FAKE_EMBEDDINGS_LATENCY_MS", "40")) / 1000,
+    )
@@ -1,60 +1,323 @@
 import os
-from typing import Optional, Tuple
+import time
+import hashlib
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
+import numpy as np
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-
-# Optional local embeddings
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.language_models.chat_models import BaseChatModel
 
 # CORRECT IMPORTS for LangChain 1.0+
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+from retrievers import HybridRetriever, MMRRetriever, NumpyIndex, NumpyRetriever, SectionRoutedRetriever
+from section_router import SectionRouter
+from bm25_index import BM25Index
+from embedding_store import EmbeddingStore, embeddings_model_name
+from embedding_cache import CachedEmbeddings
+from mapped_index import DocumentsById, InvalidIndexError, MappedIndex, index_exists, save_index
+from instrumentation import LLMStageHandler, set_flag, stage
+from providers import create_embeddings, create_llm
+
+if TYPE_CHECKING:
+    # Imported where used: langchain_community is slow to import and only needed to build or load an index
+    from langchain_community.vectorstores import FAISS
+
+EMBEDDING_STORE_FILENAME = "embeddings.sqlite"
 
 def _get_embeddings():
-    use_local = os.getenv("USE_LOCAL_EMBEDDINGS", "false").lower() == "true"
-    if use_local:
-        return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    else:
-        model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
-        return OpenAIEmbeddings(model=model)
+    """Embeddings of the configured provider (EMBEDDINGS_PROVIDER, see providers.py)."""
+    return create_embeddings()
+
+
+_query_embeddings: Optional[CachedEmbeddings] = None
+
+
+def get_embeddings():
+    """
+    Embeddings with the process-wide query-embedding cache in front (QUERY_EMBEDDING_CACHE_SIZE=0
+    disables it). Shared by every RAG service, since a question's embedding doesn't depend on the resume.
+    """
+    global _query_embeddings
+    size = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    if size <= 0:
+        return _get_embeddings()
+    if _query_embeddings is None:
+        _query_embeddings = CachedEmbeddings(
+            _get_embeddings(),
+            max_entries=size,
+            disk_path=os.getenv("QUERY_EMBEDDING_CACHE_PATH") or None,
+            batch_window_ms=float(os.getenv("QUERY_EMBEDDING_BATCH_WINDOW_MS", "2")),
+        )
+    return _query_embeddings
+
+
+def _get_llm() -> BaseChatModel:
+    """Chat model of the configured provider (LLM_PROVIDER, see providers.py)."""
+    return create_llm()
+
 
+class RAGComponents(NamedTuple):
+    chain: Any
+    vectorstore: "FAISS | MappedIndex"
+    embeddings: Any
+    retriever: Any
+    rebuild_stats: Dict[str, int]
 
-def _get_llm() -> ChatOpenAI:
-    model = os.getenv("LLM_MODEL", "gpt-4o-mini")
-    temperature = float(os.getenv("LLM_TEMPERATURE", "0.2"))
-    return ChatOpenAI(model=model, temperature=temperature)
+
+@contextmanager
+def timed_phase(timings: Optional[Dict[str, float]], phase: str) -> Iterator[None]:
+    """Accumulate the wall time of a block into timings[phase] (seconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def chunk_ids(docs: List, model: str) -> List[str]:
+    """
+    Stable docstore ids derived from chunk content, page and model,
+    so an unchanged chunk keeps its id across rebuilds.
+    """
+    ids = []
+    seen: Dict[str, int] = {}
+    for doc in docs:
+        base = f"{model}\0{doc.metadata.get('page', '')}\0{doc.page_content}"
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        ids.append(hashlib.sha256(f"{base}\0{occurrence}".encode("utf-8")).hexdigest())
+    return ids
 
 
-def build_or_load_vectorstore(docs, embeddings, index_path: Optional[str]) -> FAISS:
+def _sync_vectorstore(docs: List, embeddings, index_path: Optional[str], stats: Dict[str, int]) -> "FAISS":
     """
-    Build FAISS from docs or load from disk if present. Saves reprocessing of document everytime
+    Bring the index in line with docs, embedding only chunks that aren't in the embedding store
+    and patching an existing index with add/delete by id instead of rebuilding it.
     """
-    if index_path and os.path.isdir(index_path):
-        return FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+    from langchain_community.vectorstores import FAISS
 
-    vs = FAISS.from_documents(docs, embeddings)
+    model = embeddings_model_name(embeddings)
+    ids = chunk_ids(docs, model)
+    texts = [d.page_content for d in docs]
+    metadatas = [d.metadata for d in docs]
+
+    store = None
     if index_path:
         os.makedirs(index_path, exist_ok=True)
-        vs.save_local(index_path)
+        store = EmbeddingStore(os.path.join(index_path, EMBEDDING_STORE_FILENAME), model)
+    try:
+        if store is not None:
+            vectors, embed_stats = store.embed_documents(texts, embeddings)
+        else:
+            vectors = embeddings.embed_documents(texts)
+            embed_stats = {"reused": 0, "embedded": len(texts)}
+    finally:
+        if store is not None:
+            store.close()
+    stats.update(chunks=len(docs), **embed_stats)
+
+    vs = None
+    if index_path:
+        try:
+            vs = _load_faiss(index_path, embeddings)
+        except InvalidIndexError as e:
+            # Unreadable or an unsupported version: rebuilt below from the (stored) embeddings
+            print(f"⚠️ {e}; rebuilding it")
+    if vs is not None:
+        existing = set(vs.index_to_docstore_id.values())
+        wanted = set(ids)
+        if existing & wanted and vs.index.d == len(vectors[0]):
+            stale = list(existing - wanted)
+            if stale:
+                vs.delete(stale)
+            new = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+            if new:
+                vs.add_embeddings(
+                    [(texts[i], vectors[i]) for i in new],
+                    metadatas=[metadatas[i] for i in new],
+                    ids=[ids[i] for i in new],
+                )
+            stats.update(added=len(new), deleted=len(stale))
+        else:
+            # Nothing reusable (e.g. a different embedding model): start from scratch
+            vs = None
+
+    if vs is None:
+        vs = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=ids)
+        stats.update(added=len(ids), deleted=0)
+
+    if index_path:
+        save_index(vs, index_path, dtype=os.getenv("INDEX_VECTOR_DTYPE", "float32").lower())
+        # A pickled index from before the compact format (if any) is superseded now
+        _remove_legacy_index(index_path)
+        # The lexical index is rebuilt from the final docstore so it always matches the FAISS ids
+        BM25Index.from_vectorstore(vs).save(index_path)
+    return vs
+
+
+def load_or_build_bm25(vs: "FAISS | MappedIndex", index_path: Optional[str], timings: Optional[Dict[str, float]] = None) -> BM25Index:
+    """BM25 index saved next to the FAISS files; built (and saved) from the docstore if missing or stale."""
+    with timed_phase(timings, "bm25"):
+        bm25 = BM25Index.load(index_path) if index_path else None
+        ids = [vs.index_to_docstore_id[i] for i in range(len(vs.index_to_docstore_id))]
+        if bm25 is None or bm25.ids != ids:
+            bm25 = BM25Index.from_vectorstore(vs)
+            if index_path:
+                bm25.save(index_path)
+        return bm25
+
+
+LEGACY_INDEX_FILES = ("index.faiss", "index.pkl")
+
+
+def _remove_legacy_index(index_path: str) -> None:
+    for name in LEGACY_INDEX_FILES:
+        path = os.path.join(index_path, name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def _migrate_legacy_index(index_path: str, embeddings) -> None:
+    """
+    Convert an index saved by FAISS.save_local (pickled docstore) to the compact format, once.
+    Unpickling can run code from the directory, so this only happens with INDEX_MIGRATE_PICKLE=true;
+    otherwise the pickled index is ignored and rebuilt from the resume (stored embeddings are reused).
+    """
+    if index_exists(index_path) or not all(os.path.isfile(os.path.join(index_path, n)) for n in LEGACY_INDEX_FILES):
+        return
+    if os.getenv("INDEX_MIGRATE_PICKLE", "false").lower() != "true":
+        print(f"⚠️ Ignoring pickled FAISS index at {index_path} (INDEX_MIGRATE_PICKLE=true converts it)")
+        return
+    from langchain_community.vectorstores import FAISS
+
+    save_index(FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True), index_path)
+    _remove_legacy_index(index_path)
+    print(f"♻️ Migrated pickled FAISS index at {index_path} to the compact format")
+
+
+def faiss_from_index(index: MappedIndex, embeddings) -> "FAISS":
+    """
+    An in-memory FAISS store (flat L2, as from_embeddings builds it) with the index's vectors.
+    Chunks stay in the mapped text blob and are decoded when a search returns them.
+    """
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    flat = faiss.IndexFlatL2(index.dim)
+    ids = index.index_to_docstore_id
+    if ids:
+        flat.add(np.asarray(index.vectors, dtype=np.float32))
+    docstore = InMemoryDocstore(DocumentsById(ids, index.documents))
+    return FAISS(embeddings, flat, docstore, dict(enumerate(ids)))
+
+
+def _load_faiss(index_path: str, embeddings) -> "Optional[FAISS]":
+    """The FAISS store saved at index_path, or None if there is none."""
+    _migrate_legacy_index(index_path, embeddings)
+    if not index_exists(index_path):
+        return None
+    return faiss_from_index(MappedIndex(index_path, embeddings), embeddings)
+
+
+def build_or_load_vectorstore(
+    docs: Optional[List],
+    embeddings,
+    index_path: Optional[str],
+    timings: Optional[Dict[str, float]] = None,
+    stats: Optional[Dict[str, int]] = None,
+    load_mode: Optional[str] = None,
+) -> "FAISS | MappedIndex":
+    """
+    Build FAISS from docs or load from disk if present. Saves reprocessing of document everytime.
+    The index is saved in the compact format of mapped_index.py (INDEX_VECTOR_DTYPE float32 or
+    float16); indexes pickled by FAISS.save_local are only converted with INDEX_MIGRATE_PICKLE=true.
+    docs may be None when the caller already knows the index on disk is valid; when docs are given
+    an existing index is patched incrementally and stats receives reused/embedded/added/deleted counts.
+    load_mode (default INDEX_LOAD_MODE): "memory" serves the FAISS store loaded into this process,
+    "mmap" a MappedIndex whose vectors and text pages are shared with every process mapping them.
+    """
+    load_mode = (load_mode or os.getenv("INDEX_LOAD_MODE", "memory")).lower()
+    if load_mode not in ("memory", "mmap"):
+        raise ValueError(f"Unknown INDEX_LOAD_MODE: {load_mode}")
+
+    if docs is None:
+        if not (index_path and os.path.isdir(index_path)):
+            raise RuntimeError(f"No documents provided and no index found at {index_path}")
+        with timed_phase(timings, "load"):
+            _migrate_legacy_index(index_path, embeddings)
+            if not index_exists(index_path):
+                raise RuntimeError(f"No documents provided and no index found at {index_path}")
+            index = MappedIndex(index_path, embeddings)
+            return index if load_mode == "mmap" else faiss_from_index(index, embeddings)
+
+    if not docs:
+        raise RuntimeError("No documents to index")
+
+    with timed_phase(timings, "embed"):
+        vs = _sync_vectorstore(docs, embeddings, index_path, stats if stats is not None else {})
+    if load_mode == "mmap" and index_path:
+        with timed_phase(timings, "load"):
+            return MappedIndex(index_path, embeddings)
     return vs
 
 
-def get_retriever(vs: FAISS):
+def get_retriever(vs: "FAISS | MappedIndex", backend: Optional[str] = None, bm25: Optional[BM25Index] = None):
     """
     Use MMR to diversify retrieved chunks.
+    backend (default RETRIEVER_BACKEND): "faiss" searches the FAISS store, "numpy" copies its
+    vectors into an exact in-memory matrix search (faster for small, single-resume corpora).
+    A MappedIndex (INDEX_LOAD_MODE=mmap) is always searched by the NumPy engine, on the mapped matrix.
+    With a BM25 index (and HYBRID_RETRIEVAL enabled) dense results are fused with keyword matches.
+    With SECTION_ROUTING enabled and section-tagged chunks, results favour the resume sections
+    a query asks about, with the best keyword match from outside them kept alongside.
     """
     k = int(os.getenv("RETRIEVER_K", "4"))
     fetch_k = int(os.getenv("RETRIEVER_FETCH_K", "12"))
     lambda_mult = float(os.getenv("MMR_LAMBDA", "0.6"))
-    return vs.as_retriever(
-        search_type="mmr",
-        search_kwargs={"k": k, "fetch_k": fetch_k, "lambda_mult": lambda_mult}
-    )
+    backend = (backend or os.getenv("RETRIEVER_BACKEND", "faiss")).lower()
+    if isinstance(vs, MappedIndex):
+        # The mapped matrix is searched in place whatever the backend (copied only if float16 or not unit length)
+        dense = NumpyRetriever(
+            index=NumpyIndex(vs.vectors, vs.documents, normalized=vs.normalized),
+            embeddings=vs.embeddings, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult,
+        )
+    elif backend == "numpy":
+        dense = NumpyRetriever.from_faiss(vs, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+    elif backend == "faiss":
+        dense = MMRRetriever(vectorstore=vs, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+    else:
+        raise ValueError(f"Unknown RETRIEVER_BACKEND: {backend}")
+    retriever = dense
+    if bm25 is not None and os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true":
+        retriever = HybridRetriever(
+            dense=dense,
+            bm25=bm25,
+            docstore=vs.docstore,
+            k=k,
+            sparse_k=fetch_k,
+            lexical_fast=os.getenv("HYBRID_LEXICAL_FAST", "true").lower() == "true",
+            lexical_max_terms=int(os.getenv("HYBRID_LEXICAL_MAX_TERMS", "3")),
+        )
+    if os.getenv("SECTION_ROUTING", "true").lower() == "true":
+        if isinstance(vs, MappedIndex):
+            # From metadata only: decoding every chunk would copy all text into private memory
+            router = SectionRouter.from_metadata(vs.documents, vs.metadatas, bm25 or BM25Index.from_vectorstore(vs))
+        else:
+            router = SectionRouter.from_vectorstore(vs)
+        if router:
+            retriever = SectionRoutedRetriever(
+                retriever=retriever, router=router, k=k,
+                bm25=bm25, docstore=vs.docstore if bm25 is not None else None,
+            )
+    return retriever
 
 
 def format_docs(docs):
@@ -64,12 +327,22 @@ def format_docs(docs):
     return "\n\n---\n\n".join(parts)
 
 
-def build_conv_rag_chain(retriever):
+def build_conv_rag_chain(retriever, llm=None, answer_cache=None, condense_gate=None):
     """
     Build a Conversational RAG chain using pure LCEL (LangChain Expression Language).
     This works with LangChain 1.0+
+
+    Every stage has a native async implementation, so `ainvoke` never parks a
+    worker thread on an LLM or embedding call.
+
+    If answer_cache is given (get/aget/put/aput keyed on the standalone question),
+    a cache hit skips retrieval and answer generation. Questions the retriever answers
+    without embedding them (lexical_confident) only use the exact tier of the cache.
+    If condense_gate is given (lookup/remember), follow-ups that are already standalone
+    or were rephrased before skip the condense LLM call.
+    Stage timings, LLM token usage and cache outcomes are recorded through instrumentation.
     """
-    llm = _get_llm()
+    llm = llm or _get_llm()
     
     # Prompt to reformulate question based on chat history
     condense_question_prompt = ChatPromptTemplate.from_messages([
@@ -98,35 +371,148 @@ Context from resume:
         ("human", "{question}"),
     ])
     
+    condense_chain = (
+        condense_question_prompt | llm.with_config(callbacks=[LLMStageHandler("condense")]) | StrOutputParser()
+    )
+    answer_chain = qa_prompt | llm.with_config(callbacks=[LLMStageHandler("answer")]) | StrOutputParser()
+
+    def _condense(x):
+        if not x.get("chat_history"):
+            set_flag("condense_skipped", True)
+            return x["question"]
+        if condense_gate is None:
+            set_flag("condense_skipped", False)
+            return condense_chain.invoke(x)
+        standalone = condense_gate.lookup(x["question"], x["chat_history"])
+        set_flag("condense_skipped", standalone is not None)
+        if standalone is None:
+            standalone = condense_chain.invoke(x)
+            condense_gate.remember(x["question"], x["chat_history"], standalone)
+        return standalone
+
+    async def _acondense(x):
+        if not x.get("chat_history"):
+            set_flag("condense_skipped", True)
+            return x["question"]
+        if condense_gate is None:
+            set_flag("condense_skipped", False)
+            return await condense_chain.ainvoke(x)
+        standalone = condense_gate.lookup(x["question"], x["chat_history"])
+        set_flag("condense_skipped", standalone is not None)
+        if standalone is None:
+            standalone = await condense_chain.ainvoke(x)
+            condense_gate.remember(x["question"], x["chat_history"], standalone)
+        return standalone
+
+    def _semantic(question: str) -> bool:
+        lexical = getattr(retriever, "lexical_confident", None)
+        return lexical is None or not lexical(question)
+
+    def _cached_answer(x):
+        question = x["standalone_question"]
+        with stage("answer_cache"):
+            cached = answer_cache.get(question, semantic=_semantic(question))
+        set_flag("answer_cache_hit", cached is not None)
+        return cached
+
+    async def _acached_answer(x):
+        question = x["standalone_question"]
+        with stage("answer_cache"):
+            cached = await answer_cache.aget(question, semantic=_semantic(question))
+        set_flag("answer_cache_hit", cached is not None)
+        return cached
+
+    def _retrieve(x):
+        if x.get("cached_answer") is not None:
+            return ""
+        with stage("retrieve"):
+            return format_docs(retriever.invoke(x["standalone_question"]))
+
+    async def _aretrieve(x):
+        if x.get("cached_answer") is not None:
+            return ""
+        with stage("retrieve"):
+            return format_docs(await retriever.ainvoke(x["standalone_question"]))
+
+    def _qa_inputs(x):
+        return {"question": x["standalone_question"], "context": x["context"]}
+
+    async def _aqa_inputs(x):
+        return _qa_inputs(x)
+
+    generate_answer = RunnableLambda(_qa_inputs, afunc=_aqa_inputs) | answer_chain
+
+    def _answer(x):
+        # Returning a runnable makes LCEL run (and stream) it with the same input
+        cached = x.get("cached_answer")
+        return cached if cached is not None else generate_answer
+
+    async def _aanswer(x):
+        return _answer(x)
+
+    def _remember(x):
+        if x.get("cached_answer") is None:
+            with stage("answer_cache_write"):
+                question = x["standalone_question"]
+                answer_cache.put(question, x["answer"], semantic=_semantic(question))
+        return True
+
+    async def _aremember(x):
+        if x.get("cached_answer") is None:
+            with stage("answer_cache_write"):
+                question = x["standalone_question"]
+                await answer_cache.aput(question, x["answer"], semantic=_semantic(question))
+        return True
+
     # Create the full chain
-    chain = (
-        RunnablePassthrough.assign(
-            standalone_question=lambda x: (
-                (condense_question_prompt | llm | StrOutputParser()).invoke(x)
-                if x.get("chat_history") else x["question"]
-            )
+    chain = RunnablePassthrough.assign(
+        standalone_question=RunnableLambda(_condense, afunc=_acondense)
+    )
+    if answer_cache is not None:
+        chain = chain | RunnablePassthrough.assign(
+            cached_answer=RunnableLambda(_cached_answer, afunc=_acached_answer)
         )
+    chain = (
+        chain
         | RunnablePassthrough.assign(
-            context=lambda x: format_docs(retriever.invoke(x["standalone_question"]))
+            context=RunnableLambda(_retrieve, afunc=_aretrieve)
         )
         | RunnablePassthrough.assign(
-            answer=lambda x: (qa_prompt | llm | StrOutputParser()).invoke({
-                "question": x["standalone_question"],
-                "context": x["context"]
-            })
+            answer=RunnableLambda(_answer, afunc=_aanswer)
         )
     )
+    if answer_cache is not None:
+        chain = chain | RunnablePassthrough.assign(
+            cached=RunnableLambda(_remember, afunc=_aremember)
+        )
     
     return chain
 
 
-def bootstrap_rag(docs) -> Tuple:
+def bootstrap_rag(
+    docs: Optional[List],
+    timings: Optional[Dict[str, float]] = None,
+    answer_cache=None,
+    condense_gate=None,
+    index_path: Optional[str] = None,
+) -> Tuple:
     """
     Compose embeddings, vector store, retriever, and chain.
+    Pass docs=None to load a known-good index without parsing the resume.
+    index_path defaults to VECTORSTORE_PATH.
     """
-    embeddings = _get_embeddings()
-    index_path = os.getenv("VECTORSTORE_PATH", ".faiss_index") or None
-    vs = build_or_load_vectorstore(docs, embeddings, index_path)
-    retriever = get_retriever(vs)
-    chain = build_conv_rag_chain(retriever)
-    return chain
\ No newline at end of file
+    embeddings = get_embeddings()
+    index_path = index_path or os.getenv("VECTORSTORE_PATH", ".faiss_index") or None
+    rebuild_stats: Dict[str, int] = {}
+    vs = build_or_load_vectorstore(docs, embeddings, index_path, timings, rebuild_stats)
+    bm25 = load_or_build_bm25(vs, index_path, timings)
+    with timed_phase(timings, "chain_build"):
+        retriever = get_retriever(vs, bm25=bm25)
+        chain = build_conv_rag_chain(retriever, answer_cache=answer_cache, condense_gate=condense_gate)
+    return RAGComponents(
+        chain=chain,
+        vectorstore=vs,
+        embeddings=embeddings,
+        retriever=retriever,
+        rebuild_stats=rebuild_stats,
+    )
\ No newline at end of file
@@ -1,13 +1,207 @@
-from typing import List
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter  # FIXED IMPORT
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
 from langchain_core.documents import Document  # FIXED IMPORT
 
-def load_and_split_resume(file_path: str) -> List[Document]:
+# pymupdf, PyMuPDFLoader and the text splitter are imported where used: they are only needed
+# when a resume is parsed, not when a service starts from an up-to-date index
+
+# Stored in the index meta; bump it whenever chunk boundaries or metadata change
+CHUNKER_VERSION = "sections-2"
+
+# Canonical section for a heading, first match wins ("ACADEMIC PROJECTS" is projects, not education)
+SECTION_KEYWORDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("projects", ("project", "projects")),
+    ("experience", ("experience", "employment", "work", "career")),
+    ("education", ("education", "academic", "academics")),
+    ("skills", ("skills", "technologies", "competencies", "expertise")),
+    ("certifications", ("certifications", "certificates", "licenses")),
+    ("awards", ("awards", "achievements", "honors", "honours")),
+    ("publications", ("publications", "papers")),
+    ("summary", ("summary", "profile", "objective", "about")),
+]
+# Other words a heading may contain ("Work Experience", "Technical Skills", "About Me"); a line
+# with any word outside these and the keywords ("Project Manager", "Work Study Program") is content
+_HEADING_MODIFIERS = frozenset("""
+    professional relevant selected key core technical personal research industry volunteer
+    additional other tools languages and me my of
+""".split())
+_HEADING_WORDS = _HEADING_MODIFIERS.union(*(keywords for _, keywords in SECTION_KEYWORDS))
+# Sections made of entries (a role, degree or project line followed by its details)
+ENTRY_SECTIONS = {"experience", "education", "projects"}
+# Whatever comes before the first heading: name, contact line, headline
+PREAMBLE_SECTION = "profile"
+
+MAX_CHUNK_CHARS = 800
+_BULLETS = "•●▪◦‣"
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:{_MONTH}\s+)?(?:19|20)\d\d"
+_DATE_RANGE = re.compile(rf"({_DATE})\s*(?:-|–|—|to)\s*({_DATE}|present|current|now)", re.IGNORECASE)
+_MONTHS = {m: i for i, m in enumerate("jan feb mar apr may jun jul aug sep oct nov dec".split(), 1)}
+
+
+def _iso_month(text: str) -> str:
+    """'May 2025' -> '2025-05', '2020' -> '2020', 'Present' -> 'present'."""
+    parts = text.lower().replace(".", "").split()
+    if len(parts) == 2:
+        return f"{parts[1]}-{_MONTHS[parts[0][:3]]:02d}"
+    return parts[0]
+
+
+def _heading_section(text: str) -> Optional[str]:
+    """Section a heading's text names, or None unless it's made of section keywords and modifiers only."""
+    words = re.findall(r"[a-z]+", text.lower())
+    if not words or len(words) > 4 or not all(word in _HEADING_WORDS for word in words):
+        return None
+    for section, keywords in SECTION_KEYWORDS:
+        if any(word in keywords for word in words):
+            return section
+    return None
+
+
+def _rows(pdf) -> Tuple[List[Dict[str, Any]], float]:
+    """Visual rows (lines sharing a baseline merged) in reading order, and the body font size."""
+    rows: List[Dict[str, Any]] = []
+    sizes: Counter = Counter()
+    for page_number, page in enumerate(pdf):
+        lines = []
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                # Blank spans still matter for spacing, but not for font size and weight
+                spans = [s for s in line["spans"] if s["text"].strip()]
+                if spans:
+                    lines.append((line["bbox"], spans, "".join(s["text"] for s in line["spans"])))
+        lines.sort(key=lambda item: (round(item[0][3]), item[0][0]))
+        for bbox, spans, text in lines:
+            for span in spans:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+            last = rows[-1] if rows else None
+            if last and last["page"] == page_number and abs(last["bottom"] - bbox[3]) <= 2:
+                last["spans"].extend(spans)
+                last["parts"].append(text)
+            else:
+                rows.append({"page": page_number, "bottom": bbox[3], "spans": list(spans), "parts": [text]})
+    for row in rows:
+        spans = row.pop("spans")
+        row["text"] = " ".join(" ".join(row.pop("parts")).split())
+        row["size"] = max(s["size"] for s in spans)
+        # flags bit 4 is bold; some PDFs only say so in the font name
+        row["bold"] = all(s["flags"] & 16 or "bold" in s["font"].lower() for s in spans)
+    body_size = sizes.most_common(1)[0][0] if sizes else 0.0
+    return rows, body_size
+
+
+def _group(rows: List[Dict[str, Any]], body_size: float) -> List[Dict[str, Any]]:
+    """Split rows into sections and, within entry sections, into entries with bullets."""
+    groups: List[Dict[str, Any]] = []
+    section, heading = PREAMBLE_SECTION, ""
+    current: Optional[Dict[str, Any]] = None
+
+    def start(page: int, header: str = "") -> Dict[str, Any]:
+        group = {"section": section, "heading": heading, "page": page, "header": header, "lines": [], "bullets": []}
+        groups.append(group)
+        return group
+
+    for row in rows:
+        text = row["text"]
+        is_bullet = text[0] in _BULLETS
+        found = None if is_bullet else _heading_section(text)
+        # Headings stand out (bold, capitals or a larger font) and are never smaller than body text
+        styled = row["bold"] or text.isupper() or row["size"] > body_size + 0.25
+        if found and styled and row["size"] >= body_size - 0.25:
+            section, heading = found, text.title()
+            current = None
+            continue
+        if is_bullet:
+            if current is None:
+                current = start(row["page"])
+            current["bullets"].append(text.lstrip(_BULLETS + " "))
+        elif section in ENTRY_SECTIONS and (row["bold"] or row["size"] > body_size + 0.25):
+            current = start(row["page"], text)
+        else:
+            if current is None:
+                current = start(row["page"])
+            if current["bullets"]:
+                current["bullets"][-1] += " " + text
+            else:
+                current["lines"].append(text)
+    return [g for g in groups if g["header"] or g["lines"] or g["bullets"]]
+
+
+def _chunk(group: Dict[str, Any], base_metadata: Dict[str, Any]) -> List[Document]:
+    metadata = {**base_metadata, "page": group["page"], "section": group["section"]}
+    header = group["heading"]
+    if group["header"]:
+        match = _DATE_RANGE.search(group["header"])
+        role = _DATE_RANGE.sub("", group["header"]).strip(" |,") if match else group["header"]
+        metadata["role"] = role
+        header = f"{header} | {role}" if header else role
+        if match:
+            metadata["dates"] = match.group(0)
+            metadata["start_date"] = _iso_month(match.group(1))
+            metadata["end_date"] = _iso_month(match.group(2))
+            header += f" ({match.group(0)})"
+    # Dates can also sit on a detail line (e.g. under a degree)
+    for line in group["lines"]:
+        match = _DATE_RANGE.search(line)
+        if match and "dates" not in metadata:
+            metadata["dates"] = match.group(0)
+            metadata["start_date"] = _iso_month(match.group(1))
+            metadata["end_date"] = _iso_month(match.group(2))
+
+    items = group["lines"] + [f"• {b}" for b in group["bullets"]]
+    # Every chunk repeats the header so it stands on its own in retrieval and in the prompt
+    chunks, current = [], []
+    for item in items:
+        if current and len("\n".join([header] + current + [item])) > MAX_CHUNK_CHARS:
+            chunks.append(current)
+            current = []
+        current.append(item)
+    if current or not chunks:
+        chunks.append(current)
+
+    docs = []
+    for lines in chunks:
+        text = "\n".join(([header] if header else []) + lines)
+        if len(text) > MAX_CHUNK_CHARS:
+            # A single oversized paragraph: fall back to character splitting, keeping the header
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=MAX_CHUNK_CHARS - len(header) - 1, chunk_overlap=60, separators=["\n", ".", " ", ""],
+            )
+            docs.extend(
+                Document(page_content=f"{header}\n{part}" if header else part, metadata=dict(metadata))
+                for part in splitter.split_text("\n".join(lines))
+            )
+        else:
+            docs.append(Document(page_content=text, metadata=dict(metadata)))
+    return docs
+
+
+def split_resume_sections(file_path: str) -> List[Document]:
     """
-    Loads a PDF resume and splits it into semantically coherent chunks,
-    preserving source/page metadata for later citation.
+    Layout-aware chunks: one per experience / education / project entry (split at bullet
+    boundaries if long) and one per other section, each tagged with section, role and dates.
+    Returns [] when no section headings are recognised.
     """
+    import pymupdf
+
+    with pymupdf.open(file_path) as pdf:
+        rows, body_size = _rows(pdf)
+        base_metadata = {"source": file_path, "file_path": file_path, "total_pages": len(pdf)}
+    groups = _group(rows, body_size)
+    if not any(g["section"] != PREAMBLE_SECTION for g in groups):
+        return []
+    return [doc for group in groups for doc in _chunk(group, base_metadata)]
+
+
+def _split_flat(file_path: str) -> List[Document]:
+    """Page text with whitespace collapsed, split into overlapping character chunks."""
+    from langchain_community.document_loaders import PyMuPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     loader = PyMuPDFLoader(file_path)
     docs = loader.load()
 
@@ -27,4 +221,13 @@ def load_and_split_resume(file_path: str) -> List[Document]:
         separators=["\n\n","•" ,"\n", ".", " ", ""],
     )
     split_docs = splitter.split_documents(cleaned)
-    return split_docs
\ No newline at end of file
+    return split_docs
+
+
+def load_and_split_resume(file_path: str) -> List[Document]:
+    """
+    Loads a PDF resume and splits it into semantically coherent chunks,
+    preserving source/page metadata for later citation.
+    Section-aware when the layout has recognisable headings, plain character chunks otherwise.
+    """
+    return split_resume_sections(file_path) or _split_flat(file_path)
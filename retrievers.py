@@ -0,0 +1,395 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, ClassVar, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import PrivateAttr
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from bm25_index import query_terms
+from section_router import SectionRouter
+
+_search_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_search_executor() -> ThreadPoolExecutor:
+    """
+    Bounded thread pool for CPU-bound vector search (FAISS scan + MMR).
+    Kept separate from the default executor so searches can't starve other offloaded work.
+    """
+    global _search_executor
+    if _search_executor is None:
+        workers = int(os.getenv("RETRIEVAL_MAX_WORKERS", "4"))
+        _search_executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="vector-search"
+        )
+    return _search_executor
+
+
+class MMRRetriever(BaseRetriever):
+    """
+    MMR retriever over a FAISS store with a native async path:
+    the query embedding is awaited and the search runs on the bounded search executor.
+    `sections` restricts the search to chunks whose metadata section is one of them.
+    """
+
+    # A FAISS store; typed as the core base class so importing this module doesn't load langchain_community
+    vectorstore: VectorStore
+    k: int = 4
+    fetch_k: int = 12
+    lambda_mult: float = 0.6
+
+    def _search(self, embedding: List[float], sections: Optional[Sequence[str]] = None) -> List[Document]:
+        return self.vectorstore.max_marginal_relevance_search_by_vector(
+            embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult,
+            filter={"section": {"$in": list(sections)}} if sections else None,
+        )
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, sections: Optional[Sequence[str]] = None
+    ) -> List[Document]:
+        embedding = self.vectorstore.embeddings.embed_query(query)
+        return self._search(embedding, sections)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, sections: Optional[Sequence[str]] = None
+    ) -> List[Document]:
+        embedding = await self.vectorstore.embeddings.aembed_query(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_search_executor(), self._search, embedding, sections)
+
+
+class NumpyIndex:
+    """
+    Exact cosine search over an in-memory float32 matrix of L2-normalised embeddings.
+
+    Meant for small corpora (one resume is a few dozen chunks), where a single matrix product
+    beats an ANN index plus per-call wrapper overhead. Queries are searched in batches.
+    """
+
+    # Up to this many rows the full document-document similarity matrix is precomputed for MMR
+    GRAM_MAX_ROWS = 2048
+
+    def __init__(self, vectors: np.ndarray, docs: Sequence[Document], normalized: bool = False):
+        """
+        normalized=True takes rows as already unit length and uses the matrix as given, without
+        a copy (a memory-mapped matrix then stays shared between processes).
+        """
+        if len(vectors) != len(docs):
+            raise ValueError(f"{len(vectors)} vectors for {len(docs)} documents")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.vectors = vectors if normalized else self._normalize(vectors)
+        self.docs = docs
+        self._gram = self.vectors @ self.vectors.T if len(docs) <= self.GRAM_MAX_ROWS else None
+        self.sections = np.array([d.metadata.get("section", "") for d in docs], dtype=object)
+        # Row subsets per requested section set, with their vectors sliced once (unless shared)
+        self._subsets: Dict[frozenset, tuple] = {}
+        self._copy_subsets = not normalized
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    @classmethod
+    def from_faiss(cls, vectorstore: VectorStore) -> "NumpyIndex":
+        """Copy vectors and documents out of a FAISS store, in index order."""
+        index = vectorstore.index
+        vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, index.d), np.float32)
+        docs = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            for i in range(index.ntotal)
+        ]
+        return cls(vectors, docs)
+
+    def _subset(self, sections: Optional[Sequence[str]]):
+        """(row indices, their vectors) for the given sections; (None, all vectors) for no restriction."""
+        if not sections:
+            return None, self.vectors
+        key = frozenset(sections)
+        subset = self._subsets.get(key)
+        if subset is None:
+            rows = np.flatnonzero(np.isin(self.sections, list(key)))
+            subset = self._subsets[key] = (rows, self.vectors[rows] if self._copy_subsets else None)
+        if subset[1] is None:
+            # Sliced per call, so a shared matrix isn't copied into private memory for good
+            return subset[0], self.vectors[subset[0]]
+        return subset
+
+    def _candidates(self, queries: np.ndarray, fetch_k: int, sections: Optional[Sequence[str]] = None):
+        """Top fetch_k rows per query by cosine similarity, best first: (indices, similarities)."""
+        rows, vectors = self._subset(sections)
+        sims = queries @ vectors.T
+        fetch_k = min(fetch_k, sims.shape[1])
+        if fetch_k < sims.shape[1]:
+            top = np.argpartition(-sims, fetch_k - 1, axis=1)[:, :fetch_k]
+        else:
+            top = np.broadcast_to(np.arange(sims.shape[1]), (len(queries), sims.shape[1]))
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        return (top if rows is None else rows[top]), np.take_along_axis(top_sims, order, axis=1)
+
+    def search(self, queries: np.ndarray, k: int, sections: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Exact top-k row indices per query, shape (n_queries, k)."""
+        queries = self._normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        return self._candidates(queries, min(k, len(self.docs)), sections)[0]
+
+    def mmr(
+        self, queries: np.ndarray, k: int, fetch_k: int, lambda_mult: float, sections: Optional[Sequence[str]] = None
+    ) -> np.ndarray:
+        """
+        Maximal marginal relevance for a batch of queries, shape (n_queries, k).
+        Same selection rule as LangChain's maximal_marginal_relevance, vectorised across
+        queries and candidates (one step per selected document). With sections, only rows
+        from those sections are scored.
+        """
+        queries = self._normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        n = len(queries)
+        candidates, query_sims = self._candidates(queries, fetch_k, sections)
+        fetch_k = candidates.shape[1]
+        k = min(k, fetch_k)
+        if n == 0 or k == 0:
+            return np.zeros((n, 0), dtype=np.int64)
+        if self._gram is not None:
+            pairwise = self._gram[candidates[:, :, None], candidates[:, None, :]]
+        else:
+            cand_vectors = self.vectors[candidates]
+            pairwise = cand_vectors @ cand_vectors.transpose(0, 2, 1)
+
+        rows = np.arange(n)
+        picks = np.empty((n, k), dtype=np.int64)
+        redundancy = np.full((n, fetch_k), -np.inf, dtype=np.float32)
+        available = np.ones((n, fetch_k), dtype=bool)
+        # The first pick is the most similar candidate (column 0, candidates are sorted)
+        pick = np.zeros(n, dtype=np.int64)
+        for step in range(k):
+            if step:
+                scores = lambda_mult * query_sims - (1 - lambda_mult) * redundancy
+                pick = np.argmax(np.where(available, scores, -np.inf), axis=1)
+            picks[:, step] = pick
+            available[rows, pick] = False
+            redundancy = np.maximum(redundancy, pairwise[rows, pick])
+        return np.take_along_axis(candidates, picks, axis=1)
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    MMR retriever over a NumpyIndex. Same k / fetch_k / lambda_mult semantics as MMRRetriever;
+    search_many / asearch_many embed and search a batch of queries in one call each.
+    """
+
+    index: Any
+    embeddings: Any
+    k: int = 4
+    fetch_k: int = 12
+    lambda_mult: float = 0.6
+
+    # Up to this many rows an async search runs on the event loop; beyond it, on the search executor
+    INLINE_MAX_ROWS: ClassVar[int] = 256
+
+    @classmethod
+    def from_faiss(cls, vectorstore: VectorStore, **kwargs) -> "NumpyRetriever":
+        return cls(index=NumpyIndex.from_faiss(vectorstore), embeddings=vectorstore.embeddings, **kwargs)
+
+    def _search(self, vectors: Sequence[List[float]], sections: Optional[Sequence[str]] = None) -> List[List[Document]]:
+        picks = self.index.mmr(
+            np.asarray(vectors, dtype=np.float32), self.k, self.fetch_k, self.lambda_mult, sections
+        )
+        return [[self.index.docs[i] for i in row] for row in picks]
+
+    def search_many(self, queries: List[str]) -> List[List[Document]]:
+        """Documents for each query; one embedding call and one matrix product for the batch."""
+        if not queries:
+            return []
+        return self._search(self.embeddings.embed_documents(queries))
+
+    async def asearch_many(self, queries: List[str]) -> List[List[Document]]:
+        if not queries:
+            return []
+        vectors = await self.embeddings.aembed_documents(queries)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_search_executor(), self._search, vectors)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, sections: Optional[Sequence[str]] = None
+    ) -> List[Document]:
+        return self._search([self.embeddings.embed_query(query)], sections)[0]
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, sections: Optional[Sequence[str]] = None
+    ) -> List[Document]:
+        embedding = await self.embeddings.aembed_query(query)
+        if len(self.index.docs) <= self.INLINE_MAX_ROWS:
+            # A single resume: cheaper to search inline than to hop to the executor
+            return self._search([embedding], sections)[0]
+        # Larger (e.g. memory-mapped) matrices would block the event loop
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(get_search_executor(), self._search, [embedding], sections))[0]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25 + dense retrieval fused with reciprocal rank fusion (score = sum of 1 / (rrf_k + rank)).
+
+    With lexical_fast, short keyword queries whose content terms all occur in the corpus
+    ("Kubernetes?", "GPA?") are answered from BM25 alone, without embedding the query.
+    """
+
+    dense: BaseRetriever
+    bm25: Any
+    docstore: Any
+    k: int = 4
+    sparse_k: int = 12
+    rrf_k: int = 60
+    lexical_fast: bool = True
+    lexical_max_terms: int = 3
+
+    _counts: Dict[str, int] = PrivateAttr(default_factory=lambda: {"lexical_only": 0, "fused": 0})
+
+    def lexical_confident(self, query: str) -> bool:
+        """Whether the query takes the BM25-only path, i.e. is answered without embedding it."""
+        terms = query_terms(query)
+        return (
+            self.lexical_fast
+            and 0 < len(terms) <= self.lexical_max_terms
+            and all(self.bm25.has_term(t) for t in terms)
+        )
+
+    def _sparse(self, query: str, k: int, sections: Optional[Sequence[str]] = None) -> List[Document]:
+        if not sections:
+            return [self.docstore.search(doc_id) for doc_id, _ in self.bm25.search(query, k)]
+        # Rank every match, then keep the first k from the requested sections
+        docs = (self.docstore.search(doc_id) for doc_id, _ in self.bm25.search(query, len(self.bm25)))
+        return [doc for doc in docs if doc.metadata.get("section") in sections][:k]
+
+    def _fuse(self, *rankings: List[Document]) -> List[Document]:
+        scores: Dict[str, float] = {}
+        docs: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking):
+                key = doc.page_content
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                docs.setdefault(key, doc)
+        best = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [docs[key] for key in best]
+
+    def _lexical_only(self, query: str, sections: Optional[Sequence[str]]) -> List[Document]:
+        """BM25-only answer for confident keyword queries ([] if the terms aren't in the routed sections)."""
+        if not self.lexical_confident(query):
+            return []
+        docs = self._sparse(query, self.k, sections)
+        if docs:
+            self._counts["lexical_only"] += 1
+        return docs
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, sections: Optional[Sequence[str]] = None
+    ) -> List[Document]:
+        docs = self._lexical_only(query, sections)
+        if docs:
+            return docs
+        self._counts["fused"] += 1
+        dense = self.dense.invoke(query, config={"callbacks": run_manager.get_child()}, sections=sections)
+        return self._fuse(dense, self._sparse(query, self.sparse_k, sections))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, sections: Optional[Sequence[str]] = None
+    ) -> List[Document]:
+        # BM25 over a resume is sub-millisecond; it runs inline
+        docs = self._lexical_only(query, sections)
+        if docs:
+            return docs
+        self._counts["fused"] += 1
+        dense = await self.dense.ainvoke(query, config={"callbacks": run_manager.get_child()}, sections=sections)
+        return self._fuse(dense, self._sparse(query, self.sparse_k, sections))
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+
+class SectionRoutedRetriever(BaseRetriever):
+    """
+    Favours the resume sections a SectionRouter picks for the query: results come from those
+    sections (when they hold at most k chunks, the whole sections, unranked), with the last
+    `unrouted_k` slots given to the best BM25 matches outside them, so a misrouted question
+    still sees the chunks naming its terms. Only when the routed sections yield fewer than k
+    results is the inner retriever run again, unrestricted, to fill the rest. Unrouted queries
+    search everything.
+    """
+
+    retriever: BaseRetriever
+    router: SectionRouter
+    k: int = 4
+    unrouted_k: int = 1
+    # Keyword ranking for the unrouted slots (none without a BM25 index)
+    bm25: Any = None
+    docstore: Any = None
+
+    _counts: Dict[str, int] = PrivateAttr(
+        default_factory=lambda: {"whole_sections": 0, "unrouted_added": 0, "fallback": 0}
+    )
+
+    def _whole_sections(self, sections: Optional[List[str]]) -> List[Document]:
+        docs = self.router.documents(sections) if sections else []
+        if len(docs) > self.k:
+            return []
+        if docs:
+            self._counts["whole_sections"] += 1
+        return docs
+
+    def _with_unrouted(self, query: str, routed: List[Document]) -> List[Document]:
+        """Swap the last routed results for the best BM25 matches the routed ones missed."""
+        if self.bm25 is None or not self.unrouted_k:
+            return routed
+        extra: List[Document] = []
+        for doc_id, _ in self.bm25.search(query, len(routed) + self.unrouted_k):
+            doc = self.docstore.search(doc_id)
+            if doc not in routed and len(extra) < self.unrouted_k:
+                extra.append(doc)
+        if extra:
+            self._counts["unrouted_added"] += 1
+        return routed[:self.k - len(extra)] + extra
+
+    def lexical_confident(self, query: str) -> bool:
+        return bool(getattr(self.retriever, "lexical_confident", lambda _: False)(query))
+
+    def _top_up(self, routed: List[Document], unrestricted: List[Document]) -> List[Document]:
+        self._counts["fallback"] += 1
+        return routed + [doc for doc in unrestricted if doc not in routed][:self.k - len(routed)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        config = {"callbacks": run_manager.get_child()}
+        sections = self.router.route(query)
+        if not sections:
+            return self.retriever.invoke(query, config=config)
+        routed = self._whole_sections(sections) or self.retriever.invoke(query, config=config, sections=sections)
+        if len(routed) < self.k:
+            return self._top_up(routed, self.retriever.invoke(query, config=config))
+        return self._with_unrouted(query, routed)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        config = {"callbacks": run_manager.get_child()}
+        sections = self.router.route(query)
+        if not sections:
+            return await self.retriever.ainvoke(query, config=config)
+        routed = self._whole_sections(sections) or await self.retriever.ainvoke(query, config=config, sections=sections)
+        if len(routed) < self.k:
+            return self._top_up(routed, await self.retriever.ainvoke(query, config=config))
+        return self._with_unrouted(query, routed)
+
+    def stats(self) -> Dict[str, Any]:
+        inner = self.retriever.stats() if hasattr(self.retriever, "stats") else {}
+        return {**inner, **self._counts, "routing": self.router.stats()}
@@ -0,0 +1,133 @@
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set
+
+from langchain_core.documents import Document
+
+from bm25_index import BM25Index, query_terms, tokenize
+
+# Query words that point at one part of a resume. Only words that name a section: verbs and
+# adjectives that fit any part of a resume ("worked", "built", "stack", "latest") would route
+# ordinary questions to the wrong section.
+SECTION_HINTS: Dict[str, FrozenSet[str]] = {
+    "experience": frozenset("""
+        experience experiences job jobs role roles position positions company companies employer
+        employers employment career intern internship internships responsibilities tenure
+    """.split()),
+    "education": frozenset("""
+        education educational degree degrees university universities college school study studied
+        gpa grades major masters bachelor bachelors graduate graduated graduation coursework courses
+        academic
+    """.split()),
+    "skills": frozenset("""
+        skill skills skillset technologies programming languages frameworks databases proficient
+        proficiency
+    """.split()),
+    "projects": frozenset("""
+        project projects portfolio hackathon hackathons
+    """.split()),
+    "certifications": frozenset("""
+        certification certifications certified certificate certificates
+    """.split()),
+    "summary": frozenset("""
+        summary overview
+    """.split()),
+}
+
+
+class SectionRouter:
+    """
+    Cheap query router: picks the resume section(s) a question is about from keyword hints
+    and from names (companies, schools, projects) that occur in only one section.
+
+    route() returns None when nothing matches, meaning search everything.
+    """
+
+    def __init__(self, docs: Sequence[Document], sections: Sequence[str], entities: Dict[str, Set[str]]):
+        """
+        docs are the chunks by index position (they may be decoded on access, e.g. MappedDocuments),
+        sections the section of each ("" if untagged). Only positions are kept per section.
+        """
+        self.docs = docs
+        self.by_section: Dict[str, List[int]] = {}
+        for i, section in enumerate(sections):
+            if section:
+                self.by_section.setdefault(section, []).append(i)
+        self.sections = frozenset(self.by_section)
+        self.entities = entities
+        self._counts: Dict[str, int] = {"routed": 0, "unrouted": 0}
+
+    @staticmethod
+    def _header_terms(metadatas: Iterable[Dict]) -> Dict[str, Set[str]]:
+        header_terms: Dict[str, Set[str]] = {}
+        for metadata in metadatas:
+            section = metadata.get("section")
+            if section:
+                for term in query_terms(metadata.get("role", "")):
+                    header_terms.setdefault(term, set()).add(section)
+        return header_terms
+
+    @staticmethod
+    def _entities(header_terms: Dict[str, Set[str]], seen: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+        # A term is an entity for a section when it's in one of its headers and nowhere else
+        return {
+            term: sections for term, sections in header_terms.items()
+            if seen.get(term) == sections and len(sections) == 1 and len(term) > 2
+        }
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[Document]) -> "SectionRouter":
+        docs = list(docs)
+        seen: Dict[str, Set[str]] = {}
+        for doc in docs:
+            section = doc.metadata.get("section")
+            if section:
+                for term in tokenize(doc.page_content):
+                    seen.setdefault(term, set()).add(section)
+        header_terms = cls._header_terms(d.metadata for d in docs)
+        return cls(docs, [d.metadata.get("section", "") for d in docs], cls._entities(header_terms, seen))
+
+    @classmethod
+    def from_metadata(cls, docs: Sequence[Document], metadatas: Sequence[Dict], bm25: BM25Index) -> "SectionRouter":
+        """
+        Without reading any chunk text: where a term occurs comes from the BM25 postings (same
+        tokenizer, same chunks in the same order). For a memory-mapped index, whose text must
+        stay in shared pages.
+        """
+        sections = [metadata.get("section", "") for metadata in metadatas]
+        header_terms = cls._header_terms(metadatas)
+        seen: Dict[str, Set[str]] = {}
+        for term in header_terms:
+            posting = bm25.postings.get(term, [])
+            seen[term] = {sections[posting[i]] for i in range(0, len(posting), 2) if sections[posting[i]]}
+        return cls(docs, sections, cls._entities(header_terms, seen))
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "SectionRouter":
+        return cls.from_documents(vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+                                  for i in range(len(vectorstore.index_to_docstore_id)))
+
+    def __bool__(self) -> bool:
+        # Routing needs at least two sections to choose between
+        return len(self.sections) > 1
+
+    def route(self, query: str) -> Optional[List[str]]:
+        matched: Set[str] = set()
+        for term in query_terms(query):
+            for section, hints in SECTION_HINTS.items():
+                if term in hints:
+                    matched.add(section)
+            matched |= self.entities.get(term, set())
+        matched &= self.sections
+        if not matched:
+            self._counts["unrouted"] += 1
+            return None
+        self._counts["routed"] += 1
+        for section in matched:
+            self._counts[section] = self._counts.get(section, 0) + 1
+        return sorted(matched)
+
+    def documents(self, sections: Iterable[str]) -> List[Document]:
+        """Every chunk of the given sections, in resume order within each section."""
+        return [self.docs[i] for section in sections for i in self.by_section.get(section, [])]
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._counts)
@@ -7,7 +7,6 @@ import streamlit as st
 import os
 from pathlib import Path
 from typing import List
-import asyncio
 import uuid
 
 # Set page config
@@ -22,6 +21,7 @@ st.set_page_config(
 from app.services.rag_service import rag_service
 from app.services.memory_service import chat_memory
 from app.core.config import settings
+from app.core.background_loop import BackgroundLoop
 
 # Custom CSS
 st.markdown("""
@@ -52,8 +52,6 @@ if "messages" not in st.session_state:
 if "session_id" not in st.session_state:
     # Generate unique session ID for this user/browser tab
     st.session_state.session_id = f"session_{uuid.uuid4().hex[:12]}"
-if "initialized" not in st.session_state:
-    st.session_state.initialized = False
 
 # Register session activity (heartbeat) - this keeps the session alive
 # This runs on every page interaction/rerun
@@ -61,38 +59,47 @@ if "session_id" in st.session_state:
     # Touch the session to update its last activity time
     _ = chat_memory.get_history(st.session_state.session_id)
 
-async def initialize_rag():
-    """Initialize RAG service"""
-    if not st.session_state.initialized:
-        with st.spinner("🔄 Loading resume and initializing AI..."):
-            try:
-                await rag_service.initialize()
-                st.session_state.initialized = True
-                return True
-            except Exception as e:
-                st.error(f"❌ Failed to initialize: {str(e)}")
-                return False
-    return True
+@st.cache_resource(show_spinner="🔄 Loading resume and initializing AI...")
+def get_runtime() -> BackgroundLoop:
+    """Process-wide event loop that owns rag_service, shared by every browser session.
 
-async def get_response(question: str):
-    """Get response from RAG service"""
+    Initialization runs once per process rather than once per tab. A failed attempt isn't
+    cached, so the next rerun retries it.
+    """
+    runtime = BackgroundLoop(name="rag-service-loop")
     try:
-        # Get chat history
-        chat_history = chat_memory.get_langchain_format(st.session_state.session_id)
-        
-        # Query RAG
-        result = await rag_service.query(question, chat_history)
-        
-        answer = result.get("answer", "I'm not sure about that.").strip()
-        sources = result.get("source_documents", [])
-        
-        # Store in memory
-        chat_memory.add_exchange(st.session_state.session_id, question, answer)
-        
-        return answer, sources
+        runtime.run(rag_service.initialize())
+    except Exception:
+        runtime.close()
+        raise
+    return runtime
+
+def initialize_rag():
+    """Get the shared runtime, or None if the RAG service failed to initialize"""
+    try:
+        return get_runtime()
     except Exception as e:
-        st.error(f"Error: {str(e)}")
-        return None, []
+        st.error(f"❌ Failed to initialize: {str(e)}")
+        return None
+
+def get_response(runtime: BackgroundLoop, question: str):
+    """Stream the answer from the RAG service, for use with st.write_stream.
+
+    The exchange is stored in memory once the stream has finished.
+    """
+    # Get chat history
+    chat_history = chat_memory.get_langchain_format(st.session_state.session_id)
+    
+    # Tokens are produced on the shared loop and handed to this script thread as they arrive
+    parts = []
+    for token in runtime.stream(rag_service.astream_query(question, chat_history)):
+        parts.append(token)
+        yield token
+    
+    answer = "".join(parts).strip() or "I'm not sure about that."
+    
+    # Store in memory
+    chat_memory.add_exchange(st.session_state.session_id, question, answer)
 
 def display_sources(sources):
     """Display source documents"""
@@ -157,10 +164,10 @@ def main():
         else:
             st.warning("📦 FAISS index not built yet")
         
-        if st.button("♻️ Rebuild Index", help="Delete and rebuild the FAISS index from the current resume"):
+        if st.button("♻️ Rebuild Index", help="Rebuild the FAISS index from the current resume; the current index keeps serving until it is ready"):
             with st.spinner("Rebuilding index..."):
                 try:
-                    asyncio.run(rag_service.rebuild(True))
+                    get_runtime().run(rag_service.rebuild(True))
                     # Reset chat state so new answers use rebuilt index
                     st.session_state.messages = []
                     chat_memory.clear_session(st.session_state.session_id)
@@ -169,8 +176,9 @@ def main():
                 except Exception as e:
                     st.error(f"❌ Rebuild failed: {e}")
     
-    # Initialize RAG
-    if asyncio.run(initialize_rag()):
+    # Initialize RAG (once per process)
+    runtime = initialize_rag()
+    if runtime is not None:
         # Display chat messages
         for message in st.session_state.messages:
             with st.chat_message(message["role"]):
@@ -187,19 +195,18 @@ def main():
             
             # Get assistant response
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    answer, sources = asyncio.run(get_response(prompt))
-                    
-                    if answer:
-                        st.markdown(answer)
-                        display_sources(sources)
-                        
-                        # Store assistant message
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": answer,
-                            "sources": sources
-                        })
+                try:
+                    answer = st.write_stream(get_response(runtime, prompt))
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+                    answer = None
+                
+                if answer:
+                    # Store assistant message
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": answer
+                    })
     else:
         st.error("Failed to initialize the chatbot. Please check your configuration.")
 
@@ -0,0 +1,18 @@
+"""
+Tests run offline: fake chat model and embeddings (providers.py) with no artificial latency,
+on the sample resume. Set before app.core.config reads the environment.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("RESUME_PATH", str(ROOT / "resume.pdf"))
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("EMBEDDINGS_PROVIDER", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+os.environ.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "0")
+os.environ.setdefault("FAKE_EMBEDDINGS_LATENCY_MS", "0")
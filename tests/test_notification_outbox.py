@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from app.services.notification_outbox import NotificationOutbox
+from benchmarks.smtp_standin import StandInSMTPServer
+from email_sender import SMTPConnection
+
+ADDRESS = "test@example.com"
+
+
+@pytest.fixture
+def server():
+    server = StandInSMTPServer().start()
+    yield server
+    server.stop()
+
+
+def _outbox(server: StandInSMTPServer, **kwargs) -> NotificationOutbox:
+    return NotificationOutbox(
+        connection=SMTPConnection(host="127.0.0.1", port=server.port, use_ssl=False, username=None),
+        address=ADDRESS,
+        **kwargs,
+    )
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_repeated_question_is_sent_once(server):
+    outbox = _outbox(server, batch_window_seconds=0.2)
+    try:
+        outbox.enqueue("Does the candidate know Rust?", "session-1")
+        outbox.enqueue("does the candidate  know rust?", "session-2")
+        _wait_for(lambda: outbox.stats()["emails_sent"] == 1)
+        # Already notified within the dedupe TTL: dropped when its batch is delivered
+        outbox.enqueue("Does the candidate know Rust?", "session-1")
+        _wait_for(lambda: outbox.stats()["deduplicated"] == 2)
+    finally:
+        outbox.stop()
+
+    assert len(server.messages) == 1
+    assert "Asked: 2 time(s)" in server.messages[0]
+    assert "Sessions: session-1, session-2" in server.messages[0]
+    stats = outbox.stats()
+    assert stats["emails_sent"] == 1
+    assert stats["notifications_sent"] == 1
+
+
+def test_notifications_within_window_are_sent_as_one_digest(server):
+    outbox = _outbox(server, batch_window_seconds=0.3)
+    try:
+        for i in range(3):
+            outbox.enqueue(f"Does the candidate know technology #{i}?", f"session-{i}")
+        _wait_for(lambda: outbox.stats()["emails_sent"] == 1)
+    finally:
+        outbox.stop()
+
+    assert len(server.messages) == 1
+    assert "Subject: Interview Questions - 3 Need Review" in server.messages[0]
+    assert all(f"technology #{i}" in server.messages[0] for i in range(3))
+    assert server.connections == 1
+    assert outbox.stats()["notifications_sent"] == 3
+
+
+def test_failed_send_is_retried_after_backoff():
+    server = StandInSMTPServer(reject_first=1).start()
+    outbox = _outbox(server, batch_window_seconds=0.0, retry_backoff_seconds=0.3)
+    try:
+        start = time.monotonic()
+        outbox.enqueue("Does the candidate know Erlang?", "session-1")
+        _wait_for(lambda: outbox.stats()["emails_sent"] == 1)
+        elapsed = time.monotonic() - start
+    finally:
+        outbox.stop()
+        server.stop()
+
+    assert elapsed >= 0.3
+    assert server.rejected == 1
+    assert len(server.messages) == 1
+    stats = outbox.stats()
+    assert stats["send_failures"] == 1
+    assert stats["retries"] == 1
+    assert stats["dropped_after_retries"] == 0
+    # The failed connection is dropped and a new one opened for the retry
+    assert server.connections == 2
+
+
+def test_stop_flushes_queued_notifications(server):
+    outbox = _outbox(server, batch_window_seconds=30.0)
+    outbox.enqueue("Does the candidate know Haskell?", "session-1")
+    outbox.enqueue("Does the candidate know OCaml?", "session-2")
+
+    start = time.monotonic()
+    outbox.stop()
+
+    assert time.monotonic() - start < 5.0
+    assert len(server.messages) == 1
+    assert "Haskell" in server.messages[0] and "OCaml" in server.messages[0]
+    assert outbox.stats()["queue_depth"] == 0
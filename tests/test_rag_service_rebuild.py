@@ -0,0 +1,90 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from app.services.rag_service import RAGService
+
+
+async def _serve_during(service: RAGService, rebuild, workers: int = 8):
+    """Query the service continuously from `workers` tasks while rebuild() runs; returns (answers, errors)."""
+    answers, errors = [], []
+    stop = asyncio.Event()
+
+    async def worker(w: int) -> None:
+        i = 0
+        while not stop.is_set():
+            try:
+                result = await service.query(f"Worker {w} question {i} about Kafka?", [])
+                answers.append(result["answer"])
+            except Exception as e:
+                errors.append(repr(e))
+            i += 1
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(worker(w)) for w in range(workers)]
+    try:
+        await asyncio.sleep(0.05)
+        await rebuild()
+        await asyncio.sleep(0.05)
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks)
+    return answers, errors
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = RAGService(vectorstore_path=str(tmp_path / ".faiss_index"))
+    # Every question should reach the chain
+    service.answer_cache = None
+    asyncio.run(service.initialize())
+    return service
+
+
+def test_queries_keep_succeeding_during_rebuilds(service):
+    live = Path(service.vectorstore_path)
+
+    async def rebuilds():
+        for force_delete in (True, False):
+            await service.rebuild(force_delete=force_delete)
+
+    answers, errors = asyncio.run(_serve_during(service, rebuilds))
+
+    assert errors == []
+    assert answers
+    assert service.generation == 3
+    assert service.get_rebuild_status()["state"] == "succeeded"
+    # The live path links to the only remaining version
+    assert live.is_symlink()
+    assert [p.name for p in live.parent.iterdir() if p.name.startswith(f"{live.name}.")] == [os.readlink(live)]
+
+
+def test_failed_rebuild_keeps_previous_generation_serving(service, monkeypatch):
+    asyncio.run(service.rebuild(force_delete=True))
+    live = Path(service.vectorstore_path)
+    target, generation, chain = os.readlink(live), service.generation, service.chain
+
+    def failing_build(index_dir: Path, force_parse: bool = False):
+        index_dir.mkdir()
+        (index_dir / "index.faiss").write_bytes(b"half-written")
+        raise RuntimeError("embedding provider unavailable")
+
+    monkeypatch.setattr(service, "_build", failing_build)
+
+    async def rebuild():
+        with pytest.raises(RuntimeError, match="embedding provider unavailable"):
+            await service.rebuild(force_delete=True)
+
+    answers, errors = asyncio.run(_serve_during(service, rebuild))
+
+    assert errors == []
+    assert answers
+    status = service.get_rebuild_status()
+    assert status["state"] == "failed"
+    assert status["serving_generation"] == generation
+    assert service.chain is chain
+    assert os.readlink(live) == target
+    # The half-built version directory is removed
+    assert [p.name for p in live.parent.iterdir() if p.name.startswith(f"{live.name}.")] == [target]